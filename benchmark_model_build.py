@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import pulp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from core.model_builder import ModelBuilder
+from core.optimizer import PalletOptimizer
+from data.models import Store, Vehicle, Location
+
+
+def make_instance(n_stores: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    depot = Location("depot", "Distribution Center", 41.8781, -87.6298, "Chicago", "IL", "60601")
+    stores = []
+    for i in range(n_stores):
+        name = f"Store {i:04d}"
+        location = Location(name, "", float(41.88 + rng.normal(0, 0.6)),
+                            float(-87.63 + rng.normal(0, 0.8)), "", "", "")
+        stores.append(Store(f"S{i:04d}", name, location, int(rng.integers(2, 9))))
+
+    n_vehicles = int(np.ceil(sum(s.demand_pallets for s in stores) / 26)) + 2
+    vehicles = [Vehicle(f"truck_{k + 1:02d}", "Standard Truck", 26, 48000, 0.85, 35.0,
+                        current_location=depot) for k in range(n_vehicles)]
+    return stores, vehicles
+
+
+def build_objective_incremental(distances: np.ndarray, n_vehicles: int) -> float:
+    # The original construction: one `+=` per arc and vehicle
+    start = time.perf_counter()
+    n = len(distances)
+    x = {(i, j, k): pulp.LpVariable(f"x_{i}_{j}_{k}", cat='Binary')
+         for i in range(n) for j in range(n) for k in range(n_vehicles) if i != j}
+    total_cost = 0
+    for (i, j, k), var in x.items():
+        total_cost += float(distances[i, j]) * 0.85 * var
+    prob = pulp.LpProblem("incremental", pulp.LpMinimize)
+    prob += total_cost
+    return time.perf_counter() - start
+
+
+def build_objective_batched(distances: np.ndarray, n_vehicles: int) -> float:
+    start = time.perf_counter()
+    n = len(distances)
+    keys = [(i, j, k) for i in range(n) for j in range(n) for k in range(n_vehicles) if i != j]
+    builder = ModelBuilder("batched")
+    x = builder.binary_variables("x", keys)
+    builder.set_objective(x, {(i, j, k): float(distances[i, j]) * 0.85 for i, j, k in keys})
+    builder.finish()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model build vs solve time benchmark")
+    parser.add_argument("--stores", type=int, nargs="+", default=[20, 40, 60])
+    parser.add_argument("--time-limit", type=int, default=30)
+    args = parser.parse_args()
+
+    print("=== OBJECTIVE CONSTRUCTION (three-index model) ===")
+    for n_stores in args.stores:
+        stores, vehicles = make_instance(n_stores)
+        optimizer = PalletOptimizer({'distance_cache_directory': None})
+        matrix = optimizer.get_distance_matrix(stores, vehicles)
+        locations = ['depot'] + [store.location.name for store in stores]
+        distances = matrix.submatrix(locations)
+
+        incremental = build_objective_incremental(distances, len(vehicles))
+        batched = build_objective_batched(distances, len(vehicles))
+        print(f"{n_stores:>5} stores, {len(vehicles):>3} vehicles: "
+              f"incremental {incremental:7.2f}s   batched {batched:7.2f}s")
+
+    print("\n=== COMPACT MODEL: BUILD vs SOLVE ===")
+    for n_stores in args.stores:
+        stores, vehicles = make_instance(n_stores)
+        optimizer = PalletOptimizer({'time_limit_seconds': args.time_limit,
+                                     'distance_cache_directory': None})
+        result = optimizer.optimize(stores, [], vehicles, method='compact')
+        stats = result.solver_stats
+        print(f"{n_stores:>5} stores: build {stats['build_time']:6.2f}s   "
+              f"solve {stats['solver_time']:6.2f}s   status {result.solver_status}")
@@ -0,0 +1,185 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from data.models import Route, Vehicle
+
+
+EPSILON = 1e-6
+
+# Order of the per-route resource vectors: miles, driver hours (driving plus unloading), pallets, pounds
+RESOURCES = ('distance', 'hours', 'pallets', 'weight')
+LIMIT_KEYS = ('max_route_distance', 'max_driver_hours', 'max_pallet_capacity', 'max_weight_capacity')
+
+
+@dataclass
+class RouteLimits:
+    max_route_distance: Optional[float] = None
+    max_driver_hours: Optional[float] = None
+    max_pallet_capacity: Optional[int] = None
+    max_weight_capacity: Optional[float] = None
+    pallet_weight_lbs: Optional[float] = None  # weight is only checked when this is known
+    
+    @classmethod
+    def from_config(cls, config: Dict) -> 'RouteLimits':
+        # Keys may sit at the top level or under a 'constraints' section as in config.yaml
+        section = config.get('constraints') or {}
+        values = {key: config.get(key, section.get(key)) for key in LIMIT_KEYS + ('pallet_weight_lbs',)}
+        return cls(**{key: value for key, value in values.items() if value is not None})
+    
+    @property
+    def enabled(self) -> bool:
+        return any(getattr(self, key) is not None for key in LIMIT_KEYS)
+    
+    @property
+    def limits_routes(self) -> bool:
+        # Distance and hours depend on the stop order, unlike pallets and weight
+        return self.max_route_distance is not None or self.max_driver_hours is not None
+    
+    def bounds(self, vehicle: Optional[Vehicle] = None) -> np.ndarray:
+        bounds = np.array([getattr(self, key) if getattr(self, key) is not None else np.inf
+                           for key in LIMIT_KEYS], dtype=np.float64)
+        if vehicle is not None:
+            bounds[2] = min(bounds[2], vehicle.max_pallets)
+            bounds[3] = min(bounds[3], vehicle.max_weight)
+        if self.pallet_weight_lbs is None:
+            bounds[3] = np.inf
+        return bounds
+    
+    def vehicle_capacity(self, vehicle: Vehicle) -> int:
+        # Pallets a vehicle may carry once the pallet and weight limits are both applied
+        _, _, pallets, weight = self.bounds(vehicle)
+        if self.pallet_weight_lbs:
+            pallets = min(pallets, np.floor(weight / self.pallet_weight_lbs + EPSILON))
+        return int(pallets)
+
+
+@dataclass
+class RouteChecks:
+    totals: np.ndarray  # (routes, 4) resource use per route, ordered as RESOURCES
+    bounds: np.ndarray  # (routes, 4)
+    
+    @property
+    def excess(self) -> np.ndarray:
+        return np.maximum(self.totals - self.bounds, 0.0)
+    
+    @property
+    def feasible(self) -> np.ndarray:
+        return (self.excess <= EPSILON).all(axis=1)
+    
+    def violations(self) -> List[Dict]:
+        return [
+            {'route': int(r), 'limit': LIMIT_KEYS[c], 'value': float(self.totals[r, c]),
+             'bound': float(self.bounds[r, c])}
+            for r, c in np.argwhere(self.excess > EPSILON)
+        ]
+
+
+class ConstraintEngine:
+    """Route limits over dense location arrays; arc (a, b) charges b's unloading time, pallets and weight."""
+    
+    def __init__(self, distances: np.ndarray, times: np.ndarray, demands: np.ndarray,
+                 limits: RouteLimits, service_hours: Union[float, np.ndarray] = 0.0, n_depots: int = 1):
+        demands = np.asarray(demands, dtype=np.float64)
+        service = np.broadcast_to(np.asarray(service_hours, dtype=np.float64), demands.shape).copy()
+        service[:n_depots] = 0.0
+        weights = demands * (limits.pallet_weight_lbs or 0.0)
+        
+        self.limits = limits
+        self.distances = distances
+        self.times = times
+        self.n_depots = n_depots
+        self.node_values = np.column_stack((service, demands, weights))
+        self.bounds = limits.bounds()
+    
+    def subset(self, index: Sequence[int], n_depots: int = 1) -> 'ConstraintEngine':
+        index = np.asarray(index, dtype=np.intp)
+        sub = np.ix_(index, index)
+        return ConstraintEngine(self.distances[sub], self.times[sub], self.node_values[index, 1],
+                                self.limits, self.node_values[index, 0], n_depots)
+    
+    def arc_values(self, resource: str) -> np.ndarray:
+        # Dense (n, n) contribution of every arc to one resource
+        if resource == 'distance':
+            return self.distances
+        if resource == 'hours':
+            return self.times + self.node_values[None, :, 0]
+        column = RESOURCES.index(resource) - 1
+        return np.broadcast_to(self.node_values[None, :, column], self.distances.shape)
+    
+    def arc(self, a: int, b: int) -> np.ndarray:
+        service, pallets, weight = self.node_values[b]
+        return np.array((self.distances[a, b], self.times[a, b] + service, pallets, weight))
+    
+    def cumulative(self, path: Sequence[int]) -> np.ndarray:
+        # cumulative[p] is the resource use of path[:p + 1]; any sub-path is a difference of two rows
+        path = np.asarray(path, dtype=np.intp)
+        steps = np.zeros((len(path), len(RESOURCES)))
+        if len(path) > 1:
+            steps[1:, 0] = self.distances[path[:-1], path[1:]]
+            steps[1:, 1] = self.times[path[:-1], path[1:]]
+            steps[1:, 1:] += self.node_values[path[1:]]
+        return np.cumsum(steps, axis=0)
+    
+    def path_totals(self, path: Sequence[int]) -> np.ndarray:
+        return self.cumulative(path)[-1]
+    
+    def within(self, totals: np.ndarray, bounds: Optional[np.ndarray] = None) -> bool:
+        bounds = self.bounds if bounds is None else bounds
+        return bool((totals <= bounds + EPSILON).all())
+    
+    def reachable(self, totals: np.ndarray, current: int, depot: int = 0,
+                  bounds: Optional[np.ndarray] = None) -> np.ndarray:
+        # Locations that can be visited next from current and still leave a way back to the depot
+        bounds = self.bounds if bounds is None else bounds
+        service, pallets, weight = self.node_values.T
+        extended = np.column_stack((
+            totals[0] + self.distances[current] + self.distances[:, depot],
+            totals[1] + self.times[current] + service + self.times[:, depot],
+            totals[2] + pallets,
+            totals[3] + weight,
+        ))
+        return (extended <= bounds + EPSILON).all(axis=1)
+    
+    def evaluate(self, routes: Sequence[Sequence[int]], depots: Union[int, Sequence[int]] = 0,
+                 bounds: Optional[np.ndarray] = None) -> RouteChecks:
+        # routes list store indices only; every route is closed at its depot and checked in one pass
+        n_routes = len(routes)
+        depots = np.broadcast_to(np.asarray(depots, dtype=np.intp), (n_routes,))
+        bounds = np.broadcast_to(self.bounds if bounds is None else np.asarray(bounds, dtype=np.float64),
+                                 (n_routes, len(RESOURCES)))
+        totals = np.zeros((n_routes, len(RESOURCES)))
+        if n_routes == 0:
+            return RouteChecks(totals, np.array(bounds))
+        
+        lengths = np.fromiter((len(route) + 2 for route in routes), dtype=np.intp, count=n_routes)
+        flat = np.concatenate([np.concatenate(([d], np.asarray(route, dtype=np.intp), [d]))
+                               for d, route in zip(depots, routes)]).astype(np.intp)
+        route_ids = np.repeat(np.arange(n_routes), lengths)
+        
+        # Arcs crossing from one route into the next are masked out
+        same_route = route_ids[:-1] == route_ids[1:]
+        tails, heads, ids = flat[:-1][same_route], flat[1:][same_route], route_ids[:-1][same_route]
+        totals[:, 0] = np.bincount(ids, weights=self.distances[tails, heads], minlength=n_routes)
+        totals[:, 1] = np.bincount(ids, weights=self.times[tails, heads], minlength=n_routes)
+        for c in range(self.node_values.shape[1]):
+            totals[:, c + 1] += np.bincount(ids, weights=self.node_values[heads, c], minlength=n_routes)
+        return RouteChecks(totals, np.array(bounds))
+
+
+def check_routes(routes: Sequence[Route], vehicles: Sequence[Vehicle], limits: RouteLimits,
+                 service_hours: float = 0.0) -> RouteChecks:
+    # Finished routes already carry their totals, so validation needs no distance matrix
+    by_id = {vehicle.id: vehicle for vehicle in vehicles}
+    pallets = np.array([route.pallets_delivered for route in routes], dtype=np.float64)
+    stops = np.array([max(len(route.stops) - 2, 0) for route in routes], dtype=np.float64)
+    totals = np.column_stack((
+        np.array([route.total_distance for route in routes], dtype=np.float64),
+        np.array([route.total_time for route in routes], dtype=np.float64) + stops * service_hours,
+        pallets,
+        pallets * (limits.pallet_weight_lbs or 0.0),
+    )).reshape(len(routes), len(RESOURCES))
+    bounds = np.array([limits.bounds(by_id.get(route.vehicle_id)) for route in routes],
+                      dtype=np.float64).reshape(len(routes), len(RESOURCES))
+    return RouteChecks(totals, bounds)
@@ -2,11 +2,14 @@ import math
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 
+import numpy as np
+
 from data.models import (
     Store, Supplier, Vehicle, Route, Location, 
     CostBreakdown, TollSegment, DistanceMatrix
 )
-from utils.geo_utils import calculate_distance, calculate_travel_time
+from core.toll_index import TollIndex, normalize_location, segments_from_rates
+from utils.geo_utils import DEFAULT_SPEED_MPH, distance_matrix_array
 
 
 class CostCalculator:
@@ -15,15 +18,44 @@ class CostCalculator:
         self.driver_cost_per_hour = config.get('driver_cost_per_hour', 25.0)
         self.warehouse_handling_cost = config.get('warehouse_handling_cost', 15.0)
         self.default_toll_rate = config.get('default_toll_rate', 0.15)
+        self.avg_speed_mph = config.get('avg_speed_mph', DEFAULT_SPEED_MPH)
         
         self.toll_rates: Dict[Tuple[str, str], float] = {}
+        self.toll_segments: List[TollSegment] = []
         self.distance_matrix: Optional[DistanceMatrix] = None
+        self.locations: List[Location] = []
+        # Segments keyed by normalized (from, to) names, for stops outside the distance matrix
+        self._segment_lookup: Dict[Tuple[str, str], TollSegment] = {}
+        # Per-arc toll cost over the distance matrix's locations, built on first use
+        self._toll_index: Optional[TollIndex] = None
+        self._toll_costs: Optional[np.ndarray] = None
     
     def set_toll_rates(self, toll_rates: Dict[Tuple[str, str], float]):
+        self.set_toll_segments(segments_from_rates(toll_rates))
         self.toll_rates = toll_rates
     
-    def set_distance_matrix(self, distance_matrix: DistanceMatrix):
+    def set_toll_segments(self, segments: List[TollSegment]):
+        self.toll_segments = list(segments)
+        self.toll_rates = {(s.from_location, s.to_location): s.rate_per_mile for s in self.toll_segments}
+        self._segment_lookup = {}
+        for segment in self.toll_segments:
+            key = (normalize_location(segment.from_location), normalize_location(segment.to_location))
+            self._segment_lookup[key] = segment
+        self._toll_costs = None
+    
+    def set_distance_matrix(self, distance_matrix: DistanceMatrix, locations: Optional[List[Location]] = None):
+        # locations let city-level toll rates apply to every stop in that city
         self.distance_matrix = distance_matrix
+        if locations is not None:
+            self.locations = list(locations)
+        self._toll_index = None
+        self._toll_costs = None
+    
+    @property
+    def toll_index(self) -> Optional[TollIndex]:
+        if self._toll_index is None and self.distance_matrix is not None:
+            self._toll_index = TollIndex(self.distance_matrix, self.locations)
+        return self._toll_index
     
     def calculate_distance_cost(self, from_location: str, to_location: str, 
                                vehicle: Vehicle) -> float:
@@ -36,87 +68,121 @@ class CostCalculator:
         return travel_time * vehicle.cost_per_hour
     
     def calculate_toll_cost(self, from_location: str, to_location: str) -> float:
-        toll_key = (from_location, to_location)
-        reverse_key = (to_location, from_location)
-        
-        if toll_key in self.toll_rates:
-            distance = self._get_distance(from_location, to_location)
-            return distance * self.toll_rates[toll_key]
-        elif reverse_key in self.toll_rates:
-            distance = self._get_distance(from_location, to_location)
-            return distance * self.toll_rates[reverse_key]
-        else:
-            distance = self._get_distance(from_location, to_location)
+        matrix = self.distance_matrix
+        if matrix and from_location in matrix and to_location in matrix:
+            return float(self._toll_cost_array()[matrix.index[from_location], matrix.index[to_location]])
+        distance = self._get_distance(from_location, to_location)
+        return self._segment_toll_cost(from_location, to_location, distance)
+    
+    def arc_toll_costs(self, names: List[str], distances: np.ndarray) -> np.ndarray:
+        # (n, n) toll cost of each arc between names, gathered from the per-arc toll index; names outside
+        # the distance matrix pay the default rate on the given distances
+        tolls = np.asarray(distances, dtype=np.float64) * self.default_toll_rate
+        matrix = self.distance_matrix
+        if matrix is not None:
+            index = matrix.indices(names)
+            rows = np.flatnonzero(index >= 0)
+            if len(rows):
+                tolls[np.ix_(rows, rows)] = self._toll_cost_array()[np.ix_(index[rows], index[rows])]
+        np.fill_diagonal(tolls, 0.0)
+        return tolls
+    
+    def _segment_toll_cost(self, from_location: str, to_location: str, distance: float) -> float:
+        a, b = normalize_location(from_location), normalize_location(to_location)
+        segment = self._segment_lookup.get((a, b)) or self._segment_lookup.get((b, a))
+        if segment is None:
             return distance * self.default_toll_rate
+        return distance * segment.rate_per_mile + (segment.flat_rate or 0.0)
     
     def calculate_handling_cost(self, num_pallets: int) -> float:
         return num_pallets * self.warehouse_handling_cost
     
     def calculate_route_cost(self, route: Route, vehicle: Vehicle, 
                            stores: List[Store]) -> CostBreakdown:
-        total_fuel_cost = 0.0
-        total_driver_cost = 0.0
-        total_toll_cost = 0.0
-        total_distance = 0.0
-        total_time = 0.0
-        
-        # Calculate costs for each segment of the route
-        for i in range(len(route.stops) - 1):
-            from_stop = route.stops[i]
-            to_stop = route.stops[i + 1]
-            
-            # Distance and time
-            distance = self._get_distance(from_stop, to_stop)
-            travel_time = self._get_travel_time(from_stop, to_stop)
-            
-            total_distance += distance
-            total_time += travel_time
-            
-            # Fuel cost
-            total_fuel_cost += distance * self.fuel_cost_per_mile
-            
-            # Driver cost
-            total_driver_cost += travel_time * self.driver_cost_per_hour
-            
-            # Toll cost
-            total_toll_cost += self.calculate_toll_cost(from_stop, to_stop)
-        
-        # Handling cost
-        handling_cost = self.calculate_handling_cost(route.pallets_delivered)
-        
-        total_cost = total_fuel_cost + total_driver_cost + total_toll_cost + handling_cost
-        
-        cost_breakdown = CostBreakdown(
-            fuel_cost=total_fuel_cost,
-            driver_cost=total_driver_cost,
-            toll_cost=total_toll_cost,
-            handling_cost=handling_cost,
-            total_cost=total_cost,
-            cost_per_pallet=total_cost / max(route.pallets_delivered, 1),
-            cost_per_mile=total_cost / max(total_distance, 1)
-        )
-        
-        return cost_breakdown
+        return self.calculate_route_costs([route])[0]
+    
+    def calculate_route_costs(self, routes: List[Route]) -> List[CostBreakdown]:
+        # Routes whose stops are all in the distance matrix are summed in one gather;
+        # any others fall back to segment-by-segment lookups
+        distances = np.zeros(len(routes))
+        times = np.zeros(len(routes))
+        tolls = np.zeros(len(routes))
+        
+        matrix = self.distance_matrix
+        batched = [r for r, route in enumerate(routes)
+                   if matrix and all(stop in matrix for stop in route.stops)]
+        if batched:
+            sequences = [matrix.indices(routes[r].stops) for r in batched]
+            distances[batched] = matrix.route_distances(sequences)
+            times[batched] = matrix.route_times(sequences)
+            tolls[batched] = matrix.route_sums(self._toll_cost_array(), sequences)
+        
+        for r in sorted(set(range(len(routes))) - set(batched)):
+            stops = routes[r].stops
+            for from_stop, to_stop in zip(stops[:-1], stops[1:]):
+                distance = self._get_distance(from_stop, to_stop)
+                distances[r] += distance
+                times[r] += self._get_travel_time(from_stop, to_stop)
+                tolls[r] += self._segment_toll_cost(from_stop, to_stop, distance)
+        
+        pallets = np.array([route.pallets_delivered for route in routes], dtype=np.float64)
+        return self.cost_breakdowns(distances, times, tolls, pallets)
+    
+    def cost_breakdowns(self, distances: np.ndarray, times: np.ndarray, tolls: np.ndarray,
+                        pallets: np.ndarray) -> List[CostBreakdown]:
+        # Per-route totals (miles, hours, toll cost, pallets) to cost breakdowns, all routes at once
+        fuel = distances * self.fuel_cost_per_mile
+        driver = times * self.driver_cost_per_hour
+        handling = pallets * self.warehouse_handling_cost
+        total = fuel + driver + tolls + handling
+        per_pallet = total / np.maximum(pallets, 1)
+        per_mile = total / np.maximum(distances, 1)
+        return [
+            CostBreakdown(fuel_cost=f, driver_cost=d, toll_cost=t, handling_cost=h, total_cost=c,
+                          cost_per_pallet=p, cost_per_mile=m)
+            for f, d, t, h, c, p, m in zip(fuel.tolist(), driver.tolist(), tolls.tolist(), handling.tolist(),
+                                           total.tolist(), per_pallet.tolist(), per_mile.tolist())
+        ]
     
     def calculate_supplier_assignment_cost(self, store: Store, supplier: Supplier) -> float:
-        base_cost = supplier.cost_per_pallet * store.demand_pallets
+        return float(self.supplier_cost_matrix([store], [supplier])[0, 0])
+    
+    def supplier_cost_matrix(self, stores: List[Store], suppliers: List[Supplier]) -> np.ndarray:
+        # (stores, suppliers) cost of serving each store's whole demand from each supplier
+        distances = distance_matrix_array(
+            [(store.location.latitude, store.location.longitude) for store in stores],
+            [(supplier.location.latitude, supplier.location.longitude) for supplier in suppliers],
+            method='vincenty'
+        )
+        return self.supplier_costs(
+            demand=np.array([store.demand_pallets for store in stores], dtype=np.float64),
+            cost_per_pallet=np.array([supplier.cost_per_pallet for supplier in suppliers], dtype=np.float64),
+            reliability_score=np.array([supplier.reliability_score for supplier in suppliers], dtype=np.float64),
+            priority=np.array([store.priority for store in stores], dtype=np.float64),
+            distances=distances
+        )
+    
+    def supplier_costs(self, demand: np.ndarray, cost_per_pallet: np.ndarray, reliability_score: np.ndarray,
+                       priority: np.ndarray, distances: np.ndarray) -> np.ndarray:
+        # Store arrays broadcast down the rows, supplier arrays across the columns
+        base_cost = demand[:, None] * cost_per_pallet[None, :]
         
         # Add distance-based transportation cost estimate
-        distance = calculate_distance(
-            store.location.latitude, store.location.longitude,
-            supplier.location.latitude, supplier.location.longitude
-        )
-        transportation_cost = distance * self.fuel_cost_per_mile * 0.5  # Estimate
+        transportation_cost = distances * self.fuel_cost_per_mile * 0.5  # Estimate
         
         # Reliability penalty
-        reliability_penalty = (1.0 - supplier.reliability_score) * base_cost * 0.1
+        reliability_penalty = (1.0 - reliability_score)[None, :] * base_cost * 0.1
         
         # Priority bonus/penalty
-        priority_factor = 1.0 + (store.priority - 1) * 0.05
-        
-        total_cost = (base_cost + transportation_cost + reliability_penalty) * priority_factor
+        priority_factor = 1.0 + (priority - 1) * 0.05
         
-        return total_cost
+        return (base_cost + transportation_cost + reliability_penalty) * priority_factor[:, None]
+    
+    def supplier_unit_costs(self, stores: List[Store], suppliers: List[Supplier]) -> np.ndarray:
+        # Cost per pallet; the trip estimate is spread over the store's demand, so a store served
+        # whole by one supplier costs exactly calculate_supplier_assignment_cost
+        demand = np.array([max(store.demand_pallets, 1) for store in stores], dtype=np.float64)
+        return self.supplier_cost_matrix(stores, suppliers) / demand[:, None]
     
     def calculate_consolidation_savings(self, routes: List[Route], 
                                       stores: List[Store]) -> Dict[str, float]:
@@ -164,21 +230,26 @@ class CostCalculator:
         
         return metrics
     
+    def _toll_cost_array(self) -> np.ndarray:
+        if self._toll_costs is None:
+            self._toll_costs = self.toll_index.toll_costs(self.toll_segments, self.default_toll_rate)
+        return self._toll_costs
+    
     def _get_distance(self, from_location: str, to_location: str) -> float:
         if self.distance_matrix:
-            key = (from_location, to_location)
-            if key in self.distance_matrix.distances:
-                return self.distance_matrix.distances[key]
+            distance = self.distance_matrix.distance(from_location, to_location)
+            if distance is not None:
+                return distance
         
         # Default estimation if no distance matrix available
         return 50.0  # Default 50 miles
     
     def _get_travel_time(self, from_location: str, to_location: str) -> float:
         if self.distance_matrix:
-            key = (from_location, to_location)
-            if key in self.distance_matrix.travel_times:
-                return self.distance_matrix.travel_times[key]
+            travel_time = self.distance_matrix.travel_time(from_location, to_location)
+            if travel_time is not None:
+                return travel_time
         
         # Default estimation: distance / average speed
         distance = self._get_distance(from_location, to_location)
-        return distance / 55.0  # 55 mph average speed
\ No newline at end of file
+        return distance / self.avg_speed_mph
\ No newline at end of file
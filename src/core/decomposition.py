@@ -0,0 +1,165 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from data.models import Store, Vehicle
+from utils.geo_utils import EARTH_RADIUS_MILES, CoordinateArray, to_coordinate_array
+
+
+# Headroom on the per-cluster pallet limit so k-means is not forced into awkward splits
+CLUSTER_CAPACITY_SLACK = 0.15
+
+
+@dataclass
+class ClusterPlan:
+    depot: Tuple[float, float]
+    stores: List[Store] = field(default_factory=list)
+    vehicles: List[Vehicle] = field(default_factory=list)
+    
+    @property
+    def demand(self) -> int:
+        return sum(store.demand_pallets for store in self.stores)
+    
+    @property
+    def capacity(self) -> int:
+        return sum(vehicle.max_pallets for vehicle in self.vehicles)
+
+
+def project_coordinates(coordinates: CoordinateArray) -> np.ndarray:
+    # Equirectangular projection to miles; good enough for clustering within a country
+    coords = np.radians(to_coordinate_array(coordinates))
+    if len(coords) == 0:
+        return np.zeros((0, 2))
+    mean_lat = coords[:, 0].mean()
+    return np.column_stack((
+        coords[:, 0] * EARTH_RADIUS_MILES,
+        coords[:, 1] * np.cos(mean_lat) * EARTH_RADIUS_MILES,
+    ))
+
+
+def assign_by_cost(costs: np.ndarray, demands: np.ndarray,
+                   capacities: Union[float, np.ndarray]) -> np.ndarray:
+    # costs is (points, targets); points with the most to lose from missing their best target choose first
+    capacities = np.broadcast_to(np.asarray(capacities, dtype=float), (costs.shape[1],))
+    preference = np.argsort(costs, axis=1)
+    if costs.shape[1] > 1:
+        ordered = np.take_along_axis(costs, preference[:, :2], axis=1)
+        regret = ordered[:, 1] - ordered[:, 0]
+    else:
+        regret = np.zeros(len(costs))
+    
+    labels = np.empty(len(costs), dtype=np.intp)
+    load = np.zeros(costs.shape[1])
+    for p in np.lexsort((-demands, -regret)):
+        for c in preference[p]:
+            if load[c] + demands[p] <= capacities[c]:
+                break
+        else:
+            # Nothing has room left; overflow into the target with the most room
+            c = int(np.argmax(capacities - load))
+        labels[p] = c
+        load[c] += demands[p]
+    return labels
+
+
+def capacitated_assignment(points: np.ndarray, demands: np.ndarray, centers: np.ndarray,
+                           capacity: float) -> np.ndarray:
+    distances = np.linalg.norm(points[:, None, :] - centers[None, :, :], axis=2)
+    return assign_by_cost(distances, demands, capacity)
+
+
+def capacity_kmeans(points: np.ndarray, demands: np.ndarray, n_clusters: int,
+                    capacity: float, seeds: Optional[np.ndarray] = None,
+                    rng: Optional[np.random.Generator] = None,
+                    max_iter: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+    rng = rng or np.random.default_rng(0)
+    n_clusters = max(1, min(n_clusters, len(points)))
+    
+    # k-means++ seeding, starting from any fixed seeds (e.g. depots)
+    centers = [] if seeds is None else [np.asarray(seed, dtype=float) for seed in seeds[:n_clusters]]
+    if not centers:
+        centers.append(points[rng.integers(len(points))])
+    while len(centers) < n_clusters:
+        nearest = np.min(np.linalg.norm(points[:, None, :] - np.array(centers)[None, :, :], axis=2), axis=1)
+        weights = nearest ** 2
+        total = weights.sum()
+        index = rng.choice(len(points), p=weights / total) if total > 0 else rng.integers(len(points))
+        centers.append(points[index])
+    centers = np.array(centers, dtype=float)
+    
+    labels = None
+    for _ in range(max_iter):
+        new_labels = capacitated_assignment(points, demands, centers, capacity)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        for c in range(n_clusters):
+            members = labels == c
+            if members.any():
+                centers[c] = points[members].mean(axis=0)
+    
+    return labels, centers
+
+
+def vehicle_depot(vehicle: Vehicle, default_depot: Tuple[float, float]) -> Tuple[float, float]:
+    if vehicle.current_location is None:
+        return tuple(default_depot)
+    return (round(vehicle.current_location.latitude, 6), round(vehicle.current_location.longitude, 6))
+
+
+def plan_clusters(stores: Sequence[Store], vehicles: Sequence[Vehicle],
+                  default_depot: Tuple[float, float], max_cluster_stores: int = 60,
+                  seed: int = 0) -> List[ClusterPlan]:
+    # Stores go to their nearest depot whose trucks still have room, then each depot's share is
+    # split into capacity-balanced clusters, each with its own trucks from that depot
+    if not stores:
+        return []
+    if not vehicles:
+        raise ValueError("Decomposition needs at least one available vehicle")
+    
+    fleets: Dict[Tuple[float, float], List[Vehicle]] = {}
+    for vehicle in sorted(vehicles, key=lambda v: -v.max_pallets):
+        fleets.setdefault(vehicle_depot(vehicle, default_depot), []).append(vehicle)
+    depots = list(fleets)
+    
+    store_coords = [(store.location.latitude, store.location.longitude) for store in stores]
+    projected = project_coordinates(store_coords + depots)
+    points, depot_points = projected[:len(stores)], projected[len(stores):]
+    demands = np.array([store.demand_pallets for store in stores], dtype=float)
+    
+    # Depots nobody is near end up with no stores and so no clusters
+    fleet_capacity = np.array([sum(v.max_pallets for v in fleets[depot]) for depot in depots], dtype=float)
+    depot_labels = capacitated_assignment(points, demands, depot_points, fleet_capacity)
+    
+    rng = np.random.default_rng(seed)
+    plans: List[ClusterPlan] = []
+    for d, depot in enumerate(depots):
+        members = np.flatnonzero(depot_labels == d)
+        if not len(members):
+            continue
+        
+        # A cluster holds a balanced share of the depot's demand, but never more than the whole
+        # trucks it can be given from the depot's fleet
+        local = demands[members]
+        n_clusters = max(min(int(np.ceil(len(members) / max_cluster_stores)), len(fleets[depot])), 1)
+        truck_share = fleet_capacity[d] * (len(fleets[depot]) // n_clusters) / len(fleets[depot])
+        capacity = max(min(local.sum() / n_clusters * (1 + CLUSTER_CAPACITY_SLACK), truck_share), local.max())
+        labels, centers = capacity_kmeans(points[members], local, n_clusters, capacity,
+                                          seeds=depot_points[d:d + 1], rng=rng)
+        
+        # Heaviest clusters take trucks first, until their demand is covered
+        local_plans = [ClusterPlan(depot=depot, stores=[stores[i] for i in members[labels == c]])
+                       for c in range(len(centers)) if (labels == c).any()]
+        remaining = list(fleets[depot])
+        for plan in sorted(local_plans, key=lambda plan: -plan.demand):
+            while remaining and plan.capacity < plan.demand:
+                plan.vehicles.append(remaining.pop(0))
+        
+        # Spare trucks go, one at a time, to the cluster with the least headroom
+        for vehicle in remaining:
+            headroom = min(local_plans, key=lambda plan: (plan.capacity - plan.demand) / max(plan.demand, 1))
+            headroom.vehicles.append(vehicle)
+        plans.extend(local_plans)
+    
+    return plans
@@ -0,0 +1,248 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import pulp
+
+from core.decomposition import assign_by_cost
+from core.model_builder import ModelBuilder
+from utils.geo_utils import (
+    CoordinateArray, SpatialIndex, chord_to_miles, distance_matrix_array, point_weights,
+    to_coordinate_array, to_lat_lon, unit_vectors, weiszfeld
+)
+
+
+MAX_ALTERNATIONS = 100
+MAX_INTERCHANGE_ROUNDS = 20
+# The exact MIP is only tried when (candidate sites x stores) stays below this
+MIP_MAX_PAIRS = 20_000
+# Candidate rows per thread when building the (sites, stores) distance matrix
+CANDIDATE_BLOCK = 64
+
+
+@dataclass
+class FacilityPlan:
+    sites: np.ndarray  # (p, 2) latitude/longitude of each open facility
+    assignment: np.ndarray  # store -> index into sites
+    cost: float  # weighted great-circle miles from every store to its facility
+    loads: np.ndarray  # weight served by each site
+    method: str
+    iterations: int = 0
+    candidate_indices: Optional[np.ndarray] = None  # chosen rows of the candidate list, when one was given
+    stats: Dict = field(default_factory=dict)
+
+
+def evaluate_candidate_sites(coordinates: CoordinateArray, candidates: CoordinateArray,
+                             weights: Optional[Sequence[float]] = None,
+                             workers: Optional[int] = None) -> np.ndarray:
+    # Weighted miles to serve every store from each candidate site on its own
+    distances = candidate_distances(coordinates, candidates, workers)
+    return distances @ point_weights(weights, distances.shape[1])
+
+
+def candidate_distances(coordinates: CoordinateArray, candidates: CoordinateArray,
+                        workers: Optional[int] = None) -> np.ndarray:
+    # (sites, stores) great-circle miles, blocks of candidate rows computed in parallel threads
+    stores = to_coordinate_array(coordinates)
+    sites = to_coordinate_array(candidates)
+    out = np.empty((len(sites), len(stores)))
+    blocks = [slice(start, min(start + CANDIDATE_BLOCK, len(sites)))
+              for start in range(0, len(sites), CANDIDATE_BLOCK)]
+    
+    def fill(block: slice):
+        distance_matrix_array(sites[block], stores, out=out[block])
+    
+    workers = min(workers or os.cpu_count() or 1, max(len(blocks), 1))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(fill, blocks))
+    else:
+        for block in blocks:
+            fill(block)
+    return out
+
+
+def locate_facilities(coordinates: CoordinateArray, p: int = 1, weights: Optional[Sequence[float]] = None,
+                      candidates: Optional[CoordinateArray] = None,
+                      capacities: Optional[Union[float, Sequence[float]]] = None,
+                      method: str = 'auto', starts: int = 5, seed: int = 0,
+                      workers: Optional[int] = None, time_limit: float = 60.0) -> FacilityPlan:
+    """Place p facilities to minimize weighted store-to-facility miles.
+    
+    Without candidates the sites are free points (alternating assignment and Weiszfeld steps).
+    With candidates they are chosen from that list: greedy plus interchange, then the MIP when
+    method is 'mip', or 'auto' and the instance is small enough. capacities cap the weight per site.
+    """
+    if method not in ('auto', 'heuristic', 'mip'):
+        raise ValueError(f"Unknown facility location method '{method}'. Options: auto, heuristic, mip")
+    coords = to_coordinate_array(coordinates)
+    if len(coords) == 0:
+        raise ValueError("Facility location needs at least one store")
+    weights = point_weights(weights, len(coords))
+    
+    if candidates is None:
+        if method == 'mip':
+            raise ValueError("The MIP needs a list of candidate sites")
+        return _continuous_p_median(coords, weights, p, capacities, starts, seed)
+    
+    sites = to_coordinate_array(candidates)
+    if not 1 <= p <= len(sites):
+        raise ValueError(f"Cannot open {p} facilities from {len(sites)} candidate sites")
+    distances = candidate_distances(coords, sites, workers)
+    site_capacities = None if capacities is None else np.broadcast_to(
+        np.asarray(capacities, dtype=np.float64), (len(sites),))
+    if site_capacities is not None and np.sort(site_capacities)[-p:].sum() < weights.sum():
+        raise ValueError("The largest candidate sites cannot serve the total demand")
+    
+    plan = _discrete_p_median(distances, weights, p, site_capacities)
+    if method == 'mip' or (method == 'auto' and distances.size <= MIP_MAX_PAIRS):
+        exact = _facility_mip(distances, weights, p, site_capacities, time_limit, plan)
+        if exact is not None and exact.cost < plan.cost - 1e-6:
+            plan = exact
+    plan.sites = sites[plan.candidate_indices]
+    return plan
+
+
+def _continuous_p_median(coords: np.ndarray, weights: np.ndarray, p: int,
+                         capacities: Optional[Union[float, Sequence[float]]], starts: int,
+                         seed: int) -> FacilityPlan:
+    points = unit_vectors(coords)
+    p = max(1, min(p, len(points)))
+    limits = None if capacities is None else np.broadcast_to(np.asarray(capacities, dtype=np.float64), (p,))
+    if limits is not None and limits.sum() < weights.sum():
+        raise ValueError("Facility capacities cannot serve the total demand")
+    
+    rng = np.random.default_rng(seed)
+    best = None
+    for start in range(max(starts, 1) if p > 1 else 1):
+        centers = _seed_centers(points, weights, p, rng)
+        labels = None
+        iterations = 0
+        for _ in range(MAX_ALTERNATIONS):
+            new_labels = _assign(points, weights, centers, limits)
+            if labels is not None and np.array_equal(labels, new_labels):
+                break
+            labels = new_labels
+            centers, steps = weiszfeld(points, weights, labels, centers)
+            iterations += steps
+        
+        cost = float(weights @ chord_to_miles(np.linalg.norm(points - centers[labels], axis=1)))
+        if best is None or cost < best[0]:
+            best = (cost, centers, labels, iterations)
+    
+    cost, centers, labels, iterations = best
+    return FacilityPlan(sites=to_lat_lon(centers), assignment=labels, cost=cost,
+                        loads=np.bincount(labels, weights=weights, minlength=p), method='weiszfeld',
+                        iterations=iterations)
+
+
+def _seed_centers(points: np.ndarray, weights: np.ndarray, p: int, rng: np.random.Generator) -> np.ndarray:
+    # Weighted k-means++: far-away heavy stores are likely seeds
+    centers = [points[rng.choice(len(points), p=weights / weights.sum())]]
+    nearest = np.linalg.norm(points - centers[0], axis=1)
+    while len(centers) < p:
+        score = weights * nearest ** 2
+        index = rng.choice(len(points), p=score / score.sum()) if score.sum() > 0 else rng.integers(len(points))
+        centers.append(points[index])
+        nearest = np.minimum(nearest, np.linalg.norm(points - points[index], axis=1))
+    return np.array(centers)
+
+
+def _assign(points: np.ndarray, weights: np.ndarray, centers: np.ndarray,
+            limits: Optional[np.ndarray]) -> np.ndarray:
+    if limits is None:
+        index = SpatialIndex(to_lat_lon(centers))
+        return index.query(to_lat_lon(points), 1)[1][:, 0]
+    costs = np.linalg.norm(points[:, None, :] - centers[None, :, :], axis=2)
+    return assign_by_cost(costs, weights, limits)
+
+
+def _discrete_p_median(distances: np.ndarray, weights: np.ndarray, p: int,
+                       capacities: Optional[np.ndarray]) -> FacilityPlan:
+    # Greedy opening, then swaps of an open site for a closed one while the total improves (Teitz-Bart)
+    m = len(distances)
+    open_sites = []
+    nearest = np.full(distances.shape[1], np.inf)
+    for _ in range(p):
+        totals = np.minimum(distances, nearest[None, :]) @ weights
+        totals[open_sites] = np.inf
+        best = int(np.argmin(totals))
+        open_sites.append(best)
+        nearest = np.minimum(nearest, distances[best])
+    
+    def total(sites):
+        return float(weights @ distances[sites].min(axis=0))
+    
+    cost = total(open_sites)
+    rounds = 0
+    improved = True
+    while improved and rounds < MAX_INTERCHANGE_ROUNDS:
+        improved = False
+        rounds += 1
+        for k in range(p):
+            others = open_sites[:k] + open_sites[k + 1:]
+            rest = distances[others].min(axis=0) if others else np.full(distances.shape[1], np.inf)
+            # Every closed site tried in place of open_sites[k] in one pass
+            swap_costs = np.minimum(distances, rest[None, :]) @ weights
+            swap_costs[open_sites] = np.inf
+            candidate = int(np.argmin(swap_costs))
+            if swap_costs[candidate] < cost - 1e-9:
+                open_sites[k] = candidate
+                cost = float(swap_costs[candidate])
+                improved = True
+    
+    chosen = np.array(sorted(open_sites), dtype=np.intp)
+    if capacities is None:
+        labels = np.argmin(distances[chosen], axis=0)
+    else:
+        labels = assign_by_cost(distances[chosen].T, weights, capacities[chosen])
+    cost = float(weights @ distances[chosen[labels], np.arange(len(labels))])
+    return FacilityPlan(sites=np.empty((0, 2)), assignment=labels, cost=cost,
+                        loads=np.bincount(labels, weights=weights, minlength=len(chosen)),
+                        method='interchange', iterations=rounds, candidate_indices=chosen,
+                        stats={'candidates': m})
+
+
+def _facility_mip(distances: np.ndarray, weights: np.ndarray, p: int, capacities: Optional[np.ndarray],
+                  time_limit: float, incumbent: FacilityPlan) -> Optional[FacilityPlan]:
+    # p-median / capacitated facility location; with capacities a store's demand may be split across sites
+    m, n = distances.shape
+    started = time.time()
+    builder = ModelBuilder("Facility_Location")
+    sites = list(range(m))
+    pairs = [(j, i) for j in sites for i in range(n)]
+    y = builder.binary_variables("y", sites)
+    x = builder.continuous_variables("x", pairs, low_bound=0, up_bound=1)
+    builder.set_objective(x, {(j, i): float(distances[j, i] * weights[i]) for j, i in pairs})
+    
+    builder.add_constraint(((y[j], 1) for j in sites), '==', p, name="open_sites")
+    for i in range(n):
+        builder.add_constraint(((x[j, i], 1) for j in sites), '==', 1, name=f"serve_{i}")
+    for j, i in pairs:
+        builder.add_constraint([(x[j, i], 1), (y[j], -1)], '<=', 0)
+    if capacities is not None:
+        for j in sites:
+            builder.add_constraint([(x[j, i], float(weights[i])) for i in range(n)] + [(y[j], -float(capacities[j]))],
+                                   '<=', 0, name=f"capacity_{j}")
+    
+    # Warm start from the heuristic's sites
+    chosen = set(incumbent.candidate_indices.tolist())
+    for j in sites:
+        y[j].setInitialValue(1 if j in chosen else 0)
+    prob = builder.finish()
+    prob.solve(pulp.PULP_CBC_CMD(msg=0, timeLimit=max(time_limit, 1), warmStart=True))
+    if prob.status != pulp.LpStatusOptimal and pulp.value(prob.objective) is None:
+        return None
+    
+    opened = np.array([j for j in sites if (y[j].value() or 0) > 0.5], dtype=np.intp)
+    if len(opened) != p:
+        return None
+    shares = np.array([[x[j, i].value() or 0.0 for i in range(n)] for j in opened])
+    labels = np.argmax(shares, axis=0)
+    return FacilityPlan(sites=np.empty((0, 2)), assignment=labels, cost=float(pulp.value(prob.objective)),
+                        loads=shares @ weights, method='mip', candidate_indices=opened,
+                        stats={'status': pulp.LpStatus[prob.status], 'solve_time': time.time() - started,
+                               'split_stores': int(((shares > 1e-6).sum(axis=0) > 1).sum())})
@@ -0,0 +1,607 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.constraints import ConstraintEngine
+from core.time_windows import TimeWindows
+
+
+EPSILON = 1e-9
+
+# Above this many customers the savings list is restricted to each customer's nearest neighbours
+SAVINGS_FULL_PAIRS_LIMIT = 300
+
+# With time windows, improving 2-opt moves are checked best-first up to this many per pass
+TWO_OPT_TW_CANDIDATES = 25
+
+
+@dataclass
+class RoutingProblem:
+    costs: np.ndarray  # (n + 1, n + 1) arc costs, index 0 is the depot
+    demands: np.ndarray  # (n + 1,) pallets per location, demands[0] == 0
+    capacity: int
+    coordinates: Optional[np.ndarray] = None  # (n + 1, 2) lat/lon, used by the sweep constructor
+    neighbors: int = 10
+    travel_times: Optional[np.ndarray] = None  # (n + 1, n + 1) hours, required with time_windows
+    time_windows: Optional[TimeWindows] = None
+    constraints: Optional[ConstraintEngine] = None  # route distance / driver hours limits
+    
+    @property
+    def n_customers(self) -> int:
+        return len(self.demands) - 1
+    
+    def servable(self) -> List[int]:
+        servable = self.demands[1:] <= self.capacity
+        if self.time_windows is not None:
+            # The out-and-back trip must itself meet the window
+            tw = self.time_windows
+            reach = tw.earliest[0] + tw.service[0] + self.travel_times[0, 1:]
+            start = np.maximum(reach, tw.earliest[1:])
+            back = start + tw.service[1:] + self.travel_times[1:, 0]
+            servable &= (start <= tw.latest[1:] + EPSILON) & (back <= tw.latest[0] + EPSILON)
+        if self.constraints is not None:
+            servable &= self.constraints.reachable(np.zeros(4), 0)[1:]
+        return [int(c) for c in np.flatnonzero(servable) + 1]
+    
+    def is_feasible(self, route: Sequence[int]) -> bool:
+        if int(self.demands[list(route)].sum()) > self.capacity:
+            return False
+        path = [0] + list(route) + [0]
+        if self.constraints is not None and not self.constraints.within(self.constraints.path_totals(path)):
+            return False
+        if self.time_windows is None:
+            return True
+        return self.time_windows.is_feasible(path, self.travel_times)
+    
+    def neighbor_lists(self) -> np.ndarray:
+        # k nearest customers of every location by symmetric arc cost (row 0 unused)
+        n = len(self.demands)
+        k = max(1, min(self.neighbors, n - 2))
+        if n <= 2:
+            return np.zeros((n, 0), dtype=np.intp)
+        closeness = self.costs + self.costs.T
+        closeness[:, 0] = np.inf
+        np.fill_diagonal(closeness, np.inf)
+        nearest = np.argpartition(closeness, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(closeness, nearest, axis=1).argsort(axis=1)
+        return np.take_along_axis(nearest, order, axis=1)
+
+
+def route_cost(costs: np.ndarray, route: Sequence[int]) -> float:
+    if not route:
+        return 0.0
+    path = np.concatenate(([0], route, [0]))
+    return float(costs[path[:-1], path[1:]].sum())
+
+
+def solution_cost(costs: np.ndarray, routes: Sequence[Sequence[int]]) -> float:
+    return sum(route_cost(costs, route) for route in routes)
+
+
+def savings_construction(problem: RoutingProblem, rng: np.random.Generator,
+                         noise: float = 0.0) -> List[List[int]]:
+    # Clarke-Wright parallel savings; merges route ending at i with route starting at j
+    costs = problem.costs
+    customers = np.array(problem.servable(), dtype=np.intp)
+    if len(customers) == 0:
+        return []
+    
+    if len(customers) <= SAVINGS_FULL_PAIRS_LIMIT:
+        tails = np.repeat(customers, len(customers))
+        heads = np.tile(customers, len(customers))
+    else:
+        nearest = problem.neighbor_lists()[customers]
+        tails = np.repeat(customers, nearest.shape[1])
+        heads = nearest.ravel()
+    keep = (tails != heads) & (problem.demands[heads] <= problem.capacity)
+    tails, heads = tails[keep], heads[keep]
+    
+    savings = costs[tails, 0] + costs[0, heads] - costs[tails, heads]
+    if noise > 0:
+        savings = savings * (1.0 + noise * rng.uniform(-1.0, 1.0, size=len(savings)))
+    order = np.argsort(-savings, kind='stable')
+    order = order[savings[order] > 0]
+    
+    route_of = {int(c): int(c) for c in customers}
+    routes = {int(c): [int(c)] for c in customers}
+    loads = {int(c): int(problem.demands[c]) for c in customers}
+    tw = problem.time_windows
+    if tw is not None:
+        times = problem.travel_times
+        depot = tw.node(0)
+        segments = {int(c): tw.node(int(c)) for c in customers}
+    engine = problem.constraints
+    if engine is not None:
+        used = {int(c): engine.path_totals([0, int(c), 0]) for c in customers}
+    
+    for i, j in zip(tails[order].tolist(), heads[order].tolist()):
+        ri, rj = route_of[i], route_of[j]
+        if ri == rj or routes[ri][-1] != i or routes[rj][0] != j:
+            continue
+        if loads[ri] + loads[rj] > problem.capacity:
+            continue
+        if engine is not None:
+            merged_use = used[ri] + used[rj] - engine.arc(i, 0) - engine.arc(0, j) + engine.arc(i, j)
+            if not engine.within(merged_use):
+                continue
+        if tw is not None:
+            merged = tw.concat(segments[ri], segments[rj], times)
+            if tw.concat(tw.concat(depot, merged, times), depot, times)[3] > EPSILON:
+                continue
+            segments[ri] = merged
+            del segments[rj]
+        if engine is not None:
+            used[ri] = merged_use
+            del used[rj]
+        for c in routes[rj]:
+            route_of[c] = ri
+        routes[ri].extend(routes.pop(rj))
+        loads[ri] += loads.pop(rj)
+    
+    return list(routes.values())
+
+
+def sweep_construction(problem: RoutingProblem, rng: np.random.Generator,
+                       noise: float = 0.0) -> List[List[int]]:
+    if problem.coordinates is None:
+        return nearest_neighbor_construction(problem, rng, noise)
+    
+    customers = np.array(problem.servable(), dtype=np.intp)
+    if len(customers) == 0:
+        return []
+    
+    depot = problem.coordinates[0]
+    offsets = problem.coordinates[customers] - depot
+    angles = np.arctan2(offsets[:, 0], offsets[:, 1])
+    start_angle = rng.uniform(-np.pi, np.pi) if noise > 0 else -np.pi
+    order = customers[np.argsort((angles - start_angle) % (2 * np.pi), kind='stable')]
+    
+    if problem.time_windows is not None or problem.constraints is not None:
+        return _sweep_by_insertion(problem, order.tolist())
+    
+    routes, current, load = [], [], 0
+    for c in order.tolist():
+        demand = int(problem.demands[c])
+        if current and load + demand > problem.capacity:
+            routes.append(current)
+            current, load = [], 0
+        current.append(c)
+        load += demand
+    if current:
+        routes.append(current)
+    
+    # Order each sector by nearest neighbour; 2-opt finishes the job
+    return [_nearest_neighbor_order(problem.costs, route) for route in routes]
+
+
+def _sweep_by_insertion(problem: RoutingProblem, order: List[int]) -> List[List[int]]:
+    # Each customer goes to its cheapest feasible position in the open route, else starts a new one
+    tw, times, costs = problem.time_windows, problem.travel_times, problem.costs
+    engine = problem.constraints
+    routes, path, load = [], [0, 0], 0
+    used = np.zeros(4)
+    for c in order:
+        demand = int(problem.demands[c])
+        best = None
+        if load + demand <= problem.capacity:
+            if tw is not None:
+                prefixes = tw.prefixes(path, times)
+                suffixes = tw.suffixes(path, times)
+                node = tw.node(c)
+            for q in range(len(path) - 1):
+                a, b = path[q], path[q + 1]
+                delta = costs[a, c] + costs[c, b] - costs[a, b]
+                if best is not None and delta >= best[0]:
+                    continue
+                if engine is not None:
+                    inserted = used + engine.arc(a, c) + engine.arc(c, b) - engine.arc(a, b)
+                    if not engine.within(inserted):
+                        continue
+                if tw is None or tw.concat(tw.concat(prefixes[q], node, times), suffixes[q + 1], times)[3] <= EPSILON:
+                    best = (delta, q)
+        if best is None:
+            if len(path) > 2:
+                routes.append(path[1:-1])
+            path, load = [0, c, 0], demand
+        else:
+            path.insert(best[1] + 1, c)
+            load += demand
+        if engine is not None:
+            used = engine.path_totals(path)
+    if len(path) > 2:
+        routes.append(path[1:-1])
+    return routes
+
+
+def nearest_neighbor_construction(problem: RoutingProblem, rng: np.random.Generator,
+                                  noise: float = 0.0) -> List[List[int]]:
+    # With noise, pick randomly among the few nearest feasible candidates
+    costs = problem.costs
+    demands = problem.demands
+    unvisited = np.zeros(len(demands), dtype=bool)
+    unvisited[problem.servable()] = True
+    width = 3 if noise > 0 else 1
+    tw = problem.time_windows
+    engine = problem.constraints
+    
+    routes = []
+    while unvisited.any():
+        route, load, current = [], 0, 0
+        used = np.zeros(4)
+        ready = tw.earliest[0] + tw.service[0] if tw is not None else 0.0
+        while True:
+            feasible = unvisited & (demands + load <= problem.capacity)
+            if tw is not None:
+                # Reachable within the window, with time left to get back to the depot
+                start = np.maximum(ready + problem.travel_times[current], tw.earliest)
+                back = start + tw.service + problem.travel_times[:, 0]
+                feasible &= (start <= tw.latest + EPSILON) & (back <= tw.latest[0] + EPSILON)
+            if engine is not None:
+                feasible &= engine.reachable(used, current)
+            if not feasible.any():
+                if not route:
+                    # Even a fresh truck cannot make it; servable() should have excluded these
+                    unvisited[np.flatnonzero(unvisited)] = False
+                break
+            candidates = np.flatnonzero(feasible)
+            row = costs[current, candidates]
+            if width > 1 and len(candidates) > 1:
+                top = np.argpartition(row, min(width, len(candidates)) - 1)[:width]
+                chosen = int(candidates[rng.choice(top)])
+            else:
+                chosen = int(candidates[np.argmin(row)])
+            route.append(chosen)
+            load += int(demands[chosen])
+            unvisited[chosen] = False
+            if tw is not None:
+                ready = start[chosen] + tw.service[chosen]
+            if engine is not None:
+                used = used + engine.arc(current, chosen)
+            current = chosen
+        if route:
+            routes.append(route)
+    
+    return routes
+
+
+def _nearest_neighbor_order(costs: np.ndarray, route: List[int]) -> List[int]:
+    remaining = list(route)
+    ordered, current = [], 0
+    while remaining:
+        row = costs[current, remaining]
+        current = remaining.pop(int(np.argmin(row)))
+        ordered.append(current)
+    return ordered
+
+
+CONSTRUCTORS: Dict[str, Callable] = {
+    'savings': savings_construction,
+    'sweep': sweep_construction,
+    'nearest_neighbor': nearest_neighbor_construction,
+}
+
+
+class LocalSearch:
+    """2-opt, Or-opt/relocate and cross-exchange over a dense arc cost array."""
+    
+    def __init__(self, problem: RoutingProblem, deadline: float,
+                 max_segment: int = 3, neighbor_lists: Optional[np.ndarray] = None):
+        self.costs = problem.costs
+        self.demands = problem.demands
+        self.capacity = problem.capacity
+        self.deadline = deadline
+        self.max_segment = max_segment
+        self.neighbors = neighbor_lists if neighbor_lists is not None else problem.neighbor_lists()
+        # With time windows each route keeps prefix/suffix segment summaries so a move is checked in O(1)
+        self.tw = problem.time_windows
+        self.times = problem.travel_times
+        # Route limits are checked the same way, from cumulative resource use along each path
+        self.engine = problem.constraints
+        self.checked = self.tw is not None or self.engine is not None
+    
+    def run(self, routes: List[List[int]]) -> List[List[int]]:
+        # Paths carry the depot at both ends so predecessor/successor lookups need no special cases
+        self.paths = [[0] + list(route) + [0] for route in routes if route]
+        self.loads = [int(self.demands[path].sum()) for path in self.paths]
+        self._index_positions()
+        
+        improved = True
+        while improved and time.time() < self.deadline:
+            improved = False
+            improved |= self._two_opt()
+            improved |= self._relocate_segments()
+            improved |= self._cross_exchange()
+        
+        return [path[1:-1] for path in self.paths if len(path) > 2]
+    
+    def _index_positions(self, route_ids: Optional[Sequence[int]] = None):
+        if route_ids is None:
+            self.route_of = np.zeros(len(self.demands), dtype=np.intp)
+            self.position = np.zeros(len(self.demands), dtype=np.intp)
+            self.prefixes = [None] * len(self.paths)
+            self.suffixes = [None] * len(self.paths)
+            self.cumulative = [None] * len(self.paths)
+            route_ids = range(len(self.paths))
+        for r in route_ids:
+            path = self.paths[r]
+            for p in range(1, len(path) - 1):
+                self.route_of[path[p]] = r
+                self.position[path[p]] = p
+            if self.tw is not None:
+                self.prefixes[r] = self.tw.prefixes(path, self.times)
+                self.suffixes[r] = self.tw.suffixes(path, self.times)
+            if self.engine is not None:
+                self.cumulative[r] = self.engine.cumulative(path)
+    
+    def _joins_feasibly(self, *parts) -> bool:
+        summary = parts[0]
+        for part in parts[1:]:
+            summary = self.tw.concat(summary, part, self.times)
+        return summary[3] <= EPSILON
+    
+    def _path_feasible(self, path: List[int]) -> bool:
+        if self.engine is not None and not self.engine.within(self.engine.path_totals(path)):
+            return False
+        return self.tw is None or self.tw.is_feasible(path, self.times)
+    
+    def _within_limits(self, r: int, i: int, j: int, segment: List[int]) -> bool:
+        # Route r with path[i:j] replaced by segment stays within the route limits
+        if self.engine is None:
+            return True
+        path, cumulative = self.paths[r], self.cumulative[r]
+        used = (cumulative[-1] - (cumulative[j] - cumulative[i - 1]) +
+                self.engine.path_totals([path[i - 1]] + segment + [path[j]]))
+        return self.engine.within(used)
+    
+    def _two_opt(self) -> bool:
+        improved = False
+        for r, path in enumerate(self.paths):
+            # One long route can take many passes, so the deadline is checked per move
+            while len(path) > 3 and time.time() < self.deadline:
+                P = np.asarray(path, dtype=np.intp)
+                forward = self.costs[P[:-1], P[1:]]
+                backward = self.costs[P[1:], P[:-1]]
+                F = np.concatenate(([0.0], np.cumsum(forward)))
+                B = np.concatenate(([0.0], np.cumsum(backward)))
+                
+                # Reverse P[i..j] for 1 <= i < j <= m - 2
+                m = len(P)
+                i = np.arange(1, m - 1)[:, None]
+                j = np.arange(1, m - 1)[None, :]
+                delta = (self.costs[P[i - 1], P[j]] + self.costs[P[i], P[j + 1]] -
+                         forward[i - 1] - forward[j] + (B[j] - B[i]) - (F[j] - F[i]))
+                delta = np.where(j > i, delta, np.inf)
+                
+                if not self.checked:
+                    best = np.unravel_index(np.argmin(delta), delta.shape)
+                    if delta[best] >= -EPSILON:
+                        break
+                    a, b = int(best[0]) + 1, int(best[1]) + 1
+                else:
+                    # Reversal changes every arrival in between, so improving candidates get a full check
+                    move = None
+                    candidates = np.flatnonzero(delta.ravel() < -EPSILON)
+                    for flat in candidates[np.argsort(delta.ravel()[candidates])][:TWO_OPT_TW_CANDIDATES]:
+                        a, b = (int(k) + 1 for k in np.unravel_index(flat, delta.shape))
+                        if self._path_feasible(path[:a] + path[a:b + 1][::-1] + path[b + 1:]):
+                            move = (a, b)
+                            break
+                    if move is None:
+                        break
+                    a, b = move
+                path[a:b + 1] = path[a:b + 1][::-1]
+                improved = True
+            self._index_positions([r])
+        return improved
+    
+    def _relocate_segments(self) -> bool:
+        # Or-opt within a route and relocate between routes, segments of 1..max_segment stops
+        costs = self.costs
+        improved = False
+        
+        for u in range(1, len(self.demands)):
+            if time.time() >= self.deadline:
+                break
+            if self.position[u] == 0:
+                continue
+            
+            for length in range(1, self.max_segment + 1):
+                r1 = int(self.route_of[u])
+                path1 = self.paths[r1]
+                i = int(self.position[u])
+                if i + length - 1 > len(path1) - 2:
+                    break
+                segment = path1[i:i + length]
+                seg_load = int(self.demands[segment].sum())
+                prev_node, next_node = path1[i - 1], path1[i + length]
+                head, tail = segment[0], segment[-1]
+                removal = (costs[prev_node, next_node] - costs[prev_node, head] -
+                           costs[tail, next_node])
+                seg_summary = None
+                if self.tw is not None:
+                    seg_summary = self.tw.segment(segment, self.times)
+                    if not self._joins_feasibly(self.prefixes[r1][i - 1], self.suffixes[r1][i + length]):
+                        continue
+                
+                best = None
+                for v in self.neighbors[u].tolist():
+                    r2 = int(self.route_of[v])
+                    if self.position[v] == 0 or v in segment:
+                        continue
+                    if r2 != r1 and self.loads[r2] + seg_load > self.capacity:
+                        continue
+                    path2 = self.paths[r2]
+                    q_v = int(self.position[v])
+                    # Insert either before or after v
+                    for q in (q_v - 1, q_v):
+                        if r2 == r1 and not (q <= i - 2 or q >= i + length):
+                            continue
+                        a, b = path2[q], path2[q + 1]
+                        delta = removal + costs[a, head] + costs[tail, b] - costs[a, b]
+                        if delta < -EPSILON and (best is None or delta < best[0]):
+                            if self.checked and not self._relocation_feasible(
+                                    r1, i, length, segment, seg_summary, r2, q):
+                                continue
+                            best = (delta, r2, q)
+                
+                if best is not None:
+                    _, r2, q = best
+                    if r2 == r1:
+                        remaining = path1[:i] + path1[i + length:]
+                        insert_at = q + 1 if q < i else q + 1 - length
+                        self.paths[r1] = remaining[:insert_at] + segment + remaining[insert_at:]
+                    else:
+                        self.paths[r1] = path1[:i] + path1[i + length:]
+                        self.paths[r2] = self.paths[r2][:q + 1] + segment + self.paths[r2][q + 1:]
+                        self.loads[r1] -= seg_load
+                        self.loads[r2] += seg_load
+                    self._drop_empty_and_reindex({r1, r2})
+                    improved = True
+                    break
+        
+        return improved
+    
+    def _relocation_feasible(self, r1: int, i: int, length: int, segment: List[int],
+                             seg_summary: Tuple, r2: int, q: int) -> bool:
+        if r2 != r1:
+            if not (self._within_limits(r1, i, i + length, []) and
+                    self._within_limits(r2, q + 1, q + 1, segment)):
+                return False
+            return self.tw is None or self._joins_feasibly(self.prefixes[r2][q], seg_summary,
+                                                           self.suffixes[r2][q + 1])
+        path = self.paths[r1]
+        remaining = path[:i] + path[i + length:]
+        insert_at = q + 1 if q < i else q + 1 - length
+        return self._path_feasible(remaining[:insert_at] + segment + remaining[insert_at:])
+    
+    def _cross_exchange(self) -> bool:
+        # Swap a segment starting at u with a segment starting at a neighbour v in another route
+        costs = self.costs
+        improved = False
+        
+        for u in range(1, len(self.demands)):
+            if time.time() >= self.deadline:
+                break
+            if self.position[u] == 0:
+                continue
+            
+            best = None
+            r1 = int(self.route_of[u])
+            path1 = self.paths[r1]
+            i = int(self.position[u])
+            
+            for v in self.neighbors[u].tolist():
+                r2 = int(self.route_of[v])
+                if r2 == r1 or self.position[v] == 0:
+                    continue
+                path2 = self.paths[r2]
+                j = int(self.position[v])
+                
+                for len1 in range(1, self.max_segment + 1):
+                    if i + len1 - 1 > len(path1) - 2:
+                        break
+                    seg1 = path1[i:i + len1]
+                    load1 = int(self.demands[seg1].sum())
+                    for len2 in range(1, self.max_segment + 1):
+                        if j + len2 - 1 > len(path2) - 2:
+                            break
+                        seg2 = path2[j:j + len2]
+                        load2 = int(self.demands[seg2].sum())
+                        if (self.loads[r1] - load1 + load2 > self.capacity or
+                                self.loads[r2] - load2 + load1 > self.capacity):
+                            continue
+                        
+                        p1, n1 = path1[i - 1], path1[i + len1]
+                        p2, n2 = path2[j - 1], path2[j + len2]
+                        delta = (costs[p1, seg2[0]] + costs[seg2[-1], n1] - costs[p1, seg1[0]] - costs[seg1[-1], n1] +
+                                 costs[p2, seg1[0]] + costs[seg1[-1], n2] - costs[p2, seg2[0]] - costs[seg2[-1], n2])
+                        if delta < -EPSILON and (best is None or delta < best[0]):
+                            if self.tw is not None and not (
+                                    self._joins_feasibly(self.prefixes[r1][i - 1], self.tw.segment(seg2, self.times),
+                                                         self.suffixes[r1][i + len1]) and
+                                    self._joins_feasibly(self.prefixes[r2][j - 1], self.tw.segment(seg1, self.times),
+                                                         self.suffixes[r2][j + len2])):
+                                continue
+                            if not (self._within_limits(r1, i, i + len1, seg2) and
+                                    self._within_limits(r2, j, j + len2, seg1)):
+                                continue
+                            best = (delta, r2, j, len1, len2, load1, load2)
+            
+            if best is not None:
+                _, r2, j, len1, len2, load1, load2 = best
+                path2 = self.paths[r2]
+                seg1, seg2 = path1[i:i + len1], path2[j:j + len2]
+                self.paths[r1] = path1[:i] + seg2 + path1[i + len1:]
+                self.paths[r2] = path2[:j] + seg1 + path2[j + len2:]
+                self.loads[r1] += load2 - load1
+                self.loads[r2] += load1 - load2
+                self._index_positions([r1, r2])
+                improved = True
+        
+        return improved
+    
+    def _drop_empty_and_reindex(self, touched: set):
+        if any(len(self.paths[r]) <= 2 for r in touched):
+            keep = [r for r in range(len(self.paths)) if len(self.paths[r]) > 2]
+            self.paths = [self.paths[r] for r in keep]
+            self.loads = [self.loads[r] for r in keep]
+            self._index_positions()
+        else:
+            self._index_positions(sorted(touched))
+
+
+def improve_routes(problem: RoutingProblem, routes: List[List[int]], time_limit: float,
+                   neighbor_lists: Optional[np.ndarray] = None) -> List[List[int]]:
+    search = LocalSearch(problem, time.time() + time_limit, neighbor_lists=neighbor_lists)
+    return search.run(routes)
+
+
+def _run_start(args: Tuple[RoutingProblem, str, int, float]) -> Tuple[float, List[List[int]]]:
+    problem, constructor, seed, time_limit = args
+    deadline = time.time() + time_limit
+    rng = np.random.default_rng(seed)
+    # The first start of each constructor is deterministic, the rest are randomized
+    noise = 0.0 if seed < len(CONSTRUCTORS) else 0.15
+    routes = CONSTRUCTORS[constructor](problem, rng, noise)
+    routes = improve_routes(problem, routes, max(deadline - time.time(), 0.0))
+    return solution_cost(problem.costs, routes), routes
+
+
+def wave_budget(time_limit: float, starts: int, pool_size: int) -> float:
+    # Starts run in waves of pool_size; each wave shares the budget, minus a little for process start-up
+    waves = int(np.ceil(starts / max(pool_size, 1)))
+    return max(time_limit * 0.9 / max(waves, 1), 0.1)
+
+
+def solve_multistart(problem: RoutingProblem, starts: int = 8, time_limit: float = 30.0,
+                     workers: Optional[int] = None, parallel_threshold: int = 150,
+                     constructors: Optional[Sequence[str]] = None) -> Tuple[List[List[int]], float]:
+    constructors = list(constructors or CONSTRUCTORS)
+    for name in constructors:
+        if name not in CONSTRUCTORS:
+            raise ValueError(f"Unknown constructor '{name}'. Options: {', '.join(CONSTRUCTORS)}")
+    
+    plans = [(constructors[s % len(constructors)], s) for s in range(max(starts, 1))]
+    workers = workers or os.cpu_count() or 1
+    started = time.time()
+    
+    if workers > 1 and len(plans) > 1 and problem.n_customers >= parallel_threshold:
+        pool_size = min(workers, len(plans))
+        budget = wave_budget(time_limit, len(plans), pool_size)
+        with ProcessPoolExecutor(max_workers=pool_size) as executor:
+            results = list(executor.map(_run_start, [(problem, name, seed, budget) for name, seed in plans]))
+    else:
+        results = []
+        for k, (name, seed) in enumerate(plans):
+            remaining = time_limit - (time.time() - started)
+            if remaining <= 0 and results:
+                break
+            budget = max(remaining / (len(plans) - k), 0.05)
+            results.append(_run_start((problem, name, seed, budget)))
+    
+    best_cost, best_routes = min(results, key=lambda result: result[0])
+    return best_routes, best_cost
@@ -0,0 +1,95 @@
+import time
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import pulp
+
+
+Terms = Iterable[Tuple[pulp.LpVariable, float]]
+
+SENSES = {
+    '<=': pulp.LpConstraintLE,
+    '==': pulp.LpConstraintEQ,
+    '>=': pulp.LpConstraintGE,
+}
+
+
+def linear_expression(terms: Terms, constant: float = 0.0) -> pulp.LpAffineExpression:
+    # One pass over (variable, coefficient) pairs; repeated variables are summed
+    coefficients: Dict[pulp.LpVariable, float] = {}
+    for var, coef in terms:
+        coefficients[var] = coefficients.get(var, 0.0) + coef
+    return pulp.LpAffineExpression(list(coefficients.items()), constant=constant)
+
+
+class ModelBuilder:
+    """Builds a PuLP problem from coefficient dicts in one pass per expression."""
+    
+    def __init__(self, name: str, sense: int = pulp.LpMinimize):
+        self.prob = pulp.LpProblem(name, sense)
+        self.build_time = 0.0
+        self._started = time.perf_counter()
+    
+    def binary_variables(self, prefix: str, keys: Iterable[Tuple]) -> Dict[Tuple, pulp.LpVariable]:
+        return {key: pulp.LpVariable(self._var_name(prefix, key), cat='Binary') for key in keys}
+    
+    def integer_variables(self, prefix: str, keys: Iterable[Tuple], low_bound: Optional[float] = 0,
+                          up_bound: Optional[Union[float, Dict[Tuple, float]]] = None) -> Dict[Tuple, pulp.LpVariable]:
+        return self._variables(prefix, keys, 'Integer', low_bound, up_bound)
+    
+    def continuous_variables(self, prefix: str, keys: Iterable[Tuple], low_bound: Optional[float] = 0,
+                             up_bound: Optional[Union[float, Dict[Tuple, float]]] = None) -> Dict[Tuple, pulp.LpVariable]:
+        return self._variables(prefix, keys, 'Continuous', low_bound, up_bound)
+    
+    def set_objective(self, variables: Dict[Hashable, pulp.LpVariable],
+                      coefficients: Dict[Hashable, float], constant: float = 0.0):
+        self.prob.setObjective(linear_expression(
+            ((variables[key], coef) for key, coef in coefficients.items()), constant
+        ))
+    
+    def add_constraint(self, terms: Terms, sense: str, rhs: float, name: Optional[str] = None):
+        constraint = pulp.LpConstraint(linear_expression(terms), SENSES[sense], name=name, rhs=rhs)
+        self.prob.addConstraint(constraint)
+    
+    def add_constraints(self, rows: Iterable[Tuple[Terms, str, float]]):
+        for terms, sense, rhs in rows:
+            self.add_constraint(terms, sense, rhs)
+    
+    def finish(self) -> pulp.LpProblem:
+        self.build_time = time.perf_counter() - self._started
+        return self.prob
+    
+    def size(self) -> Dict[str, int]:
+        return {
+            'variables': self.prob.numVariables(),
+            'constraints': self.prob.numConstraints(),
+        }
+    
+    def _variables(self, prefix: str, keys: Iterable[Tuple], category: str,
+                   low_bound: Optional[float],
+                   up_bound: Optional[Union[float, Dict[Tuple, float]]]) -> Dict[Tuple, pulp.LpVariable]:
+        variables = {}
+        for key in keys:
+            upper = up_bound.get(key) if isinstance(up_bound, dict) else up_bound
+            variables[key] = pulp.LpVariable(self._var_name(prefix, key), lowBound=low_bound,
+                                             upBound=upper, cat=category)
+        return variables
+    
+    @staticmethod
+    def _var_name(prefix: str, key: Tuple) -> str:
+        if not isinstance(key, tuple):
+            key = (key,)
+        return prefix + ''.join(f"_{part}" for part in key)
+
+
+def adjacency(keys: Iterable[Tuple], by_vehicle: bool = False) -> Tuple[Dict, Dict]:
+    # Out- and in-arc lists per node for (i, j, k) arc keys, or per (node, k) with by_vehicle
+    out_arcs: Dict[Hashable, List[Tuple]] = {}
+    in_arcs: Dict[Hashable, List[Tuple]] = {}
+    for key in keys:
+        if by_vehicle:
+            out_arcs.setdefault((key[0], key[2]), []).append(key)
+            in_arcs.setdefault((key[1], key[2]), []).append(key)
+        else:
+            out_arcs.setdefault(key[0], []).append(key)
+            in_arcs.setdefault(key[1], []).append(key)
+    return out_arcs, in_arcs
@@ -1,16 +1,37 @@
 import pulp
 import numpy as np
 from typing import Dict, List, Tuple, Optional
+import logging
+import os
+import tempfile
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import uuid
 
 from data.models import (
     Store, Supplier, Vehicle, Route, OptimizationResult, 
-    RouteStatus, DistanceMatrix
+    RouteStatus, DistanceMatrix, OrderChanges, Location, TollSegment
 )
+from core.constraints import ConstraintEngine, RouteLimits, check_routes
 from core.cost_calculator import CostCalculator
-from utils.geo_utils import calculate_distance
+from core.decomposition import assign_by_cost, plan_clusters, vehicle_depot
+from core.heuristics import RoutingProblem, improve_routes, solve_multistart
+from core.model_builder import ModelBuilder, adjacency
+from core.route_planner import ColumnGenerationPlanner, VehicleType
+from core.solver_monitor import CbcLogMonitor, relative_gap
+from core.supplier_assignment import SupplierAssignment, assign_suppliers
+from core.time_windows import TimeWindows, store_time_windows
+from core.toll_index import create_toll_service
+from data.matrix_store import DistanceMatrixStore
+from utils.geo_utils import DEFAULT_SPEED_MPH, calculate_distance
+from utils.routing import create_routing_backend
+from utils.toll_api import TollService
+
+
+DEFAULT_DEPOT_COORDINATES = (41.8781, -87.6298)  # Chicago
+
+logger = logging.getLogger('pallet_optimizer')
 
 
 class PalletOptimizer:
@@ -19,160 +40,816 @@ class PalletOptimizer:
         self.solver_name = config.get('solver', 'CBC')
         self.time_limit = config.get('time_limit_seconds', 3600)
         self.mip_gap = config.get('mip_gap', 0.01)
+        self.method = config.get('method', 'exact')
+        # Seed the MIP with heuristic routes so a feasible answer exists from the start
+        self.warm_start = config.get('warm_start', True)
+        
+        # Route distance, driver hours, pallet and weight limits (flat keys or a 'constraints' section)
+        self.route_limits = RouteLimits.from_config(config)
+        
+        # Arc pruning for the compact formulation
+        self.arc_neighbors = config.get('arc_neighbors', 15)
+        self.max_route_distance = self.route_limits.max_route_distance
+        
+        # Multi-start local search settings
+        self.heuristic_starts = config.get('heuristic_starts', 8)
+        self.heuristic_time_limit = config.get('heuristic_time_limit', min(self.time_limit, 30))
+        # Share of the time limit the warm-start heuristic may use before the MIP starts
+        self.warm_start_fraction = config.get('warm_start_fraction', 0.2)
+        self.heuristic_workers = config.get('heuristic_workers')
+        
+        # Cluster-first, route-second decomposition
+        self.cluster_size = config.get('cluster_size', 60)
+        self.cluster_method = config.get('cluster_method', 'anytime')
+        self.cluster_workers = config.get('cluster_workers')
+        
+        # Multi-depot: each store may only be served from its nearest few depots
+        self.depot_candidates = config.get('depot_candidates', 2)
+        
+        # Time windows: minutes spent unloading at each store, and when trucks may leave the depot
+        self.service_time_minutes = config.get('service_time_minutes', 15)
+        self.depot_open_hour = config.get('depot_open_hour', 0.0)
+        
+        # Local search budget when repairing a previous plan after order changes
+        self.reoptimize_time_limit = config.get('reoptimize_time_limit', 5)
         
         self.cost_calculator = CostCalculator(config.get('costs', {}))
+        # Toll rates from a rate file or toll service ('tolls' section), fetched for all candidate arcs at once
+        tolls = config.get('tolls')
+        self.toll_service: Optional[TollService] = create_toll_service(tolls) if tolls else None
+        # Set once tolls are loaded; arc and route costs include them from then on
+        self.prices_tolls = False
+        
+        # Road distances and times from an OSRM-style server ('routing' section), else great-circle
+        # miles driven at avg_speed_mph
+        self.avg_speed_mph = config.get('avg_speed_mph', DEFAULT_SPEED_MPH)
+        self.routing_backend = create_routing_backend({'avg_speed_mph': self.avg_speed_mph,
+                                                       **(config.get('routing') or {})})
+        
+        # Computed distance matrices are persisted here (flat key or the 'data' section). Without
+        # either, matrices are computed in memory and nothing is written to disk.
+        cache_directory = config.get('distance_cache_directory',
+                                     (config.get('data') or {}).get('distance_cache_directory'))
+        self.matrix_store = (DistanceMatrixStore(cache_directory, backend=self.routing_backend)
+                             if cache_directory else None)
         
+    def get_distance_matrix(self, stores: List[Store], vehicles: List[Vehicle],
+                            depot_location: Optional[Tuple[float, float]] = None) -> DistanceMatrix:
+        depot_names, depot_coords, _ = self._depot_layout(stores, vehicles, depot_location)
+        names = depot_names + [store.location.name for store in stores]
+        coordinates = depot_coords + [
+            (store.location.latitude, store.location.longitude) for store in stores
+        ]
+        
+        if self.matrix_store:
+            return self.matrix_store.get_matrix(names, coordinates)
+        return DistanceMatrix(names, *self.routing_backend.table(coordinates))
+    
     def optimize_deliveries(self, stores: List[Store], suppliers: List[Supplier], 
                           vehicles: List[Vehicle], 
                           distance_matrix: Optional[DistanceMatrix] = None) -> OptimizationResult:
         
         start_time = time.time()
         
+        if distance_matrix is None:
+            distance_matrix = self.get_distance_matrix(stores, vehicles)
+        
+        warm_routes, incumbents = self._warm_start_routes(stores, vehicles, distance_matrix, start_time)
+        
         # Set up the optimization problem
-        prob = pulp.LpProblem("Pallet_Delivery_Optimization", pulp.LpMinimize)
+        builder = ModelBuilder("Pallet_Delivery_Optimization")
         
         # Decision variables
         # x[i][j][k] = 1 if vehicle k travels from location i to location j
-        locations = ['depot'] + [store.location.name for store in stores]
+        # Locations are the depots (one per distinct vehicle start) followed by the stores
+        depot_names, _, vehicle_depots = self._depot_layout(stores, vehicles)
+        n_depots = len(depot_names)
+        locations = depot_names + [store.location.name for store in stores]
         n_locations = len(locations)
         n_vehicles = len(vehicles)
+        demands = [0] * n_depots + [store.demand_pallets for store in stores]
+        units, scale = self._load_units(np.array(demands, dtype=np.int64), n_depots)
+        arc_distances = self._get_distance_array(locations, distance_matrix)
+        arc_times = self._get_time_array(locations, distance_matrix)
+        arc_tolls = self._get_toll_array(locations, arc_distances)
+        time_windows = self._time_windows(stores, n_depots)
         
-        # Create decision variables
-        x = {}
-        for i in range(n_locations):
-            for j in range(n_locations):
-                for k in range(n_vehicles):
-                    if i != j:  # Cannot travel from a location to itself
-                        x[i, j, k] = pulp.LpVariable(f"x_{i}_{j}_{k}", cat='Binary')
+        # Each vehicle only sees its own depot and the stores pre-assigned to it
+        home = [vehicle_depots[vehicle.id] for vehicle in vehicles]
+        allowed = self._depot_candidates(arc_distances, n_depots, warm_routes, locations)
+        nodes = {d: [d] + [int(j) for j in np.flatnonzero(allowed[d])] for d in range(n_depots)}
+        reachable = self._time_feasible_arcs(time_windows, arc_times, warm_routes, locations)
+        arc_keys = [(i, j, k) for k in range(n_vehicles) for i in nodes[home[k]] for j in nodes[home[k]]
+                    if i != j and reachable[i, j]]  # Cannot travel from a location to itself
+        x = builder.binary_variables("x", arc_keys)
+        _, in_arcs = adjacency(arc_keys)
+        vehicle_out, vehicle_in = adjacency(arc_keys, by_vehicle=True)
         
-        # Vehicle load variables
-        load = {}
-        for k in range(n_vehicles):
-            for i in range(n_locations):
-                load[k, i] = pulp.LpVariable(f"load_{k}_{i}", lowBound=0, cat='Integer')
+        # Vehicle load variables (in load units), bounded by each vehicle's capacity
+        load_capacity = [self._capacity(vehicle) * scale + scale - 1 for vehicle in vehicles]
+        load_keys = [(k, i) for k in range(n_vehicles) for i in nodes[home[k]]]
+        load = builder.integer_variables("load", load_keys, low_bound=0, 
+                                         up_bound={(k, i): load_capacity[k] for k, i in load_keys})
         
         # Objective function: minimize total cost
-        total_cost = 0
-        
-        for i in range(n_locations):
-            for j in range(n_locations):
-                for k in range(n_vehicles):
-                    if i != j and (i, j, k) in x:
-                        # Calculate cost for this arc
-                        distance = self._get_distance(locations[i], locations[j], distance_matrix)
-                        arc_cost = distance * vehicles[k].cost_per_mile
-                        total_cost += arc_cost * x[i, j, k]
-        
-        prob += total_cost
+        builder.set_objective(x, {
+            (i, j, k): float(arc_distances[i, j]) * vehicles[k].cost_per_mile + float(arc_tolls[i, j])
+            for i, j, k in arc_keys
+        })
         
         # Constraints
         
         # 1. Each store must be visited exactly once
-        for j in range(1, n_locations):  # Skip depot (index 0)
-            prob += pulp.lpSum([x[i, j, k] for i in range(n_locations) 
-                               for k in range(n_vehicles) 
-                               if i != j and (i, j, k) in x]) == 1
+        for j in range(n_depots, n_locations):  # Skip depots
+            builder.add_constraint(((x[key], 1) for key in in_arcs.get(j, [])), '==', 1)
         
         # 2. Flow conservation: if a vehicle enters a location, it must leave
         for k in range(n_vehicles):
-            for j in range(n_locations):
-                inflow = pulp.lpSum([x[i, j, k] for i in range(n_locations) 
-                                    if i != j and (i, j, k) in x])
-                outflow = pulp.lpSum([x[j, i, k] for i in range(n_locations) 
-                                     if i != j and (j, i, k) in x])
-                prob += inflow == outflow
-        
-        # 3. Each vehicle starts and ends at depot
+            for j in nodes[home[k]]:
+                inflow = [(x[key], 1) for key in vehicle_in.get((j, k), [])]
+                outflow = [(x[key], -1) for key in vehicle_out.get((j, k), [])]
+                builder.add_constraint(inflow + outflow, '==', 0)
+        
+        # 3. Each vehicle starts and ends at its own depot
         for k in range(n_vehicles):
             # Must leave depot at most once
-            prob += pulp.lpSum([x[0, j, k] for j in range(1, n_locations) 
-                               if (0, j, k) in x]) <= 1
+            builder.add_constraint(((x[key], 1) for key in vehicle_out.get((home[k], k), [])), '<=', 1)
             # Must return to depot at most once
-            prob += pulp.lpSum([x[j, 0, k] for j in range(1, n_locations) 
-                               if (j, 0, k) in x]) <= 1
+            builder.add_constraint(((x[key], 1) for key in vehicle_in.get((home[k], k), [])), '<=', 1)
         
-        # 4. Vehicle capacity constraints
-        for k in range(n_vehicles):
-            for i in range(n_locations):
-                for j in range(n_locations):
-                    if i != j and (i, j, k) in x:
-                        if j > 0:  # Not depot
-                            store_demand = stores[j-1].demand_pallets
-                            prob += (load[k, j] >= load[k, i] + store_demand - 
-                                   vehicles[k].max_pallets * (1 - x[i, j, k]))
-                        else:  # Returning to depot
-                            prob += load[k, j] == 0
-        
-        # 5. Initial load at depot
-        for k in range(n_vehicles):
-            prob += load[k, 0] == 0
+        # 4. Vehicle capacity constraints (MTZ-style load propagation). Load rises at every store,
+        # including those with no pallets, so this also rules out subtours.
+        for i, j, k in arc_keys:
+            if j >= n_depots:  # Not a depot
+                capacity = load_capacity[k]
+                builder.add_constraint(
+                    [(load[k, j], 1), (load[k, i], -1), (x[i, j, k], -capacity)], 
+                    '>=', int(units[j]) - capacity
+                )
         
-        # 6. Load bounds
+        # 5. Initial and final load at depot
         for k in range(n_vehicles):
-            for i in range(n_locations):
-                prob += load[k, i] <= vehicles[k].max_pallets
+            builder.add_constraint([(load[k, home[k]], 1)], '==', 0)
+        
+        # 6. Delivery windows
+        if time_windows is not None:
+            start = self._add_time_window_constraints(builder, x, arc_keys, time_windows, arc_times, n_depots)
+        
+        # 7. Route distance and driver hours, summed over each vehicle's arcs
+        engine = self._constraint_engine(arc_distances, arc_times, demands, n_depots)
+        if engine is not None:
+            vehicle_arcs: Dict[int, List[Tuple]] = {}
+            for key in arc_keys:
+                vehicle_arcs.setdefault(key[2], []).append(key)
+            for resource, bound in zip(('distance', 'hours'), engine.bounds):
+                if np.isfinite(bound):
+                    values = engine.arc_values(resource)
+                    for k, keys in vehicle_arcs.items():
+                        builder.add_constraint(((x[key], float(values[key[0], key[1]])) for key in keys),
+                                               '<=', float(bound))
+        
+        prob = builder.finish()
+        
+        if warm_routes:
+            vehicle_index = {vehicle.id: k for k, vehicle in enumerate(vehicles)}
+            location_index = {name: i for i, name in enumerate(locations)}
+            for var in list(x.values()) + list(load.values()):
+                var.setInitialValue(0)
+            for k, vehicle in enumerate(vehicles):
+                # Loads must stay consistent for nodes this vehicle skips, so they sit at capacity
+                for i in nodes[home[k]][1:]:
+                    load[k, i].setInitialValue(load_capacity[k])
+            warm_objective = 0.0
+            for route in warm_routes:
+                k = vehicle_index[route.vehicle_id]
+                path = [location_index[stop] for stop in route.stops]
+                carried = 0
+                for i, j in zip(path[:-1], path[1:]):
+                    x[i, j, k].setInitialValue(1)
+                    warm_objective += (float(arc_distances[i, j]) * vehicles[k].cost_per_mile +
+                                       float(arc_tolls[i, j]))
+                    if j >= n_depots:
+                        carried += int(units[j])
+                        load[k, j].setInitialValue(carried)
+            # This model prices distance and tolls only, so report the start in the same units
+            incumbents = [(incumbents[0][0], warm_objective)]
+            if time_windows is not None:
+                self._warm_start_times(start, warm_routes, location_index, time_windows, arc_times)
         
         # Solve the problem
-        solver = self._get_solver()
-        prob.solve(solver)
+        solve_stats = self._solve(prob, start_time, warm_start=bool(warm_routes))
         
         solve_time = time.time() - start_time
         
         # Extract solution
-        routes = self._extract_routes(x, locations, vehicles, stores, prob.status)
+        routes = self._extract_routes(x, locations, vehicles, stores, prob.sol_status, 
+                                      arc_distances, arc_times, home, fallback_routes=warm_routes,
+                                      time_windows=time_windows)
         
-        # Calculate results
-        total_distance = sum(route.total_distance for route in routes)
-        total_time = sum(route.total_time for route in routes)
-        total_cost_result = sum(route.total_cost for route in routes)
+        objective_value, gap = self._objective_and_gap(prob, routes, solve_stats)
+        solver_stats = {'build_time': builder.build_time, **solve_stats}
+        solver_stats['incumbents'] = incumbents + solve_stats['incumbents']
+        return self._build_result(routes, vehicles, pulp.LpSolution[prob.sol_status], solve_time,
+                                  objective_value, gap=gap, solver_stats=solver_stats)
+    
+    def optimize(self, stores: List[Store], suppliers: List[Supplier], 
+                 vehicles: List[Vehicle], method: Optional[str] = None,
+                 distance_matrix: Optional[DistanceMatrix] = None) -> OptimizationResult:
+        method = method or self.method
+        solvers = {
+            'exact': self.optimize_deliveries,
+            'compact': self.optimize_deliveries_compact,
+            'anytime': self.optimize_deliveries_anytime,
+            'decomposed': self.optimize_deliveries_decomposed,
+            'column_generation': self.optimize_deliveries_column_generation,
+            'heuristic': self.optimize_deliveries_heuristic,
+            'greedy': self.optimize_deliveries_greedy,
+        }
         
-        # Calculate utilization
-        total_capacity = sum(vehicle.max_pallets for vehicle in vehicles if any(route.vehicle_id == vehicle.id for route in routes))
-        total_used = sum(route.pallets_delivered for route in routes)
-        utilization = total_used / max(total_capacity, 1) if total_capacity > 0 else 0
+        if method not in solvers:
+            raise ValueError(f"Unknown optimization method '{method}'. Options: {', '.join(solvers)}")
         
-        result = OptimizationResult(
-            routes=routes,
-            total_cost=total_cost_result,
-            total_distance=total_distance,
-            total_time=total_time,
-            utilization_rate=utilization,
-            solver_status=pulp.LpStatus[prob.status],
-            solve_time=solve_time,
-            objective_value=pulp.value(prob.objective) if prob.objective else 0,
-            gap=None
-        )
+        # Decomposed looks tolls up per cluster, and greedy does not price them. Every other solver
+        # builds this same matrix when none is given, so building it here first costs nothing extra.
+        if self.toll_service is not None and method not in ('decomposed', 'greedy'):
+            if distance_matrix is None:
+                distance_matrix = self.get_distance_matrix(stores, vehicles)
+            self.prefetch_tolls(stores, vehicles, distance_matrix)
         
+        result = solvers[method](stores, suppliers, vehicles, distance_matrix)
+        if self.route_limits.enabled:
+            violations = self.validate_routes(result.routes, vehicles)
+            result.solver_stats['constraint_violations'] = violations
+            if violations:
+                logger.warning(f"{len(violations)} route limit violations in the {method} solution")
         return result
     
-    def optimize_supplier_assignment(self, stores: List[Store], 
-                                   suppliers: List[Supplier]) -> Dict[str, str]:
+    def prefetch_tolls(self, stores: List[Store], vehicles: List[Vehicle],
+                       distance_matrix: DistanceMatrix) -> int:
+        # One bulk toll lookup for every arc the solvers may use, priced into their arc costs
+        if self.toll_service is None:
+            return 0
+        arcs, locations = self._toll_arcs(stores, vehicles, distance_matrix)
+        segments = self.toll_service.segments(arcs, locations)
+        self.load_tolls(distance_matrix, segments, list(locations.values()))
+        return len(segments)
+    
+    def load_tolls(self, distance_matrix: DistanceMatrix, segments: List[TollSegment],
+                   locations: Optional[List[Location]] = None):
+        # Arcs without a segment pay the default toll rate
+        self.cost_calculator.set_distance_matrix(distance_matrix, locations)
+        self.cost_calculator.set_toll_segments(segments)
+        self.prices_tolls = True
+    
+    def validate_routes(self, routes: List[Route], vehicles: List[Vehicle]) -> List[Dict]:
+        # Every finished route against the distance, driver hours, pallet and weight limits at once
+        checks = check_routes(routes, vehicles, self.route_limits, self.service_time_minutes / 60.0)
+        return [dict(violation, route_id=routes[violation['route']].id) for violation in checks.violations()]
+    
+    def optimize_deliveries_anytime(self, stores: List[Store], suppliers: List[Supplier], 
+                                    vehicles: List[Vehicle], 
+                                    distance_matrix: Optional[DistanceMatrix] = None) -> OptimizationResult:
+        # Heuristic incumbent first, then the compact MIP improves it until time_limit_seconds
+        return self.optimize_deliveries_compact(stores, suppliers, vehicles, distance_matrix, warm_start=True)
+    
+    def optimize_deliveries_compact(self, stores: List[Store], suppliers: List[Supplier], 
+                                    vehicles: List[Vehicle], 
+                                    distance_matrix: Optional[DistanceMatrix] = None,
+                                    warm_start: Optional[bool] = None) -> OptimizationResult:
+        # Two-index single-commodity flow model over a pruned arc set. Identical trucks
+        # share one vehicle-type index instead of one index per vehicle.
+        start_time = time.time()
+        
+        if distance_matrix is None:
+            distance_matrix = self.get_distance_matrix(stores, vehicles)
+        
+        depot_names, _, vehicle_depots = self._depot_layout(stores, vehicles)
+        n_depots = len(depot_names)
+        locations = depot_names + [store.location.name for store in stores]
+        distances = self._get_distance_array(locations, distance_matrix)
+        times = self._get_time_array(locations, distance_matrix)
+        tolls = self._get_toll_array(locations, distances)
+        demands = np.array([0] * n_depots + [store.demand_pallets for store in stores], dtype=np.int64)
+        time_windows = self._time_windows(stores, n_depots)
+        
+        fleet = self._group_vehicles([v for v in vehicles if v.available], vehicle_depots)
+        if not fleet:
+            raise ValueError("No available vehicles to route")
+        home = [vehicle_depots[group[0].id] for group in fleet]
+        
+        max_capacity = max(self._capacity(group[0]) for group in fleet)
+        oversized = [stores[j - n_depots].name for j in np.flatnonzero(demands > max_capacity)]
+        if oversized:
+            raise ValueError(f"Demand exceeds the largest vehicle capacity ({max_capacity} pallets) "
+                             f"for: {', '.join(oversized)}")
+        
+        engine = self._constraint_engine(distances, times, demands, n_depots)
+        if engine is not None:
+            in_range = np.zeros(len(locations), dtype=bool)
+            for d in range(n_depots):
+                in_range |= engine.reachable(np.zeros(4), d, d)
+            out_of_range = [stores[j - n_depots].name for j in np.flatnonzero(~in_range[n_depots:]) + n_depots]
+            if out_of_range:
+                raise ValueError(f"A round trip from the depot exceeds the route distance or driver hours "
+                                 f"limit for: {', '.join(out_of_range)}")
         
-        # Simple greedy assignment based on cost
-        assignments = {}
+        arc_mask = self._prune_arcs(distances, demands, max_capacity, n_depots)
+        arc_mask &= self._time_feasible_arcs(time_windows, times)
         
-        for store in stores:
-            best_supplier = None
-            best_cost = float('inf')
+        use_warm_start = self.warm_start if warm_start is None else warm_start
+        warm_routes, incumbents = [], []
+        if use_warm_start:
+            warm_routes, incumbents = self._warm_start_routes(stores, vehicles, distance_matrix, start_time)
+        
+        # Arcs used by the warm start survive pruning so the start is always feasible
+        vehicle_type = {vehicle.id: t for t, group in enumerate(fleet) for vehicle in group}
+        location_index = {name: i for i, name in enumerate(locations)}
+        warm_paths = [
+            (vehicle_type[route.vehicle_id], [location_index[stop] for stop in route.stops])
+            for route in warm_routes
+        ]
+        
+        builder = ModelBuilder("Pallet_Delivery_Compact")
+        
+        # x[i, j, t] = 1 if a truck of type t drives i -> j
+        # f[i, j, t] = pallets still on board when leaving i for j
+        # A truck type belongs to one depot and only reaches the stores pre-assigned to it
+        allowed = self._depot_candidates(distances, n_depots, warm_routes, locations)
+        arc_keys = []
+        for t, group in enumerate(fleet):
+            reachable = allowed[home[t]].copy()
+            reachable[home[t]] = True
+            type_mask = arc_mask & ((demands[:, None] + demands[None, :]) <= self._capacity(group[0]))
+            type_mask &= reachable[:, None] & reachable[None, :]
+            for path_type, path in warm_paths:
+                if path_type == t:
+                    type_mask[path[:-1], path[1:]] = True
+            arc_keys.extend((int(i), int(j), t) for i, j in np.argwhere(type_mask))
+        
+        # Flow is counted in load units, so stores without pallets still take flow and cannot form subtours
+        units, scale = self._load_units(demands, n_depots)
+        capacities = [self._capacity(group[0]) * scale + scale - 1 for group in fleet]
+        x = builder.binary_variables("x", arc_keys)
+        # Nothing is left on board when returning to the depot
+        f = builder.continuous_variables("f", arc_keys, low_bound=0, up_bound={
+            (i, j, t): 0 if j < n_depots else capacities[t] - int(units[i]) for i, j, t in arc_keys
+        })
+        out_arcs, in_arcs = adjacency(arc_keys)
+        type_out, type_in = adjacency(arc_keys, by_vehicle=True)
+        
+        builder.set_objective(x, {
+            (i, j, t): float(distances[i, j]) * fleet[t][0].cost_per_mile + 
+                       float(times[i, j]) * fleet[t][0].cost_per_hour + float(tolls[i, j])
+            for i, j, t in arc_keys
+        })
+        
+        # Every store is entered and left exactly once
+        for j in range(n_depots, len(locations)):
+            builder.add_constraint(((x[key], 1) for key in in_arcs.get(j, [])), '==', 1)
+            builder.add_constraint(((x[key], 1) for key in out_arcs.get(j, [])), '==', 1)
             
-            for supplier in suppliers:
-                if supplier.available_pallets >= store.demand_pallets:
-                    cost = self.cost_calculator.calculate_supplier_assignment_cost(store, supplier)
-                    
-                    if cost < best_cost:
-                        best_cost = cost
-                        best_supplier = supplier
+            # Flow drops by the store's load units
+            builder.add_constraint(
+                [(f[key], 1) for key in in_arcs.get(j, [])] + [(f[key], -1) for key in out_arcs.get(j, [])],
+                '==', int(units[j])
+            )
             
-            if best_supplier:
-                assignments[store.id] = best_supplier.id
-                # Update supplier availability
-                best_supplier.available_pallets -= store.demand_pallets
+            # A route keeps the same truck type throughout
+            if len(fleet) > 1:
+                for t in range(len(fleet)):
+                    builder.add_constraint(
+                        [(x[key], 1) for key in type_in.get((j, t), [])] + 
+                        [(x[key], -1) for key in type_out.get((j, t), [])],
+                        '==', 0
+                    )
+        
+        # Flow bounds tied to arc usage
+        for key in arc_keys:
+            i, j, t = key
+            builder.add_constraint([(f[key], 1), (x[key], -(capacities[t] - int(units[i])))], '<=', 0)
+            builder.add_constraint([(f[key], 1), (x[key], -int(units[j]))], '>=', 0)
+        
+        # Fleet size per truck type, and a lower bound on the number of routes
+        for t, group in enumerate(fleet):
+            leaving = [(x[key], 1) for key in type_out.get((home[t], t), [])]
+            returning = [(x[key], -1) for key in type_in.get((home[t], t), [])]
+            builder.add_constraint(leaving, '<=', len(group))
+            builder.add_constraint(leaving + returning, '==', 0)
+        
+        min_routes = int(np.ceil(demands.sum() / max_capacity)) if demands.sum() > 0 else 0
+        builder.add_constraint(((x[key], 1) for d in range(n_depots) for key in out_arcs.get(d, [])),
+                               '>=', min_routes)
+        
+        if time_windows is not None:
+            start = self._add_time_window_constraints(builder, x, arc_keys, time_windows, times, n_depots)
+        
+        if engine is not None:
+            for resource, bound in zip(('distance', 'hours'), engine.bounds):
+                if np.isfinite(bound):
+                    self._add_resource_constraints(builder, x, arc_keys, engine.arc_values(resource),
+                                                   float(bound), n_depots, resource)
+        
+        prob = builder.finish()
+        
+        if warm_paths:
+            for var in list(x.values()) + list(f.values()):
+                var.setInitialValue(0)
+            for t, path in warm_paths:
+                on_board = int(units[path].sum())
+                for i, j in zip(path[:-1], path[1:]):
+                    on_board -= int(units[i])
+                    x[i, j, t].setInitialValue(1)
+                    f[i, j, t].setInitialValue(on_board)
+            if time_windows is not None:
+                self._warm_start_times(start, warm_routes, location_index, time_windows, times)
+        
+        model_size = {
+            'locations': len(locations),
+            'depots': n_depots,
+            'vehicle_types': len(fleet),
+            'arcs': int(arc_mask.sum()),
+            'full_arcs': len(locations) * (len(locations) - 1) * len(vehicles),
+            **builder.size(),
+        }
+        logger.info("Compact model: %(locations)d locations, %(vehicle_types)d vehicle types, "
+                    "%(arcs)d of %(full_arcs)d arcs, %(variables)d variables, "
+                    "%(constraints)d constraints", model_size)
+        
+        solve_stats = self._solve(prob, start_time, warm_start=bool(warm_paths))
+        
+        solve_time = time.time() - start_time
+        
+        if prob.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            routes = self._extract_flow_routes(x, fleet, home, locations, distances, times, demands,
+                                               time_windows)
+        elif warm_routes:
+            routes = warm_routes
+        else:
+            routes, _ = self._solve_heuristic(stores, vehicles, distance_matrix=distance_matrix)
+        
+        objective_value, gap = self._objective_and_gap(prob, routes, solve_stats)
+        solver_stats = {'model_size': model_size, 'build_time': builder.build_time, **solve_stats}
+        solver_stats['incumbents'] = incumbents + solve_stats['incumbents']
+        return self._build_result(routes, vehicles, pulp.LpSolution[prob.sol_status], solve_time,
+                                  objective_value, gap=gap, solver_stats=solver_stats)
+    
+    def optimize_supplier_assignment(self, stores: List[Store], 
+                                   suppliers: List[Supplier]) -> Dict[str, str]:
+        # Each store's main supplier under the optimal split allocation; inputs are left untouched
+        return self.optimize_supplier_allocation(stores, suppliers).primary
+    
+    def optimize_supplier_allocation(self, stores: List[Store],
+                                     suppliers: List[Supplier]) -> SupplierAssignment:
+        # Transportation problem over the store x supplier per-pallet cost matrix, split deliveries allowed
+        unit_costs = self.cost_calculator.supplier_unit_costs(stores, suppliers)
+        return assign_suppliers(stores, suppliers, unit_costs)
+    
+    def optimize_deliveries_column_generation(self, stores: List[Store], suppliers: List[Supplier], 
+                                              vehicles: List[Vehicle], 
+                                              distance_matrix: Optional[DistanceMatrix] = None) -> OptimizationResult:
+        # Set-partitioning master over generated routes; each selected column is already a Route
+        start_time = time.time()
+        
+        if distance_matrix is None:
+            distance_matrix = self.get_distance_matrix(stores, vehicles)
+        
+        depot_names, _, vehicle_depots = self._depot_layout(stores, vehicles)
+        n_depots = len(depot_names)
+        locations = depot_names + [store.location.name for store in stores]
+        distances = self._get_distance_array(locations, distance_matrix)
+        times = self._get_time_array(locations, distance_matrix)
+        tolls = self._get_toll_array(locations, distances)
+        demands = np.array([0] * n_depots + [store.demand_pallets for store in stores], dtype=np.int64)
+        
+        fleet = self._group_vehicles([v for v in vehicles if v.available], vehicle_depots)
+        if not fleet:
+            raise ValueError("No available vehicles to route")
+        
+        time_windows = self._time_windows(stores, n_depots)
+        warm_routes, incumbents = self._warm_start_routes(stores, vehicles, distance_matrix, start_time)
+        allowed = self._depot_candidates(distances, n_depots, warm_routes, locations)
+        
+        vehicle_types = []
+        for group in fleet:
+            depot = vehicle_depots[group[0].id]
+            vehicle_types.append(VehicleType(
+                depot=depot,
+                capacity=self._capacity(group[0]),
+                count=len(group),
+                costs=distances * group[0].cost_per_mile + times * group[0].cost_per_hour + tolls,
+                customers=np.flatnonzero(allowed[depot]),
+            ))
+        
+        planner = ColumnGenerationPlanner(
+            demands, vehicle_types,
+            time_limit=max(self.time_limit - (time.time() - start_time), 1),
+            mip_gap=self.mip_gap,
+            neighbors=self.arc_neighbors,
+            travel_times=times,
+            time_windows=time_windows,
+            constraints=self._constraint_engine(distances, times, demands, n_depots)
+        )
+        vehicle_type = {vehicle.id: t for t, group in enumerate(fleet) for vehicle in group}
+        location_index = {name: i for i, name in enumerate(locations)}
+        planner.set_incumbent([
+            (vehicle_type[route.vehicle_id], [location_index[stop] for stop in route.stops[1:-1]])
+            for route in warm_routes
+        ])
+        result = planner.solve()
+        
+        routes = []
+        available = [list(group) for group in fleet]
+        for column in result.columns:
+            vehicle = available[column.vehicle_type].pop(0)
+            routes.append(self._build_route(vehicle, list(column.sequence), locations, distances, times,
+                                            demands, depot=vehicle_types[column.vehicle_type].depot,
+                                            time_windows=time_windows))
+        
+        solver_stats = {
+            'iterations': result.iterations,
+            'columns': result.n_columns,
+            'lp_bound': result.lp_bound,
+            'proven': result.proven,
+            'unassigned_stores': [stores[j - n_depots].id for j in result.stats['unserved']],
+            'incumbents': incumbents,
+            **result.stats,
+        }
+        logger.info(f"Column generation: {result.iterations} iterations, {result.n_columns} columns, "
+                    f"LP bound {result.lp_bound:.2f}, objective {result.objective_value:.2f}")
+        return self._build_result(routes, vehicles, result.status, time.time() - start_time,
+                                  result.objective_value, gap=result.gap, solver_stats=solver_stats)
+    
+    def optimize_deliveries_decomposed(self, stores: List[Store], suppliers: List[Supplier], 
+                                       vehicles: List[Vehicle], 
+                                       distance_matrix: Optional[DistanceMatrix] = None) -> OptimizationResult:
+        # Each cluster builds its own small matrix (served from the on-disk cache), so distance_matrix is unused
+        start_time = time.time()
+        fleet = [vehicle for vehicle in vehicles if vehicle.available]
+        clusters = plan_clusters(stores, fleet, self._depot_coordinates(vehicles), self.cluster_size)
+        
+        workers = min(self.cluster_workers or os.cpu_count() or 1, max(len(clusters), 1))
+        rounds = int(np.ceil(len(clusters) / workers)) if clusters else 1
+        cluster_time = max(self.time_limit / rounds, 1)
+        cluster_config = dict(
+            self.config,
+            method=self.cluster_method,
+            time_limit_seconds=cluster_time,
+            heuristic_time_limit=min(self.heuristic_time_limit, cluster_time),
+            heuristic_workers=1,  # No nested process pools
+        )
+        # Workers get their tolls with the task instead of each looking them up again
+        cluster_config.pop('tolls', None)
+        
+        # Tolls are looked up over each cluster's own arcs, not the full matrix; the cluster matrices
+        # built for that are handed to the workers too
+        matrices: List[Optional[DistanceMatrix]] = [None] * len(clusters)
+        tolls: List[Optional[Tuple]] = [None] * len(clusters)
+        if self.toll_service is not None:
+            for c, cluster in enumerate(clusters):
+                matrices[c] = self.get_distance_matrix(cluster.stores, cluster.vehicles)
+                arcs, locations = self._toll_arcs(cluster.stores, cluster.vehicles, matrices[c])
+                tolls[c] = (self.toll_service.segments(arcs, locations), list(locations.values()))
+        tasks = [(cluster_config, cluster.stores, cluster.vehicles, matrices[c], tolls[c])
+                 for c, cluster in enumerate(clusters)]
+        
+        logger.info(f"Decomposed {len(stores)} stores into {len(clusters)} clusters "
+                    f"({workers} workers, {cluster_time:.0f}s each)")
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_solve_cluster, tasks))
+        else:
+            results = [_solve_cluster(task) for task in tasks]
+        
+        routes = [route for result in results for route in result.routes]
+        objective_value = sum(result.objective_value for result in results)
+        depot_names, _, vehicle_depots = self._depot_layout(stores, vehicles)
+        
+        # Stores a cluster could not fit go to whatever trucks no cluster used
+        served = {stop for route in routes for stop in route.stops}
+        leftover = [store for store in stores if store.location.name not in served]
+        used_vehicles = {route.vehicle_id for route in routes}
+        spare = [vehicle for vehicle in fleet if vehicle.id not in used_vehicles]
+        if leftover and spare:
+            repair_routes, _ = self._solve_heuristic(leftover, spare,
+                                                     time_limit=min(self.heuristic_time_limit, 5))
+            routes.extend(repair_routes)
+            objective_value += sum(route.total_cost for route in repair_routes)
+        
+        # Sub-solves only see their own depot as 'depot'; restore the name it has in the full problem
+        for route in routes:
+            route.stops[0] = route.stops[-1] = depot_names[vehicle_depots[route.vehicle_id]]
+        
+        # Combined gap from each cluster's bound; unknown if any cluster has none
+        gap = None
+        if results and all(result.gap is not None for result in results) and objective_value > 0:
+            bound = sum(result.objective_value * (1 - result.gap) for result in results)
+            gap = max(0.0, (objective_value - bound) / objective_value)
+        
+        served = {stop for route in routes for stop in route.stops}
+        solver_stats = {
+            'clusters': [
+                {
+                    'depot': cluster.depot,
+                    'stores': len(cluster.stores),
+                    'vehicles': len(cluster.vehicles),
+                    'demand': cluster.demand,
+                    'status': result.solver_status,
+                    'objective_value': result.objective_value,
+                    'gap': result.gap,
+                    'solve_time': result.solve_time,
+                }
+                for cluster, result in zip(clusters, results)
+            ],
+            'unassigned_stores': [store.id for store in stores if store.location.name not in served],
+        }
+        return self._build_result(routes, vehicles, "Decomposed", time.time() - start_time,
+                                  objective_value, gap=gap, solver_stats=solver_stats)
+    
+    def optimize_deliveries_heuristic(self, stores: List[Store], suppliers: List[Supplier], 
+                                      vehicles: List[Vehicle], 
+                                      distance_matrix: Optional[DistanceMatrix] = None) -> OptimizationResult:
+        start_time = time.time()
+        routes, solver_stats = self._solve_heuristic(stores, vehicles, None,
+                                                     distance_matrix)
+        return self._build_result(routes, vehicles, "Heuristic", time.time() - start_time,
+                                  sum(route.total_cost for route in routes), solver_stats=solver_stats)
+    
+    def optimize_deliveries_greedy(self, stores: List[Store], suppliers: List[Supplier], 
+                                   vehicles: List[Vehicle], 
+                                   distance_matrix: Optional[DistanceMatrix] = None) -> OptimizationResult:
+        start_time = time.time()
+        routes = self.optimize_vehicle_routing_greedy(stores, vehicles, self._depot_coordinates(vehicles))
+        return self._build_result(routes, vehicles, "Heuristic", time.time() - start_time,
+                                  sum(route.total_cost for route in routes))
+    
+    def reoptimize(self, previous: OptimizationResult, stores: List[Store], vehicles: List[Vehicle],
+                   changes: OrderChanges,
+                   distance_matrix: Optional[DistanceMatrix] = None) -> OptimizationResult:
+        # Repairs previous (planned for stores) after changes: routes that lost, or had edited,
+        # stores are reopened along with spare trucks, edited stores stay put while their route
+        # still fits, displaced and new stores are inserted cheapest-first, and local search runs on the reopened routes only. Other routes stay as
+        # they were unless a store fits nowhere else.
+        start_time = time.time()
+        replaced = {store.id for store in changes.modified_stores}
+        dropped = set(changes.removed_store_ids) | replaced
+        current = ([store for store in stores if store.id not in dropped] +
+                   list(changes.modified_stores) + list(changes.added_stores))
+        fleet = [vehicle for vehicle in vehicles
+                 if vehicle.available and vehicle.id not in set(changes.unavailable_vehicle_ids)]
+        if not fleet:
+            raise ValueError("No available vehicles to route")
+        
+        if distance_matrix is None:
+            distance_matrix = self.get_distance_matrix(current, fleet)
+        if self.toll_service is not None:
+            self.prefetch_tolls(current, fleet, distance_matrix)
+        depot_names, _, vehicle_depots = self._depot_layout(current, fleet)
+        n_depots = len(depot_names)
+        locations = depot_names + [store.location.name for store in current]
+        location_index = {name: i for i, name in enumerate(locations)}
+        distances = self._get_distance_array(locations, distance_matrix)
+        times = self._get_time_array(locations, distance_matrix)
+        tolls = self._get_toll_array(locations, distances)
+        demands = np.array([0] * n_depots + [store.demand_pallets for store in current], dtype=np.int64)
+        time_windows = self._time_windows(current, n_depots)
+        engine = self._constraint_engine(distances, times, demands, n_depots)
+        
+        rate_costs: Dict[Tuple[float, float], np.ndarray] = {}
+        
+        def arc_costs(vehicle: Vehicle) -> np.ndarray:
+            key = (vehicle.cost_per_mile, vehicle.cost_per_hour)
+            if key not in rate_costs:
+                rate_costs[key] = distances * key[0] + times * key[1] + tolls
+            return rate_costs[key]
+        
+        def feasible(vehicle: Vehicle, sequence: List[int]) -> bool:
+            path = [vehicle_depots[vehicle.id]] + sequence + [vehicle_depots[vehicle.id]]
+            if int(demands[path].sum()) > self._capacity(vehicle):
+                return False
+            if engine is not None and not engine.within(engine.path_totals(path)):
+                return False
+            return time_windows is None or time_windows.is_feasible(path, times)
+        
+        # Split the previous plan into fixed routes and reopened (vehicle, store indices) pairs
+        dirty = {store.location.name for store in stores if store.id in dropped}
+        gone = {store.location.name for store in stores if store.id in set(changes.removed_store_ids)}
+        by_id = {vehicle.id: vehicle for vehicle in fleet}
+        fixed: List[Route] = []
+        reopened: List[Tuple[Vehicle, List[int]]] = []
+        for route in previous.routes:
+            stops = route.stops[1:-1]
+            vehicle = by_id.get(route.vehicle_id)
+            kept = [location_index[stop] for stop in stops if stop not in gone and stop in location_index]
+            if vehicle is None or route.stops[0] != locations[vehicle_depots[vehicle.id]]:
+                reopened.append((None, kept))
+            elif dirty.intersection(stops):
+                reopened.append((vehicle, kept))
+            else:
+                fixed.append(route)
+        
+        # Edited stores stay on their truck while the route still fits, otherwise they are reinserted
+        edited = {location_index[store.location.name] for store in changes.modified_stores}
+        for vehicle, sequence in reopened:
+            if vehicle is not None and not feasible(vehicle, sequence):
+                sequence[:] = [i for i in sequence if i not in edited]
+        
+        # Stores of routes whose truck is gone, plus new, edited and previously unserved stores, need a place
+        routed = {i for vehicle, sequence in reopened if vehicle is not None for i in sequence}
+        routed |= {location_index[stop] for route in fixed for stop in route.stops[1:-1]}
+        pending = [i for i in range(n_depots, len(locations)) if i not in routed]
+        reopened = [(vehicle, sequence) for vehicle, sequence in reopened if vehicle is not None]
+        used = {route.vehicle_id for route in fixed} | {vehicle.id for vehicle, _ in reopened}
+        reopened.extend((vehicle, []) for vehicle in fleet if vehicle.id not in used)
         
-        return assignments
+        def cheapest_insertion(c: int, candidates: List[Tuple[Vehicle, List[int]]]) -> Optional[Tuple]:
+            best = None
+            for r, (vehicle, sequence) in enumerate(candidates):
+                if sum(int(demands[i]) for i in sequence) + int(demands[c]) > self._capacity(vehicle):
+                    continue
+                depot = vehicle_depots[vehicle.id]
+                path = np.array([depot] + sequence + [depot], dtype=np.intp)
+                costs = arc_costs(vehicle)
+                deltas = costs[path[:-1], c] + costs[c, path[1:]] - costs[path[:-1], path[1:]]
+                for q in np.argsort(deltas, kind='stable'):
+                    if best is not None and deltas[q] >= best[0]:
+                        break
+                    if feasible(vehicle, sequence[:q] + [c] + sequence[q:]):
+                        best = (float(deltas[q]), r, int(q))
+                        break
+            return best
+        
+        # Heaviest stores first; a fixed route only reopens for a store nothing else can take
+        unassigned = []
+        for c in sorted(pending, key=lambda i: -demands[i]):
+            best = cheapest_insertion(c, reopened)
+            if best is None:
+                candidates = [(by_id[route.vehicle_id], [location_index[stop] for stop in route.stops[1:-1]])
+                              for route in fixed]
+                best = cheapest_insertion(c, candidates)
+                if best is None:
+                    unassigned.append(c)
+                    continue
+                reopened.append(candidates[best[1]])
+                fixed.pop(best[1])
+                best = (best[0], len(reopened) - 1, best[2])
+            _, r, q = best
+            reopened[r][1].insert(q, c)
+        
+        # Local search per group of interchangeable trucks, over the reopened routes only
+        routes = list(fixed)
+        elapsed = time.time() - start_time
+        groups = self._group_vehicles([vehicle for vehicle, _ in reopened], vehicle_depots)
+        members = {id(vehicle): sequence for vehicle, sequence in reopened}
+        released = []
+        for group in groups:
+            depot = vehicle_depots[group[0].id]
+            carriers = [vehicle for vehicle in group if members[id(vehicle)]]
+            sequences = [members[id(vehicle)] for vehicle in carriers]
+            if not sequences:
+                continue
+            index = np.array([depot] + [i for sequence in sequences for i in sequence], dtype=np.intp)
+            local = {int(i): k for k, i in enumerate(index)}
+            sub = np.ix_(index, index)
+            problem = RoutingProblem(
+                costs=arc_costs(group[0])[sub],
+                demands=demands[index],
+                capacity=self._capacity(group[0]),
+                travel_times=times[sub],
+                time_windows=time_windows.subset(index) if time_windows is not None else None,
+                constraints=engine.subset(index) if engine is not None else None
+            )
+            budget = max(self.reoptimize_time_limit - elapsed, 0.0) * len(index) / len(locations)
+            improved = improve_routes(problem, [[local[i] for i in sequence] for sequence in sequences], budget)
+            improved = [[int(i) for i in index[sequence]] for sequence in improved]
+            paired = self._match_routes(carriers, sequences, improved)
+            released.extend(vehicle.id for vehicle in carriers if vehicle.id not in paired)
+            for vehicle in carriers:
+                if vehicle.id in paired:
+                    routes.append(self._build_route(vehicle, paired[vehicle.id], locations,
+                                                    distances, times, demands, depot=depot,
+                                                    time_windows=time_windows))
+        
+        solver_stats = {
+            'fixed_routes': len(fixed),
+            'reoptimized_routes': len(routes) - len(fixed),
+            'inserted_stores': len(pending) - len(unassigned),
+            'unassigned_stores': [current[j - n_depots].id for j in sorted(unassigned)],
+            'released_vehicles': released,
+        }
+        if self.route_limits.enabled:
+            solver_stats['constraint_violations'] = self.validate_routes(routes, fleet)
+        return self._build_result(routes, fleet, "Reoptimized", time.time() - start_time,
+                                  sum(route.total_cost for route in routes), solver_stats=solver_stats)
     
     def optimize_vehicle_routing_heuristic(self, stores: List[Store], 
                                          vehicles: List[Vehicle],
                                          depot_location: Tuple[float, float]) -> List[Route]:
+        routes, _ = self._solve_heuristic(stores, vehicles, depot_location)
+        return routes
+    
+    def optimize_vehicle_routing_greedy(self, stores: List[Store], 
+                                        vehicles: List[Vehicle],
+                                        depot_location: Tuple[float, float]) -> List[Route]:
         
         routes = []
         unassigned_stores = stores.copy()
@@ -229,7 +906,7 @@ class PalletOptimizer:
                         route_coords[i+1][0], route_coords[i+1][1]
                     )
                     total_distance += segment_distance
-                    total_time += segment_distance / 55.0  # 55 mph average
+                    total_time += segment_distance / self.avg_speed_mph
                 
                 route = Route(
                     id=f"route_{uuid.uuid4().hex[:8]}",
@@ -246,7 +923,160 @@ class PalletOptimizer:
         
         return routes
     
-    def _get_solver(self):
+    def _solve_heuristic(self, stores: List[Store], vehicles: List[Vehicle],
+                         depot_location: Optional[Tuple[float, float]] = None,
+                         distance_matrix: Optional[DistanceMatrix] = None,
+                         time_limit: Optional[float] = None) -> Tuple[List[Route], Dict]:
+        # depot_location forces a single shared depot; otherwise each vehicle returns to its own
+        fleet = [vehicle for vehicle in vehicles if vehicle.available]
+        if not stores or not fleet:
+            return [], {'unassigned_stores': [store.id for store in stores]}
+        
+        if distance_matrix is None:
+            distance_matrix = self.get_distance_matrix(stores, vehicles, depot_location)
+        
+        depot_names, depot_coords, vehicle_depots = self._depot_layout(stores, vehicles, depot_location)
+        n_depots = len(depot_names)
+        locations = depot_names + [store.location.name for store in stores]
+        distances = self._get_distance_array(locations, distance_matrix)
+        times = self._get_time_array(locations, distance_matrix)
+        tolls = self._get_toll_array(locations, distances)
+        demands = np.array([0] * n_depots + [store.demand_pallets for store in stores], dtype=np.int64)
+        coordinates = np.array(depot_coords + [
+            (store.location.latitude, store.location.longitude) for store in stores
+        ])
+        time_windows = self._time_windows(stores, n_depots)
+        engine = self._constraint_engine(distances, times, demands, n_depots)
+        
+        # Nearest-depot pre-assignment, bounded by the pallets each depot's trucks can carry
+        fleets = [[v for v in fleet if vehicle_depots[v.id] == d] for d in range(n_depots)]
+        store_demands = demands[n_depots:]
+        if n_depots > 1:
+            fleet_capacity = np.array([sum(self._capacity(v) for v in group) for group in fleets], dtype=float)
+            depot_costs = np.minimum(distances[:n_depots, n_depots:], distances[n_depots:, :n_depots].T).T
+            labels = assign_by_cost(depot_costs, store_demands.astype(float), fleet_capacity)
+        else:
+            labels = np.zeros(len(stores), dtype=np.intp)
+        
+        routes = []
+        unassigned = []
+        capacities_used = []
+        time_limit = time_limit or self.heuristic_time_limit
+        for repair in (False, True):
+            if repair:
+                # Stores no depot could fit retry on the trucks left over, at the nearest depot that has any
+                spare = np.array([sum(self._capacity(v) for v in group) for group in fleets], dtype=float)
+                if not unassigned or not spare.any():
+                    break
+                pending = np.array(sorted(unassigned), dtype=np.intp)
+                costs = distances[:n_depots, pending].T + np.where(spare > 0, 0.0, np.inf)
+                labels = np.full(len(stores), -1, dtype=np.intp)
+                labels[pending - n_depots] = assign_by_cost(costs, demands[pending].astype(float), spare)
+                unassigned = []
+            
+            for d in range(n_depots):
+                members = np.flatnonzero(labels == d) + n_depots
+                if not len(members):
+                    continue
+                if not fleets[d]:
+                    unassigned.extend(members)
+                    continue
+                
+                # Plan with the smallest truck that still carries the largest single order,
+                # so every planned route fits any truck at least that size
+                capacities = sorted({self._capacity(vehicle) for vehicle in fleets[d]})
+                capacity = next((c for c in capacities if c >= demands[members].max()), capacities[-1])
+                capacities_used.append(capacity)
+                rates = fleets[d][0]
+                
+                index = np.concatenate(([d], members))
+                sub = np.ix_(index, index)
+                problem = RoutingProblem(
+                    costs=distances[sub] * rates.cost_per_mile + times[sub] * rates.cost_per_hour + tolls[sub],
+                    demands=demands[index],
+                    capacity=capacity,
+                    coordinates=coordinates[index],
+                    travel_times=times[sub],
+                    time_windows=time_windows.subset(index) if time_windows is not None else None,
+                    constraints=engine.subset(index) if engine is not None else None
+                )
+                sequences, _ = solve_multistart(problem, starts=self.heuristic_starts,
+                                                time_limit=time_limit * len(members) / len(stores),
+                                                workers=self.heuristic_workers)
+                
+                # Best fit: heaviest routes first, each onto the smallest remaining truck that holds it
+                # Too big for the planning truck, or no truck from this depot can make its window
+                servable = set(index[problem.servable()].tolist())
+                unassigned.extend(j for j in members if j not in servable)
+                fleets[d].sort(key=self._capacity)
+                for sequence in sorted(sequences, key=lambda seq: -int(demands[index[seq]].sum())):
+                    stops = index[sequence]
+                    load = int(demands[stops].sum())
+                    vehicle = next((v for v in fleets[d] if self._capacity(v) >= load), None)
+                    if vehicle is None:
+                        unassigned.extend(stops)
+                        continue
+                    fleets[d].remove(vehicle)
+                    routes.append(self._build_route(vehicle, list(stops), locations, distances, times,
+                                                    demands, depot=d, time_windows=time_windows))
+        
+        solver_stats = {
+            'unassigned_stores': [stores[j - n_depots].id for j in sorted(unassigned)],
+            'planning_capacity': min(capacities_used) if capacities_used else None,
+            'depots': n_depots,
+        }
+        return routes, solver_stats
+    
+    def _warm_start_routes(self, stores: List[Store], vehicles: List[Vehicle],
+                           distance_matrix: DistanceMatrix, start_time: float) -> Tuple[List[Route], List]:
+        if not self.warm_start or not stores:
+            return [], []
+        
+        budget = min(self.heuristic_time_limit, self.time_limit * self.warm_start_fraction)
+        routes, heuristic_stats = self._solve_heuristic(stores, vehicles, None,
+                                                        distance_matrix, time_limit=budget)
+        if heuristic_stats.get('unassigned_stores'):
+            # A partial plan is not a feasible MIP start
+            return [], []
+        
+        cost = sum(route.total_cost for route in routes)
+        return routes, [(time.time() - start_time, cost)]
+    
+    def _solve(self, prob: pulp.LpProblem, start_time: float, warm_start: bool = False) -> Dict:
+        # Solve within what is left of time_limit_seconds, recording CBC incumbents as they appear
+        remaining = max(self.time_limit - (time.time() - start_time), 1)
+        solver_start = time.time()
+        stats = {'incumbents': [], 'bound': None}
+        
+        if self.solver_name != 'CBC':
+            prob.solve(self._get_solver(remaining, warm_start))
+        else:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                log_path = os.path.join(tmp_dir, 'cbc.log')
+                with CbcLogMonitor(log_path) as monitor:
+                    prob.solve(self._get_solver(remaining, warm_start, log_path))
+                stats['bound'] = monitor.summary()['bound']
+                offset = solver_start - start_time
+                stats['incumbents'] = sorted((offset + seconds, value) for seconds, value in monitor.incumbents)
+        
+        stats['solver_time'] = time.time() - solver_start
+        return stats
+    
+    def _objective_and_gap(self, prob: pulp.LpProblem, routes: List[Route],
+                           solve_stats: Dict) -> Tuple[float, Optional[float]]:
+        if prob.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            objective_value = pulp.value(prob.objective) or 0
+        else:
+            objective_value = sum(route.total_cost for route in routes)
+        
+        gap = relative_gap(objective_value, solve_stats.get('bound'))
+        if gap is None and prob.sol_status == pulp.LpSolutionOptimal:
+            gap = 0.0
+        return objective_value, gap
+    
+    def _get_solver(self, time_limit: Optional[float] = None, warm_start: bool = False,
+                    log_path: Optional[str] = None):
+        time_limit = time_limit or self.time_limit
         solver_map = {
             'CBC': pulp.PULP_CBC_CMD,
             'GLPK': pulp.GLPK_CMD,
@@ -256,70 +1086,440 @@ class PalletOptimizer:
         
         solver_class = solver_map.get(self.solver_name, pulp.PULP_CBC_CMD)
         
+        # With a log file the CBC output goes there for the monitor, not to stdout
+        options = {'timeLimit': time_limit, 'gapRel': self.mip_gap, 'msg': 0 if log_path else 1}
+        if warm_start and self.solver_name != 'GLPK':
+            options['warmStart'] = True
+        
         try:
             if self.solver_name in ['CPLEX', 'GUROBI']:
-                return solver_class(timeLimit=self.time_limit, mip=True, msg=1)
+                return solver_class(mip=True, **options)
+            elif self.solver_name == 'GLPK':
+                return solver_class(**options)
             else:
-                return solver_class(timeLimit=self.time_limit, msg=1)
+                return solver_class(logPath=log_path, **options)
         except:
             # Fallback to CBC if other solvers are not available
-            return pulp.PULP_CBC_CMD(timeLimit=self.time_limit, msg=1)
+            return pulp.PULP_CBC_CMD(logPath=log_path, **options)
+    
+    def _depot_coordinates(self, vehicles: List[Vehicle]) -> Tuple[float, float]:
+        for vehicle in vehicles:
+            if vehicle.current_location is not None:
+                return (vehicle.current_location.latitude, vehicle.current_location.longitude)
+        return DEFAULT_DEPOT_COORDINATES
+    
+    def _depot_layout(self, stores: List[Store], vehicles: List[Vehicle],
+                      depot_location: Optional[Tuple[float, float]] = None
+                      ) -> Tuple[List[str], List[Tuple[float, float]], Dict[str, int]]:
+        # One depot per distinct vehicle start location; vehicles without one use the primary depot.
+        # A single depot keeps the 'depot' name so existing matrices and routes still line up.
+        if depot_location is not None:
+            return ['depot'], [tuple(depot_location)], {vehicle.id: 0 for vehicle in vehicles}
+        
+        primary = self._depot_coordinates(vehicles)
+        coords: List[Tuple[float, float]] = []
+        labels: List[Optional[str]] = []
+        vehicle_depots: Dict[str, int] = {}
+        for vehicle in vehicles:
+            key = vehicle_depot(vehicle, primary)
+            if key not in coords:
+                coords.append(key)
+                labels.append(vehicle.current_location.name if vehicle.current_location else None)
+            vehicle_depots[vehicle.id] = coords.index(key)
+        
+        if len(coords) <= 1:
+            return ['depot'], [coords[0] if coords else primary], vehicle_depots
+        
+        store_names = {store.location.name for store in stores}
+        names = []
+        for d, label in enumerate(labels):
+            if not label or label in names or label in store_names or labels.count(label) > 1:
+                label = f"depot_{d + 1}"
+            names.append(label)
+        return names, coords, vehicle_depots
+    
+    def _depot_candidates(self, distances: np.ndarray, n_depots: int,
+                          routes: Optional[List[Route]] = None,
+                          locations: Optional[List[str]] = None) -> np.ndarray:
+        # allowed[d, j]: store j may be served from depot d (its nearest depot_candidates depots).
+        # Depot/store pairs used by any given routes stay allowed so a warm start remains feasible.
+        n = len(distances)
+        allowed = np.zeros((n_depots, n), dtype=bool)
+        if n_depots == 1 or self.depot_candidates >= n_depots:
+            allowed[:, n_depots:] = True
+        elif n > n_depots:
+            depot_costs = distances[:n_depots, n_depots:] + distances[n_depots:, :n_depots].T
+            nearest = np.argsort(depot_costs, axis=0)[:max(self.depot_candidates, 1)]
+            allowed[nearest, np.arange(n_depots, n)[None, :]] = True
+        
+        if routes and locations:
+            location_index = {name: i for i, name in enumerate(locations)}
+            for route in routes:
+                depot = location_index[route.stops[0]]
+                allowed[depot, [location_index[stop] for stop in route.stops[1:-1]]] = True
+        return allowed
     
     def _get_distance(self, loc1: str, loc2: str, distance_matrix: Optional[DistanceMatrix]) -> float:
-        if distance_matrix and (loc1, loc2) in distance_matrix.distances:
-            return distance_matrix.distances[(loc1, loc2)]
+        if distance_matrix:
+            distance = distance_matrix.distance(loc1, loc2)
+            if distance is not None:
+                return distance
         
         # Default distance if not in matrix
         return 50.0
     
+    def _get_distance_array(self, locations: List[str],
+                            distance_matrix: Optional[DistanceMatrix]) -> np.ndarray:
+        # Dense arc distances for the model's locations, 50 miles where unknown
+        if distance_matrix:
+            return distance_matrix.submatrix(locations, default=50.0)
+        
+        distances = np.full((len(locations), len(locations)), 50.0)
+        np.fill_diagonal(distances, 0.0)
+        return distances
+    
+    def _get_time_array(self, locations: List[str],
+                        distance_matrix: Optional[DistanceMatrix]) -> np.ndarray:
+        if distance_matrix:
+            return distance_matrix.submatrix(locations, default=50.0 / self.avg_speed_mph, times=True)
+        return self._get_distance_array(locations, None) / self.avg_speed_mph
+    
+    def _get_toll_array(self, locations: List[str], distances: np.ndarray) -> np.ndarray:
+        # Per-arc toll cost for the model's locations, zero until tolls are loaded
+        if not self.prices_tolls:
+            return np.zeros(distances.shape)
+        return self.cost_calculator.arc_toll_costs(locations, distances)
+    
+    def _route_tolls(self, stops: List[str]) -> float:
+        if not self.prices_tolls:
+            return 0.0
+        return sum(self.cost_calculator.calculate_toll_cost(a, b) for a, b in zip(stops[:-1], stops[1:]))
+    
+    def _toll_arcs(self, stores: List[Store], vehicles: List[Vehicle],
+                   distance_matrix: DistanceMatrix) -> Tuple[List[Tuple[str, str]], Dict[str, Location]]:
+        # Every arc the solvers may use (the pruned compact-model arc set), and a location per name
+        depot_names, _, vehicle_depots = self._depot_layout(stores, vehicles)
+        names = depot_names + [store.location.name for store in stores]
+        locations = {store.location.name: store.location for store in stores}
+        for vehicle in vehicles:
+            if vehicle.current_location is not None:
+                locations.setdefault(depot_names[vehicle_depots[vehicle.id]], vehicle.current_location)
+        
+        demands = np.array([0] * len(depot_names) + [store.demand_pallets for store in stores])
+        capacity = max((self._capacity(vehicle) for vehicle in vehicles), default=0)
+        candidates = self._prune_arcs(self._get_distance_array(names, distance_matrix), demands, capacity,
+                                      len(depot_names))
+        return [(names[i], names[j]) for i, j in zip(*np.nonzero(candidates))], locations
+    
+    def _load_units(self, demands: np.ndarray, n_depots: int) -> Tuple[np.ndarray, int]:
+        # Pallets times scale, plus one unit per store. scale is one more than the number of stores,
+        # so a vehicle of capacity c holds c * scale + scale - 1 units: exactly c pallets' worth,
+        # however many stores it visits.
+        scale = len(demands) - n_depots + 1
+        units = np.asarray(demands, dtype=np.int64) * scale
+        units[n_depots:] += 1
+        return units, scale
+    
+    def _time_windows(self, stores: List[Store], n_depots: int) -> Optional[TimeWindows]:
+        return store_time_windows(stores, n_depots, self.service_time_minutes, self.depot_open_hour)
+    
+    def _capacity(self, vehicle: Vehicle) -> int:
+        return self.route_limits.vehicle_capacity(vehicle)
+    
+    def _constraint_engine(self, distances: np.ndarray, times: np.ndarray, demands: np.ndarray,
+                           n_depots: int) -> Optional[ConstraintEngine]:
+        # Pallet and weight limits are already folded into vehicle capacities; only the
+        # order-dependent distance and hours limits need the engine inside the solvers
+        if not self.route_limits.limits_routes:
+            return None
+        return ConstraintEngine(distances, times, demands, self.route_limits,
+                                self.service_time_minutes / 60.0, n_depots)
+    
+    def _time_feasible_arcs(self, time_windows: Optional[TimeWindows], times: np.ndarray,
+                            routes: Optional[List[Route]] = None,
+                            locations: Optional[List[str]] = None) -> np.ndarray:
+        # i -> j is useless if leaving i at its earliest still reaches j after its window closes
+        if time_windows is None:
+            return np.ones(times.shape, dtype=bool)
+        earliest_arrival = (time_windows.earliest + time_windows.service)[:, None] + times
+        mask = earliest_arrival <= time_windows.latest[None, :] + 1e-9
+        
+        if routes and locations:
+            location_index = {name: i for i, name in enumerate(locations)}
+            for route in routes:
+                path = [location_index[stop] for stop in route.stops]
+                mask[path[:-1], path[1:]] = True
+        return mask
+    
+    def _add_time_window_constraints(self, builder: ModelBuilder, x: Dict, arc_keys: List[Tuple],
+                                     time_windows: TimeWindows, times: np.ndarray,
+                                     n_depots: int) -> Dict:
+        # start[j]: when service begins at store j. Depots are fixed at their opening time, so every
+        # arc i -> j used by any vehicle forces start[j] >= start[i] + service[i] + travel[i, j].
+        n_locations = len(times)
+        horizon = time_windows.horizon(times)
+        earliest = time_windows.earliest
+        latest = np.minimum(time_windows.latest, horizon)
+        service = time_windows.service
+        
+        start = builder.continuous_variables("start", range(n_depots, n_locations), up_bound={
+            j: float(latest[j]) for j in range(n_depots, n_locations)
+        })
+        for j in range(n_depots, n_locations):
+            start[j].lowBound = float(earliest[j])
+        
+        arcs: Dict[Tuple[int, int], List] = {}
+        for key in arc_keys:
+            arcs.setdefault((key[0], key[1]), []).append(x[key])
+        
+        for (i, j), arc_vars in arcs.items():
+            travel = float(service[i] + times[i, j])
+            big_m = float(latest[i] + travel - earliest[j])
+            if big_m <= 0:
+                continue  # Never binding
+            if j >= n_depots:
+                terms = [(start[j], 1)] + [(var, -big_m) for var in arc_vars]
+                if i >= n_depots:
+                    terms.append((start[i], -1))
+                    builder.add_constraint(terms, '>=', travel - big_m)
+                else:
+                    builder.add_constraint(terms, '>=', float(earliest[i]) + travel - big_m)
+            elif np.isfinite(time_windows.latest[j]) and i >= n_depots:
+                # Back at the depot before it closes
+                return_m = float(latest[i] + travel - latest[j])
+                if return_m > 0:
+                    builder.add_constraint([(start[i], 1)] + [(var, return_m) for var in arc_vars],
+                                           '<=', float(latest[j]) - travel + return_m)
+        return start
+    
+    def _add_resource_constraints(self, builder: ModelBuilder, x: Dict, arc_keys: List[Tuple],
+                                  values: np.ndarray, bound: float, n_depots: int, name: str) -> Dict:
+        # used[j]: distance (or hours) accumulated up to and including store j, propagated along
+        # used arcs MTZ-style; the trip back to the depot must also fit under the bound.
+        n_locations = len(values)
+        first = values[:n_depots, n_depots:].min(axis=0)
+        last = values[n_depots:, :n_depots].min(axis=1)
+        used = builder.continuous_variables(f"used_{name}", range(n_depots, n_locations), up_bound={
+            j: float(max(bound - last[j - n_depots], first[j - n_depots])) for j in range(n_depots, n_locations)
+        })
+        for j in range(n_depots, n_locations):
+            used[j].lowBound = float(first[j - n_depots])
+        
+        arcs: Dict[Tuple[int, int], List] = {}
+        for key in arc_keys:
+            arcs.setdefault((key[0], key[1]), []).append(x[key])
+        
+        for (i, j), arc_vars in arcs.items():
+            value = float(values[i, j])
+            if j >= n_depots and i < n_depots:
+                builder.add_constraint([(used[j], 1)] + [(var, -value) for var in arc_vars], '>=', 0)
+            elif j >= n_depots:
+                big_m = float(used[i].upBound + value - used[j].lowBound)
+                if big_m > 0:
+                    builder.add_constraint([(used[j], 1), (used[i], -1)] + [(var, -big_m) for var in arc_vars],
+                                           '>=', value - big_m)
+            elif i >= n_depots:
+                return_m = float(used[i].upBound + value - bound)
+                if return_m > 0:
+                    builder.add_constraint([(used[i], 1)] + [(var, return_m) for var in arc_vars],
+                                           '<=', bound - value + return_m)
+        return used
+    
+    def _warm_start_times(self, start: Dict, routes: List[Route], location_index: Dict[str, int],
+                          time_windows: TimeWindows, times: np.ndarray):
+        for route in routes:
+            path = [location_index[stop] for stop in route.stops]
+            _, service_start = time_windows.schedule(path, times)
+            for node, value in zip(path[1:-1], service_start[1:-1]):
+                start[node].setInitialValue(float(value))
+    
+    @staticmethod
+    def _match_routes(vehicles: List[Vehicle], before: List[List[int]],
+                      after: List[List[int]]) -> Dict[str, List[int]]:
+        # Local search drops routes it empties and can merge two into one, so each improved route
+        # goes back to the truck whose stores it kept most of; trucks left without one are released
+        overlaps = sorted(((-len(set(route) & set(sequence)), r, v)
+                           for r, route in enumerate(after) for v, sequence in enumerate(before)))
+        paired: Dict[str, List[int]] = {}
+        matched = set()
+        for _, r, v in overlaps:
+            if r in matched or vehicles[v].id in paired:
+                continue
+            paired[vehicles[v].id] = after[r]
+            matched.add(r)
+        return paired
+    
+    def _group_vehicles(self, vehicles: List[Vehicle],
+                        vehicle_depots: Optional[Dict[str, int]] = None) -> List[List[Vehicle]]:
+        # Trucks at the same depot with the same capacity and cost rates are interchangeable in the model
+        groups: Dict[Tuple, List[Vehicle]] = {}
+        for vehicle in vehicles:
+            depot = vehicle_depots[vehicle.id] if vehicle_depots else 0
+            key = (depot, self._capacity(vehicle), vehicle.cost_per_mile, vehicle.cost_per_hour)
+            groups.setdefault(key, []).append(vehicle)
+        return list(groups.values())
+    
+    def _prune_arcs(self, distances: np.ndarray, demands: np.ndarray, capacity: int,
+                    n_depots: int = 1) -> np.ndarray:
+        n = len(distances)
+        mask = ~np.eye(n, dtype=bool)
+        n_stores = n - n_depots
+        stores = slice(n_depots, n)
+        
+        # Keep each store's k nearest neighbours (in either direction); depot arcs always stay
+        if 0 < self.arc_neighbors < n_stores - 1:
+            store_distances = distances[stores, stores].copy()
+            np.fill_diagonal(store_distances, np.inf)
+            nearest = np.argpartition(store_distances, self.arc_neighbors, axis=1)[:, :self.arc_neighbors]
+            keep = np.zeros((n_stores, n_stores), dtype=bool)
+            keep[np.arange(n_stores)[:, None], nearest] = True
+            mask[stores, stores] &= keep | keep.T
+        
+        # Two stores whose combined demand overflows a truck can never be consecutive
+        mask[stores, stores] &= (demands[stores, None] + demands[None, stores]) <= capacity
+        
+        # Store-to-store arcs that cannot fit in any depot round trip
+        if self.max_route_distance:
+            out_leg = distances[:n_depots, stores].min(axis=0)
+            back_leg = distances[stores, :n_depots].min(axis=1)
+            round_trip = out_leg[:, None] + distances[stores, stores] + back_leg[None, :]
+            mask[stores, stores] &= round_trip <= self.max_route_distance
+        
+        # Trucks never drive between depots
+        mask[:n_depots, :n_depots] = False
+        
+        return mask
+    
+    def _extract_flow_routes(self, x_vars: Dict, fleet: List[List[Vehicle]], home: List[int],
+                             locations: List[str],
+                             distances: np.ndarray, times: np.ndarray, demands: np.ndarray,
+                             time_windows: Optional[TimeWindows] = None) -> List[Route]:
+        routes = []
+        
+        for t, group in enumerate(fleet):
+            successors: Dict[int, List[int]] = {}
+            for (i, j, arc_type), var in x_vars.items():
+                if arc_type == t and pulp.value(var) is not None and pulp.value(var) > 0.5:
+                    successors.setdefault(i, []).append(j)
+            
+            depot = home[t]
+            available = list(group)
+            for first in successors.get(depot, []):
+                sequence = []
+                current = first
+                while current != depot and current not in sequence and len(sequence) < len(locations):
+                    sequence.append(current)
+                    current = successors.get(current, [depot])[0]
+                
+                if sequence and available:
+                    routes.append(self._build_route(available.pop(0), sequence, locations,
+                                                    distances, times, demands, depot=depot,
+                                                    time_windows=time_windows))
+        
+        return routes
+    
+    def _build_route(self, vehicle: Vehicle, sequence: List[int], locations: List[str],
+                     distances: np.ndarray, times: np.ndarray, demands: np.ndarray,
+                     depot: int = 0, time_windows: Optional[TimeWindows] = None) -> Route:
+        # sequence holds store indices only; the vehicle's depot is added at both ends
+        path = np.array([depot] + list(sequence) + [depot], dtype=np.intp)
+        total_distance = float(distances[path[:-1], path[1:]].sum())
+        total_time = float(times[path[:-1], path[1:]].sum())
+        
+        arrival_times = []
+        if time_windows is not None:
+            arrival, _ = time_windows.schedule(path, times)
+            arrival_times = time_windows.to_datetimes(arrival)
+        
+        stops = [locations[i] for i in path]
+        return Route(
+            id=f"route_{uuid.uuid4().hex[:8]}",
+            vehicle_id=vehicle.id,
+            stops=stops,
+            total_distance=total_distance,
+            total_time=total_time,
+            total_cost=(total_distance * vehicle.cost_per_mile + total_time * vehicle.cost_per_hour +
+                        self._route_tolls(stops)),
+            pallets_delivered=int(demands[path].sum()),
+            status=RouteStatus.PLANNED,
+            arrival_times=arrival_times
+        )
+    
+    def _build_result(self, routes: List[Route], vehicles: List[Vehicle], solver_status: str,
+                      solve_time: float, objective_value: float, gap: Optional[float] = None,
+                      solver_stats: Optional[Dict] = None) -> OptimizationResult:
+        total_distance = sum(route.total_distance for route in routes)
+        total_time = sum(route.total_time for route in routes)
+        total_cost = sum(route.total_cost for route in routes)
+        
+        # Calculate utilization
+        used_vehicles = {route.vehicle_id for route in routes}
+        total_capacity = sum(vehicle.max_pallets for vehicle in vehicles if vehicle.id in used_vehicles)
+        total_used = sum(route.pallets_delivered for route in routes)
+        utilization = total_used / max(total_capacity, 1) if total_capacity > 0 else 0
+        
+        return OptimizationResult(
+            routes=routes,
+            total_cost=total_cost,
+            total_distance=total_distance,
+            total_time=total_time,
+            utilization_rate=utilization,
+            solver_status=solver_status,
+            solve_time=solve_time,
+            objective_value=objective_value,
+            gap=gap,
+            solver_stats=solver_stats or {}
+        )
+    
     def _extract_routes(self, x_vars: Dict, locations: List[str], 
                        vehicles: List[Vehicle], stores: List[Store], 
-                       status: int) -> List[Route]:
+                       sol_status: int, distances: np.ndarray, times: np.ndarray,
+                       home: List[int], fallback_routes: Optional[List[Route]] = None,
+                       time_windows: Optional[TimeWindows] = None) -> List[Route]:
         
         routes = []
         
-        if status != pulp.LpStatusOptimal:
-            # If no optimal solution, return heuristic solution
-            depot_coords = (41.8781, -87.6298)  # Default Chicago coordinates
-            return self.optimize_vehicle_routing_heuristic(stores, vehicles, depot_coords)
+        if sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            # No usable MIP solution: keep the warm start if there was one, else run the heuristic
+            if fallback_routes:
+                return fallback_routes
+            routes, _ = self._solve_heuristic(stores, vehicles)
+            return routes
+        
+        n_depots = len(locations) - len(stores)
+        demands = np.array([0] * n_depots + [store.demand_pallets for store in stores], dtype=np.int64)
         
         for k, vehicle in enumerate(vehicles):
             route_sequence = []
-            current_loc = 0  # Start at depot
+            current_loc = home[k]  # Start at the vehicle's depot
             
             # Follow the route for this vehicle
-            while True:
+            while len(route_sequence) < len(locations):
                 next_loc = None
                 for j in range(len(locations)):
-                    if (current_loc, j, k) in x_vars and pulp.value(x_vars[current_loc, j, k]) > 0.5:
+                    if (current_loc, j, k) in x_vars and (pulp.value(x_vars[current_loc, j, k]) or 0) > 0.5:
                         next_loc = j
                         break
                 
-                if next_loc is None or next_loc == 0:  # Returned to depot or no next location
-                    break
+                if next_loc is None or next_loc < n_depots or next_loc in route_sequence:
+                    break  # Returned to depot or no next location
                     
                 route_sequence.append(next_loc)
                 current_loc = next_loc
             
             if route_sequence:
-                stops = ['depot'] + [locations[i] for i in route_sequence] + ['depot']
-                
-                # Calculate route metrics (simplified)
-                total_distance = len(route_sequence) * 50.0  # Estimate
-                total_time = total_distance / 55.0
-                pallets = sum(stores[i-1].demand_pallets for i in route_sequence if i > 0)
-                
-                route = Route(
-                    id=f"route_{uuid.uuid4().hex[:8]}",
-                    vehicle_id=vehicle.id,
-                    stops=stops,
-                    total_distance=total_distance,
-                    total_time=total_time,
-                    total_cost=total_distance * vehicle.cost_per_mile + total_time * vehicle.cost_per_hour,
-                    pallets_delivered=pallets,
-                    status=RouteStatus.PLANNED
-                )
-                
-                routes.append(route)
+                routes.append(self._build_route(vehicle, route_sequence, locations, 
+                                                distances, times, demands, depot=home[k],
+                                                time_windows=time_windows))
         
-        return routes
\ No newline at end of file
+        return routes
+
+
+def _solve_cluster(task: Tuple[Dict, List[Store], List[Vehicle], Optional[DistanceMatrix], Optional[Tuple]]
+                   ) -> OptimizationResult:
+    # Module level so ProcessPoolExecutor can pickle it
+    config, stores, vehicles, distance_matrix, tolls = task
+    optimizer = PalletOptimizer(config)
+    if tolls is not None:
+        optimizer.load_tolls(distance_matrix, *tolls)
+    return optimizer.optimize(stores, [], vehicles, distance_matrix=distance_matrix)
@@ -0,0 +1,321 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pulp
+
+from core.constraints import ConstraintEngine
+from core.model_builder import ModelBuilder
+from core.time_windows import TimeWindows
+
+
+EPSILON = 1e-6
+
+# Pricing first runs with a narrow beam; wider beams, then full labeling, only when it stops finding columns
+BEAM_SCHEDULE = (8, 32, None)
+# Full labeling gives up (and proves nothing) once a single depth holds more labels than this
+MAX_EXACT_LABELS = 50_000
+
+
+@dataclass
+class VehicleType:
+    depot: int  # location index of the depot this type starts and ends at
+    capacity: int
+    count: int
+    costs: np.ndarray  # (n, n) arc costs for this type
+    customers: np.ndarray  # location indices this type may serve
+
+
+@dataclass(frozen=True)
+class Column:
+    vehicle_type: int
+    sequence: Tuple[int, ...]  # customer location indices, depot excluded
+    cost: float
+    load: int
+
+
+@dataclass
+class ColumnGenerationResult:
+    columns: List[Column]
+    objective_value: float
+    lp_bound: float
+    status: str
+    proven: bool  # pricing proved no negative reduced cost route exists
+    iterations: int
+    n_columns: int
+    stats: Dict = field(default_factory=dict)
+    
+    @property
+    def gap(self) -> Optional[float]:
+        if not self.proven or self.objective_value <= 0:
+            return None
+        return max(0.0, (self.objective_value - self.lp_bound) / self.objective_value)
+
+
+class ColumnGenerationPlanner:
+    """Set-partitioning VRP: route columns priced by elementary labeling, master LP/IP in PuLP."""
+    
+    def __init__(self, demands: np.ndarray, vehicle_types: List[VehicleType], time_limit: float = 60.0,
+                 mip_gap: float = 0.01, neighbors: int = 15, columns_per_iteration: int = 50,
+                 ip_time_fraction: float = 0.25, travel_times: Optional[np.ndarray] = None,
+                 time_windows: Optional[TimeWindows] = None,
+                 constraints: Optional[ConstraintEngine] = None):
+        self.demands = np.asarray(demands, dtype=np.int64)
+        self.vehicle_types = vehicle_types
+        self.time_limit = time_limit
+        self.mip_gap = mip_gap
+        self.neighbors = neighbors
+        self.columns_per_iteration = columns_per_iteration
+        self.ip_time_fraction = ip_time_fraction
+        self.travel_times = travel_times
+        self.time_windows = time_windows
+        self.constraints = constraints
+        
+        self.customers = np.unique(np.concatenate([vt.customers for vt in vehicle_types]))
+        self.columns: Dict[Tuple[int, frozenset], Column] = {}
+        self.incumbent: List[Column] = []
+    
+    def add_route(self, vehicle_type: int, sequence: Sequence[int]) -> Column:
+        vt = self.vehicle_types[vehicle_type]
+        path = np.array([vt.depot] + list(sequence) + [vt.depot], dtype=np.intp)
+        column = Column(vehicle_type, tuple(int(c) for c in sequence),
+                        float(vt.costs[path[:-1], path[1:]].sum()), int(self.demands[path].sum()))
+        
+        # The same customer set is only worth keeping in its cheapest order
+        key = (vehicle_type, frozenset(column.sequence))
+        if key not in self.columns or column.cost < self.columns[key].cost - EPSILON:
+            self.columns[key] = column
+        return self.columns[key]
+    
+    def set_incumbent(self, routes: Sequence[Tuple[int, Sequence[int]]]):
+        self.incumbent = [self.add_route(t, sequence) for t, sequence in routes]
+    
+    def solve(self) -> ColumnGenerationResult:
+        started = time.time()
+        deadline = started + self.time_limit * (1 - self.ip_time_fraction)
+        
+        # Out-and-back routes keep the master feasible from the first iteration
+        for t, vt in enumerate(self.vehicle_types):
+            for c in vt.customers:
+                if self.demands[c] <= vt.capacity and self._route_feasible(vt.depot, [c]):
+                    self.add_route(t, [c])
+        # Locations no vehicle type can reach in time or within the route limits (or carry) are left out
+        covered = {c for key in self.columns for c in key[1]}
+        unserved = sorted(set(self.customers.tolist()) - covered)
+        self.customers = np.array(sorted(covered), dtype=np.intp)
+        
+        iterations = 0
+        proven = False
+        lp_bound = 0.0
+        stage = 0
+        lp_time = pricing_time = 0.0
+        while time.time() < deadline:
+            iterations += 1
+            lp_started = time.time()
+            lp_bound, duals, fleet_duals = self._solve_master_lp()
+            pricing_started = time.time()
+            lp_time += pricing_started - lp_started
+            
+            new_columns = []
+            complete = True
+            for t in range(len(self.vehicle_types)):
+                found, finished = self._price(t, duals, fleet_duals[t], BEAM_SCHEDULE[stage], deadline)
+                new_columns.extend(found)
+                complete &= finished
+            pricing_time += time.time() - pricing_started
+            
+            # A cheaper order of a customer set already in the pool replaces it and counts as new
+            added = 0
+            for column in sorted(new_columns, key=lambda col: col[0])[:self.columns_per_iteration]:
+                previous = self.columns.get((column[1], frozenset(column[2])))
+                if self.add_route(column[1], column[2]) is not previous:
+                    added += 1
+            
+            if added:
+                continue
+            if stage == len(BEAM_SCHEDULE) - 1:
+                proven = complete
+                break
+            stage += 1
+        
+        status, objective_value, selected = self._solve_master_ip(started)
+        return ColumnGenerationResult(
+            columns=selected,
+            objective_value=objective_value,
+            lp_bound=lp_bound,
+            status=status,
+            proven=proven,
+            iterations=iterations,
+            n_columns=len(self.columns),
+            stats={'lp_time': lp_time, 'pricing_time': pricing_time,
+                   'total_time': time.time() - started, 'unserved': unserved},
+        )
+    
+    def _build_master(self, relaxed: bool) -> Tuple[ModelBuilder, Dict, List[Column]]:
+        columns = list(self.columns.values())
+        builder = ModelBuilder("Route_Master")
+        keys = list(range(len(columns)))
+        if relaxed:
+            y = builder.continuous_variables("y", keys, low_bound=0)
+        else:
+            y = builder.binary_variables("y", keys)
+        builder.set_objective(y, {r: column.cost for r, column in enumerate(columns)})
+        
+        covering: Dict[int, List[int]] = {int(c): [] for c in self.customers}
+        for r, column in enumerate(columns):
+            for c in column.sequence:
+                covering[c].append(r)
+        
+        # Covering rows in the LP keep the duals non-negative; the integer master partitions
+        sense = '>=' if relaxed else '=='
+        for c, rows in covering.items():
+            builder.add_constraint(((y[r], 1) for r in rows), sense, 1, name=f"cover_{c}")
+        for t, vt in enumerate(self.vehicle_types):
+            rows = [r for r, column in enumerate(columns) if column.vehicle_type == t]
+            builder.add_constraint(((y[r], 1) for r in rows), '<=', vt.count, name=f"fleet_{t}")
+        return builder, y, columns
+    
+    def _solve_master_lp(self) -> Tuple[float, np.ndarray, np.ndarray]:
+        builder, _, _ = self._build_master(relaxed=True)
+        prob = builder.finish()
+        prob.solve(pulp.PULP_CBC_CMD(msg=0))
+        
+        duals = np.zeros(len(self.demands))
+        for c in self.customers:
+            duals[c] = prob.constraints[f"cover_{c}"].pi or 0.0
+        fleet_duals = np.array([prob.constraints[f"fleet_{t}"].pi or 0.0
+                                for t in range(len(self.vehicle_types))])
+        return pulp.value(prob.objective) or 0.0, duals, fleet_duals
+    
+    def _solve_master_ip(self, started: float) -> Tuple[str, float, List[Column]]:
+        builder, y, columns = self._build_master(relaxed=False)
+        prob = builder.finish()
+        
+        warm_start = bool(self.incumbent)
+        if warm_start:
+            chosen = {id(column) for column in self.incumbent}
+            for r, column in enumerate(columns):
+                y[r].setInitialValue(1 if id(column) in chosen else 0)
+        
+        remaining = max(self.time_limit - (time.time() - started), 5)
+        prob.solve(pulp.PULP_CBC_CMD(timeLimit=remaining, gapRel=self.mip_gap,
+                                     warmStart=warm_start, msg=0))
+        
+        if prob.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            selected = list(self.incumbent)
+            return "No Solution Found", sum(column.cost for column in selected), selected
+        
+        selected = [column for r, column in enumerate(columns) if (y[r].value() or 0) > 0.5]
+        return pulp.LpSolution[prob.sol_status], pulp.value(prob.objective) or 0.0, selected
+    
+    def _route_feasible(self, depot: int, sequence: Sequence[int]) -> bool:
+        path = [depot] + list(sequence) + [depot]
+        if self.constraints is not None and not self.constraints.within(self.constraints.path_totals(path)):
+            return False
+        if self.time_windows is None:
+            return True
+        return self.time_windows.is_feasible(path, self.travel_times)
+    
+    def _price(self, t: int, duals: np.ndarray, fleet_dual: float, beam: Optional[int],
+               deadline: float) -> Tuple[List[Tuple[float, int, Tuple[int, ...]]], bool]:
+        # Elementary labeling from the depot. With a beam only the best labels per node are kept
+        # and successors come from the cheapest reduced-cost arcs; without one, labels are pruned
+        # by dominance alone (cost, load, visited set, time, route limits), which is exact ESPPRC.
+        vt = self.vehicle_types[t]
+        depot = vt.depot
+        customers = vt.customers[(self.demands[vt.customers] <= vt.capacity) &
+                                 np.isin(vt.customers, self.customers)]
+        if not len(customers):
+            return [], True
+        
+        reduced = vt.costs - duals[None, :]
+        closing = vt.costs[:, depot] - fleet_dual
+        successors = customers[np.argsort(reduced[:, customers], axis=1)]
+        limit = self.neighbors if beam is not None else len(customers)
+        
+        # Time is a resource too: ready is when service at the label's node finishes
+        tw, times = self.time_windows, self.travel_times
+        if tw is not None:
+            earliest, latest, service = tw.earliest, tw.latest, tw.service
+            depot_ready = earliest[depot] + service[depot]
+            can_return = times[:, depot] <= latest[depot] - np.maximum(
+                depot_ready + times[depot, :], earliest) - service + EPSILON
+            customers = customers[can_return[customers]]
+        
+        # Route distance and driver hours are resources as well, with room kept for the trip back
+        engine = self.constraints
+        if engine is not None:
+            max_distance, max_hours = (float(bound) for bound in engine.bounds[:2])
+            distance, hours = engine.arc_values('distance'), engine.arc_values('hours')
+        
+        def within(used: Tuple[float, float], node: int, c: int) -> Optional[Tuple[float, float]]:
+            if engine is None:
+                return used
+            spent = (used[0] + distance[node, c], used[1] + hours[node, c])
+            if (spent[0] + distance[c, depot] > max_distance + EPSILON or
+                    spent[1] + hours[c, depot] > max_hours + EPSILON):
+                return None
+            return spent
+        
+        def arrive(ready: float, node: int, c: int) -> Optional[float]:
+            if tw is None:
+                return 0.0
+            start = max(ready + times[node, c], earliest[c])
+            if start > latest[c] + EPSILON or start + service[c] + times[c, depot] > latest[depot] + EPSILON:
+                return None
+            return start + service[c]
+        
+        # label: (reduced cost, load, node, visited bitmask, path, ready time, (miles, hours) used)
+        frontier = []
+        for c in customers:
+            c = int(c)
+            ready = arrive(depot_ready, depot, c) if tw is not None else 0.0
+            used = within((0.0, 0.0), depot, c)
+            if ready is None or used is None:
+                continue
+            frontier.append((reduced[depot, c], int(self.demands[c]), c, 1 << c, (c,), ready, used))
+        found = []
+        while frontier and time.time() < deadline:
+            extended = []
+            for rc, load, node, visited, path, ready, used in frontier:
+                total = rc + closing[node]
+                if total < -EPSILON:
+                    found.append((total, t, path))
+                
+                taken = 0
+                for c in successors[node]:
+                    if taken >= limit:
+                        break
+                    c = int(c)
+                    if visited >> c & 1 or load + self.demands[c] > vt.capacity:
+                        continue
+                    next_ready = arrive(ready, node, c)
+                    if next_ready is None:
+                        continue
+                    next_used = within(used, node, c)
+                    if next_used is None:
+                        continue
+                    taken += 1
+                    extended.append((rc + reduced[node, c], load + int(self.demands[c]), c,
+                                     visited | (1 << c), path + (c,), next_ready, next_used))
+            if beam is None and len(extended) > MAX_EXACT_LABELS:
+                return found, False
+            frontier = self._prune_labels(extended, beam)
+        return found, not frontier
+    
+    @staticmethod
+    def _prune_labels(labels: List[Tuple], beam: Optional[int]) -> List[Tuple]:
+        by_node: Dict[int, List[Tuple]] = {}
+        for label in sorted(labels, key=lambda label: label[0]):
+            kept = by_node.setdefault(label[2], [])
+            if beam is not None and len(kept) >= beam:
+                continue
+            rc, load, _, visited, _, ready, used = label
+            # Kept labels are at least as cheap; drop this one if any also uses no more capacity,
+            # time, miles or hours and visits a subset of its stores
+            if any(other[1] <= load and other[5] <= ready and other[3] & visited == other[3] and
+                   other[6][0] <= used[0] and other[6][1] <= used[1] for other in kept):
+                continue
+            kept.append(label)
+        return [label for kept in by_node.values() for label in kept]
@@ -0,0 +1,89 @@
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+INCUMBENT_PATTERN = re.compile(r"Cbc0012I Integer solution of (-?[\d.eE+-]+) found .*\(([\d.]+) seconds\)")
+MIPSTART_PATTERN = re.compile(r"(?i)mipstart.*solution with cost (-?[\d.eE+-]+)")
+SUMMARY_PATTERNS = {
+    'objective': re.compile(r"^Objective value:\s+(-?[\d.eE+-]+)", re.MULTILINE),
+    'bound': re.compile(r"^Lower bound:\s+(-?[\d.eE+-]+)", re.MULTILINE),
+    'gap': re.compile(r"^Gap:\s+(-?[\d.eE+-]+)", re.MULTILINE),
+}
+
+
+class CbcLogMonitor:
+    """Tails a CBC log file while the solver runs and records each new incumbent."""
+    
+    def __init__(self, log_path: str, poll_interval: float = 0.5):
+        self.log_path = Path(log_path)
+        self.poll_interval = poll_interval
+        self.incumbents: List[Tuple[float, float]] = []
+        self._offset = 0
+        self._buffer = ""
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+    
+    def __enter__(self) -> 'CbcLogMonitor':
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._read_new_lines()
+    
+    def best_incumbent(self) -> Optional[float]:
+        if not self.incumbents:
+            return None
+        return min(objective for _, objective in self.incumbents)
+    
+    def summary(self) -> Dict[str, Optional[float]]:
+        return parse_cbc_summary(self._read_text())
+    
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            self._read_new_lines()
+    
+    def _read_new_lines(self):
+        if not self.log_path.exists():
+            return
+        with open(self.log_path, 'r', errors='replace') as f:
+            f.seek(self._offset)
+            chunk = f.read()
+            self._offset = f.tell()
+        
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            match = INCUMBENT_PATTERN.search(line)
+            if match:
+                self.incumbents.append((float(match.group(2)), float(match.group(1))))
+                continue
+            match = MIPSTART_PATTERN.search(line)
+            if match:
+                # CBC evaluates the MIP start before branching begins
+                self.incumbents.append((0.0, float(match.group(1))))
+    
+    def _read_text(self) -> str:
+        if not self.log_path.exists():
+            return ""
+        with open(self.log_path, 'r', errors='replace') as f:
+            return f.read()
+
+
+def parse_cbc_summary(log_text: str) -> Dict[str, Optional[float]]:
+    summary = {}
+    for key, pattern in SUMMARY_PATTERNS.items():
+        matches = pattern.findall(log_text)
+        summary[key] = float(matches[-1]) if matches else None
+    return summary
+
+
+def relative_gap(objective: Optional[float], bound: Optional[float]) -> Optional[float]:
+    if objective is None or bound is None:
+        return None
+    if abs(objective) < 1e-9:
+        return 0.0 if abs(bound) < 1e-9 else None
+    return max(0.0, (objective - bound) / abs(objective))
@@ -0,0 +1,194 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pulp
+
+try:
+    from scipy import sparse
+    from scipy.optimize import linprog
+except ImportError:  # PuLP builds the same LP, only more slowly
+    linprog = None
+
+from core.model_builder import ModelBuilder
+from data.models import Store, Supplier
+
+
+# The first LP only offers each store its cheapest few suppliers, at list price and after estimated
+# congestion prices; pricing then adds any arc that could still help
+CANDIDATE_SUPPLIERS = 5
+PRICE_ESTIMATE_ROUNDS = 50
+MAX_PRICING_ROUNDS = 50
+EPSILON = 1e-7
+
+
+@dataclass
+class SupplierAssignment:
+    allocations: Dict[str, Dict[str, int]]  # store id -> supplier id -> pallets
+    unmet_demand: Dict[str, int]  # store id -> pallets no supplier had left
+    total_cost: float
+    status: str
+    iterations: int
+    proven: bool = True  # pricing found no arc left that could lower the cost
+    stats: Dict = field(default_factory=dict)
+    
+    @property
+    def primary(self) -> Dict[str, str]:
+        # The supplier sending the most pallets to each store; stores that receive nothing
+        # (no demand, or none of it met) have no entry
+        return {store_id: max(shares, key=shares.get) for store_id, shares in self.allocations.items() if shares}
+
+
+def supplier_supply(suppliers: List[Supplier]) -> np.ndarray:
+    # A supplier ships no more than it holds, nor more than it can load in a day
+    return np.array([max(min(supplier.available_pallets, supplier.capacity_per_day), 0)
+                     for supplier in suppliers], dtype=np.float64)
+
+
+def solve_transportation(costs: np.ndarray, demands: np.ndarray, supplies: np.ndarray,
+                         candidates: int = CANDIDATE_SUPPLIERS) -> Tuple[np.ndarray, np.ndarray, int, bool]:
+    # Min-cost transportation with split deliveries. Returns (flows (n, m), unmet (n,), rounds, proven),
+    # where proven is False when pricing stopped at MAX_PRICING_ROUNDS with arcs still pricing out.
+    # Unmet demand is allowed at a penalty high enough that it is only used when supply runs out.
+    n, m = costs.shape
+    flows = np.zeros((n, m))
+    unmet = demands.astype(np.float64).copy()
+    if n == 0 or m == 0 or demands.sum() <= 0:
+        return flows, unmet, 0, True
+    
+    penalty = (float(costs.max()) + 1.0) * (min(n, m) + 1)
+    k = min(candidates, m)
+    arcs = np.zeros((n, m), dtype=bool)
+    for priced_costs in (costs, costs - estimate_supply_prices(costs, demands, supplies)[None, :]):
+        arcs[np.arange(n)[:, None], _cheapest(priced_costs, k)] = True
+    
+    rounds = 0
+    while True:
+        rounds += 1
+        rows, cols = np.nonzero(arcs)
+        values, unmet, store_duals, supplier_duals = _solve_lp(costs[rows, cols], rows, cols, demands,
+                                                               supplies, penalty)
+        
+        # Arcs left out with a negative reduced cost would improve the LP; none left means optimal.
+        # Each store takes at most its k most negative ones per round so the LP stays small.
+        reduced = np.where(arcs, 0.0, costs - store_duals[:, None] - supplier_duals[None, :])
+        pricing = reduced.min(axis=1) < -EPSILON
+        proven = not pricing.any()
+        if proven or rounds >= MAX_PRICING_ROUNDS:
+            break
+        priced = np.flatnonzero(pricing)
+        best = _cheapest(reduced[priced], k)
+        arcs[priced[:, None], best] |= reduced[priced[:, None], best] < -EPSILON
+    
+    flows[rows, cols] = values
+    return flows, unmet, rounds, proven
+
+
+def estimate_supply_prices(costs: np.ndarray, demands: np.ndarray, supplies: np.ndarray) -> np.ndarray:
+    # Subgradient steps on the supply duals: oversubscribed suppliers get cheaper-looking (negative)
+    # prices until stores spread out. Only used to pick a good first arc set.
+    prices = np.zeros(costs.shape[1])
+    step = 0.2 * float(np.median(costs))
+    for r in range(PRICE_ESTIMATE_ROUNDS):
+        choice = np.argmin(costs - prices[None, :], axis=1)
+        load = np.bincount(choice, weights=demands, minlength=costs.shape[1])
+        prices = np.minimum(prices - step * 0.95 ** r * (load - supplies) / np.maximum(supplies, 1.0), 0.0)
+    return prices
+
+
+def _cheapest(costs: np.ndarray, k: int) -> np.ndarray:
+    if k >= costs.shape[1]:
+        return np.tile(np.arange(costs.shape[1]), (len(costs), 1))
+    return np.argpartition(costs, k - 1, axis=1)[:, :k]
+
+
+def _solve_lp(arc_costs: np.ndarray, rows: np.ndarray, cols: np.ndarray, demands: np.ndarray,
+              supplies: np.ndarray, penalty: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    n, m = len(demands), len(supplies)
+    n_arcs = len(arc_costs)
+    if linprog is None:
+        return _solve_lp_pulp(arc_costs, rows, cols, demands, supplies, penalty)
+    
+    # Variables: one per arc, then one unmet-demand slack per store
+    arc_index = np.arange(n_arcs)
+    demand_rows = sparse.csr_matrix((np.ones(n_arcs + n), (np.concatenate((rows, np.arange(n))),
+                                                           np.arange(n_arcs + n))), shape=(n, n_arcs + n))
+    supply_rows = sparse.csr_matrix((np.ones(n_arcs), (cols, arc_index)), shape=(m, n_arcs + n))
+    objective = np.concatenate((arc_costs, np.full(n, penalty)))
+    
+    # Dual simplex ends on a vertex, and transportation vertices are integral
+    result = linprog(objective, A_ub=supply_rows, b_ub=supplies, A_eq=demand_rows, b_eq=demands,
+                     bounds=(0, None), method='highs-ds')
+    if result.status != 0:
+        raise ValueError(f"Supplier assignment LP failed: {result.message}")
+    return (result.x[:n_arcs], result.x[n_arcs:], np.asarray(result.eqlin.marginals),
+            np.asarray(result.ineqlin.marginals))
+
+
+def _solve_lp_pulp(arc_costs: np.ndarray, rows: np.ndarray, cols: np.ndarray, demands: np.ndarray,
+                   supplies: np.ndarray, penalty: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    n, m = len(demands), len(supplies)
+    builder = ModelBuilder("Supplier_Assignment")
+    x = builder.continuous_variables("x", range(len(arc_costs)), low_bound=0)
+    slack = builder.continuous_variables("unmet", range(n), low_bound=0)
+    builder.set_objective({**{('x', a): x[a] for a in x}, **{('u', i): slack[i] for i in slack}},
+                          {**{('x', a): float(c) for a, c in enumerate(arc_costs)},
+                           **{('u', i): penalty for i in slack}})
+    
+    by_store: Dict[int, List[int]] = {}
+    by_supplier: Dict[int, List[int]] = {}
+    for a, (i, j) in enumerate(zip(rows.tolist(), cols.tolist())):
+        by_store.setdefault(i, []).append(a)
+        by_supplier.setdefault(j, []).append(a)
+    for i in range(n):
+        builder.add_constraint([(x[a], 1) for a in by_store.get(i, [])] + [(slack[i], 1)], '==',
+                               float(demands[i]), name=f"demand_{i}")
+    for j in range(m):
+        builder.add_constraint(((x[a], 1) for a in by_supplier.get(j, [])), '<=', float(supplies[j]),
+                               name=f"supply_{j}")
+    
+    prob = builder.finish()
+    prob.solve(pulp.PULP_CBC_CMD(msg=0))
+    if prob.status != pulp.LpStatusOptimal:
+        raise ValueError(f"Supplier assignment LP failed: {pulp.LpStatus[prob.status]}")
+    
+    values = np.array([x[a].value() or 0.0 for a in range(len(arc_costs))])
+    unmet = np.array([slack[i].value() or 0.0 for i in range(n)])
+    store_duals = np.array([prob.constraints[f"demand_{i}"].pi or 0.0 for i in range(n)])
+    supplier_duals = np.array([prob.constraints[f"supply_{j}"].pi or 0.0 for j in range(m)])
+    return values, unmet, store_duals, supplier_duals
+
+
+def assign_suppliers(stores: List[Store], suppliers: List[Supplier], unit_costs: np.ndarray,
+                     candidates: int = CANDIDATE_SUPPLIERS) -> SupplierAssignment:
+    demands = np.array([max(store.demand_pallets, 0) for store in stores], dtype=np.float64)
+    supplies = supplier_supply(suppliers)
+    flows, unmet, rounds, proven = solve_transportation(unit_costs, demands, supplies, candidates)
+    
+    # Integral in theory; rounding only clears solver noise
+    flows = np.rint(flows).astype(np.int64)
+    unmet = np.rint(unmet).astype(np.int64)
+    allocations: Dict[str, Dict[str, int]] = {store.id: {} for store in stores}
+    for i, j in zip(*np.nonzero(flows)):
+        allocations[stores[i].id][suppliers[j].id] = int(flows[i, j])
+    
+    total_cost = float((flows * unit_costs).sum()) if flows.size else 0.0
+    shortfall = {stores[i].id: int(unmet[i]) for i in np.flatnonzero(unmet > 0)}
+    if not proven:
+        # The last LP only saw part of the arcs, so neither optimality nor a shortfall is established
+        status = "Pricing Limit Reached"
+    else:
+        status = "Optimal" if not shortfall else "Supply Shortfall"
+    return SupplierAssignment(
+        allocations=allocations,
+        unmet_demand=shortfall,
+        total_cost=total_cost,
+        status=status,
+        iterations=rounds,
+        proven=proven,
+        stats={
+            'split_stores': int(((flows > 0).sum(axis=1) > 1).sum()) if flows.size else 0,
+            'supplied_pallets': int(flows.sum()),
+            'supplier_usage': {supplier.id: int(flows[:, j].sum()) for j, supplier in enumerate(suppliers)},
+        },
+    )
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.models import Store
+
+
+EPSILON = 1e-9
+
+# A route segment summarised for O(1) concatenation (Vidal et al. 2013, without time warp):
+# (duration, earliest start at first node, latest start at first node, violation, first node, last node)
+Segment = Tuple[float, float, float, float, int, int]
+
+
+@dataclass
+class TimeWindows:
+    earliest: np.ndarray  # service may start no earlier than this, hours after origin
+    latest: np.ndarray  # service must start by this (np.inf when open-ended)
+    service: np.ndarray  # hours spent at each location
+    origin: datetime
+    
+    def subset(self, index: Sequence[int]) -> 'TimeWindows':
+        index = np.asarray(index, dtype=np.intp)
+        return TimeWindows(self.earliest[index], self.latest[index], self.service[index], self.origin)
+    
+    def node(self, i: int) -> Segment:
+        return (float(self.service[i]), float(self.earliest[i]), float(self.latest[i]), 0.0, i, i)
+    
+    def concat(self, a: Segment, b: Segment, times: np.ndarray) -> Segment:
+        travel = times[a[5], b[4]]
+        delta = a[0] - a[3] + travel
+        wait = max(b[1] - delta - a[2], 0.0)
+        late = max(a[1] + delta - b[2], 0.0)
+        return (a[0] + b[0] + travel + wait,
+                max(b[1] - delta, a[1]) - wait,
+                min(b[2] - delta, a[2]) + late,
+                a[3] + b[3] + late,
+                a[4], b[5])
+    
+    def segment(self, nodes: Sequence[int], times: np.ndarray) -> Segment:
+        summary = self.node(nodes[0])
+        for i in nodes[1:]:
+            summary = self.concat(summary, self.node(i), times)
+        return summary
+    
+    def prefixes(self, path: Sequence[int], times: np.ndarray) -> List[Segment]:
+        summaries = [self.node(path[0])]
+        for i in path[1:]:
+            summaries.append(self.concat(summaries[-1], self.node(i), times))
+        return summaries
+    
+    def suffixes(self, path: Sequence[int], times: np.ndarray) -> List[Segment]:
+        summaries = [self.node(path[-1])]
+        for i in reversed(path[:-1]):
+            summaries.append(self.concat(self.node(i), summaries[-1], times))
+        return summaries[::-1]
+    
+    def is_feasible(self, path: Sequence[int], times: np.ndarray) -> bool:
+        return self.segment(path, times)[3] <= EPSILON
+    
+    def schedule(self, path: Sequence[int], times: np.ndarray,
+                 departure: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # Arrival and service start per stop, leaving the first node as early as allowed
+        path = np.asarray(path, dtype=np.intp)
+        arrival = np.empty(len(path))
+        start = np.empty(len(path))
+        arrival[0] = start[0] = self.earliest[path[0]] if departure is None else departure
+        for p in range(1, len(path)):
+            arrival[p] = start[p - 1] + self.service[path[p - 1]] + times[path[p - 1], path[p]]
+            start[p] = max(arrival[p], self.earliest[path[p]])
+        return arrival, start
+    
+    def to_datetimes(self, hours: Sequence[float]) -> List[datetime]:
+        return [self.origin + timedelta(hours=float(h)) for h in hours]
+    
+    def horizon(self, times: np.ndarray) -> float:
+        # Finite stand-in for open-ended windows, used for big-M constants
+        bounds = np.concatenate((self.earliest, self.latest[np.isfinite(self.latest)]))
+        return float(bounds.max()) + (float(times.max()) + float(self.service.max())) * len(self.earliest)
+
+
+def store_time_windows(stores: Sequence[Store], n_depots: int = 1, service_minutes: float = 15.0,
+                       depot_open_hour: float = 0.0) -> Optional[TimeWindows]:
+    # Hours are measured from midnight of the first window's day; None when no store has a window
+    bounds = [t for store in stores for t in (store.delivery_window_start, store.delivery_window_end)
+              if t is not None]
+    if not bounds:
+        return None
+    
+    first = min(bounds)
+    origin = datetime(first.year, first.month, first.day, tzinfo=first.tzinfo)
+    
+    def hours(t: Optional[datetime], default: float) -> float:
+        return default if t is None else (t - origin).total_seconds() / 3600.0
+    
+    earliest = np.array([depot_open_hour] * n_depots +
+                        [hours(store.delivery_window_start, 0.0) for store in stores])
+    latest = np.array([np.inf] * n_depots +
+                      [hours(store.delivery_window_end, np.inf) for store in stores])
+    service = np.array([0.0] * n_depots + [service_minutes / 60.0] * len(stores))
+    return TimeWindows(earliest, latest, service, origin)
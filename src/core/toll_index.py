@@ -0,0 +1,99 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.excel_handler import ExcelHandler
+from data.models import DistanceMatrix, Location, TollSegment
+from utils.geo_utils import normalize_location
+from utils.toll_api import (
+    DEFAULT_MEMORY_SIZE, DEFAULT_TTL_HOURS, FileTollProvider, HttpTollProvider, TollCache, TollService
+)
+
+
+def segments_from_rates(toll_rates: Dict[Tuple[str, str], float]) -> List[TollSegment]:
+    return [TollSegment(from_location=a, to_location=b, rate_per_mile=float(rate))
+            for (a, b), rate in toll_rates.items()]
+
+
+class TollIndex:
+    """Normalized location names -> distance matrix indices; a name may also be a city covering many stops."""
+    
+    def __init__(self, distance_matrix: DistanceMatrix, locations: Optional[Iterable[Location]] = None):
+        self.distance_matrix = distance_matrix
+        self.names: Dict[str, int] = {}
+        self.aliases: Dict[str, List[int]] = {}
+        for name, i in distance_matrix.index.items():
+            self.names.setdefault(normalize_location(name), i)
+        
+        # Rate tables are usually keyed by city, so every stop in a city answers to the city's name
+        for location in locations or ():
+            i = distance_matrix.index.get(location.name)
+            if i is None:
+                continue
+            for alias in (location.city, f"{location.city} {location.state}"):
+                key = normalize_location(alias)
+                if key and key not in self.names:
+                    self.aliases.setdefault(key, []).append(i)
+    
+    def lookup(self, name: str) -> np.ndarray:
+        key = normalize_location(name)
+        if key in self.names:
+            return np.array([self.names[key]], dtype=np.intp)
+        return np.array(self.aliases.get(key, ()), dtype=np.intp)
+    
+    def unmatched(self, segments: Sequence[TollSegment]) -> List[TollSegment]:
+        return [segment for segment in segments
+                if not len(self.lookup(segment.from_location)) or not len(self.lookup(segment.to_location))]
+    
+    def toll_costs(self, segments: Sequence[TollSegment], default_rate: float) -> np.ndarray:
+        # Dense (n, n) cost of driving each arc once: rate * miles + flat toll. A segment's own direction
+        # wins over the reverse direction's, and a stop's own name wins over its city's.
+        distances = self.distance_matrix.distance_array
+        rates = np.full(distances.shape, float(default_rate))
+        flat = np.zeros(distances.shape)
+        
+        resolved = []
+        for segment in segments:
+            tails, heads = self.lookup(segment.from_location), self.lookup(segment.to_location)
+            if len(tails) and len(heads):
+                exact = (normalize_location(segment.from_location) in self.names and
+                         normalize_location(segment.to_location) in self.names)
+                resolved.append((exact, tails, heads, segment))
+        
+        for exact in (False, True):
+            for reverse in (True, False):
+                for is_exact, tails, heads, segment in resolved:
+                    if is_exact != exact:
+                        continue
+                    arcs = np.ix_(heads, tails) if reverse else np.ix_(tails, heads)
+                    rates[arcs] = segment.rate_per_mile
+                    flat[arcs] = segment.flat_rate or 0.0
+        
+        costs = distances * rates + flat
+        np.fill_diagonal(costs, 0.0)
+        return costs
+
+
+def create_toll_service(config: Dict) -> TollService:
+    # config is the 'tolls' section: provider 'file' (path) or 'http' (url, api_key), plus cache settings
+    provider_name = config.get('provider', 'file')
+    if provider_name == 'file':
+        path = Path(config.get('path', 'data/input/toll_rates.xlsx'))
+        if not path.exists():
+            raise FileNotFoundError(f"Toll rate file not found: {path}")
+        handler = ExcelHandler(str(path.parent), str(path.parent))
+        provider = FileTollProvider(handler.load_toll_segments(path.name))
+    elif provider_name == 'http':
+        if not config.get('url'):
+            raise ValueError("The http toll provider needs a 'url'")
+        provider = HttpTollProvider(config['url'], api_key=config.get('api_key') or None,
+                                    batch_size=config.get('batch_size', 200),
+                                    timeout=config.get('timeout_seconds', 10.0),
+                                    pool_size=config.get('pool_size', 4))
+    else:
+        raise ValueError(f"Unknown toll provider '{provider_name}'. Options: file, http")
+    
+    cache = TollCache(config.get('cache_directory'), ttl_hours=config.get('ttl_hours', DEFAULT_TTL_HOURS),
+                      memory_size=config.get('memory_size', DEFAULT_MEMORY_SIZE))
+    return TollService(provider, cache)
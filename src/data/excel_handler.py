@@ -1,269 +1,394 @@
+import logging
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
 import openpyxl
-from openpyxl.styles import Font, Fill, PatternFill, Alignment
 from datetime import datetime
 
-from data.models import Store, Supplier, Location, Vehicle, Order, PalletType, Route, OptimizationResult
+from data.models import (
+    Store, Supplier, Location, Vehicle, Order, PalletType, Route, OptimizationResult, TollSegment, CostBreakdown
+)
+from data.parquet_store import PARQUET_AVAILABLE, ParquetStore
+from data.report_writer import report_frames, write_report
+from utils.geocoding import GeocodingService, default_geocoding_service
+
+logger = logging.getLogger('pallet_optimizer')
+
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = None
+
+# Canonical column -> accepted spellings, first match wins
+STORE_COLUMNS = {'name': ('name', 'store_name')}
+SUPPLIER_COLUMNS = {'name': ('name', 'supplier_name')}
+ORDER_COLUMNS = {'quantity': ('quantity', 'pallets_ordered'), 'requested_date': ('requested_date', 'date'),
+                 'priority': ('priority', 'order_priority')}
+TOLL_COLUMNS = {'rate_per_mile': ('toll_rate_per_mile', 'rate_per_mile')}
+
+ORDER_FIELDS = ('order_id', 'store_id', 'supplier_id', 'quantity', 'pallet_type', 'requested_date',
+                'priority', 'special_instructions')
+TOLL_FIELDS = ('from_location', 'to_location', 'rate_per_mile', 'flat_rate')
+SUPPLIER_DEFAULTS = {'lead_time_days': 1, 'capacity_per_day': 100, 'reliability_score': 1.0}
+PRIORITY_LEVELS = {'high': 1, 'medium': 2, 'low': 3}
+# Identifier-like columns keep leading zeros when read from CSV
+TEXT_DTYPES = {column: str for column in ('store_id', 'supplier_id', 'order_id', 'zip_code')}
+EXCEL_SUFFIXES = ('.xlsx', '.xlsm', '.xls')
+
+
+def _canonical_columns(df: pd.DataFrame, columns: Dict[str, Tuple[str, ...]]) -> pd.DataFrame:
+    renames, dropped = {}, []
+    for canonical, names in columns.items():
+        present = [name for name in names if name in df.columns]
+        if present:
+            renames[present[0]] = canonical
+            dropped.extend(present[1:])
+    return df.drop(columns=dropped).rename(columns=renames)
+
+
+def _require_columns(df: pd.DataFrame, columns: Sequence[str], source: Path):
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"{source} is missing required column(s): {', '.join(missing)}")
+
+
+def _int_values(values: pd.Series, default: int = 0) -> pd.Series:
+    return pd.to_numeric(values).fillna(default).astype(np.int64)
+
+
+def _float_values(values: pd.Series, default: float = 0.0) -> pd.Series:
+    return pd.to_numeric(values).fillna(default).astype(np.float64)
+
+
+def _optional_values(values: pd.Series) -> pd.Series:
+    # Python objects with None for blanks, ready to hand to the dataclasses
+    return values.astype(object).where(values.notna(), None)
+
+
+def _priority_values(values: pd.Series) -> pd.Series:
+    # 1/2/3 or High/medium/LOW; blanks and unknown labels are priority 1
+    numeric = pd.to_numeric(values, errors='coerce')
+    labels = values.astype('string').str.strip().str.casefold().map(PRIORITY_LEVELS)
+    return numeric.fillna(labels.astype(float)).fillna(1).astype(np.int64)
+
+
+def _location_columns(df: pd.DataFrame, default_name: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        'name': _optional_values(df['name']).fillna(default_name) if 'name' in df.columns else default_name,
+        'address': _optional_values(df['address']),
+        'latitude': df['latitude'].astype(np.float64),
+        'longitude': df['longitude'].astype(np.float64),
+        'city': _optional_values(df['city']),
+        'state': _optional_values(df['state']),
+        'zip_code': df['zip_code'].astype(str),
+        'contact_info': _optional_values(df['contact_info']) if 'contact_info' in df.columns else None,
+    }, index=df.index)
+
+
+def _order_dates(df: pd.DataFrame, now: pd.Timestamp) -> pd.Series:
+    dates = (pd.to_datetime(df['requested_date']) if 'requested_date' in df.columns
+             else pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]'))
+    return dates.fillna(now)
+
+
+def _order_columns(df: pd.DataFrame, source: Path, now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    _require_columns(df, ('order_id', 'store_id', 'supplier_id'), source)
+    frame = pd.DataFrame({column: df[column].astype(str) for column in ('order_id', 'store_id', 'supplier_id')},
+                         index=df.index)
+    frame['quantity'] = _int_values(df['quantity']) if 'quantity' in df.columns else 0
+    
+    # Unknown pallet type names are an input error, as PalletType() would raise one by one
+    names = (df['pallet_type'].astype('string').str.strip().str.lower().fillna(PalletType.STANDARD.value)
+             if 'pallet_type' in df.columns else pd.Series(PalletType.STANDARD.value, index=df.index))
+    pallet_types = names.map({kind.value: kind for kind in PalletType})
+    if pallet_types.isna().any():
+        unknown = sorted(set(names[pallet_types.isna()]))
+        raise ValueError(f"{source} has unknown pallet type(s): {', '.join(unknown)}")
+    frame['pallet_type'] = pallet_types.astype(object)
+    
+    # Orders without a date are treated as requested now
+    frame['requested_date'] = _order_dates(df, pd.Timestamp.now() if now is None else now)
+    frame['priority'] = _priority_values(df['priority']) if 'priority' in df.columns else 1
+    frame['special_instructions'] = (_optional_values(df['special_instructions'])
+                                     if 'special_instructions' in df.columns else '')
+    return frame
 
 
 class ExcelHandler:
-    def __init__(self, input_directory: str = "data/input", output_directory: str = "data/output"):
+    def __init__(self, input_directory: str = "data/input", output_directory: str = "data/output",
+                 geocoder: Optional[GeocodingService] = None, parquet_directory: Optional[str] = None):
         self.input_dir = Path(input_directory)
         self.output_dir = Path(output_directory)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Fills in rows without latitude/longitude; the shared cached Nominatim service by default
+        self.geocoder = geocoder
+        
+        # Workbooks are converted to Parquet once and re-read from there until they change
+        self.parquet_store: Optional[ParquetStore] = None
+        if parquet_directory:
+            if PARQUET_AVAILABLE:
+                self.parquet_store = ParquetStore(parquet_directory)
+            else:
+                logger.warning("pyarrow is not installed; reading Excel inputs without the Parquet cache")
     
     def load_stores(self, filename: str = "store_locations.xlsx") -> List[Store]:
+        stores = []
+        for row in self.load_stores_frame(filename).itertuples(index=False):
+            location = Location(name=row.name, address=row.address, latitude=row.latitude,
+                                longitude=row.longitude, city=row.city, state=row.state,
+                                zip_code=row.zip_code, contact_info=row.contact_info)
+            stores.append(Store(id=row.store_id, name=row.name, location=location,
+                                demand_pallets=row.demand_pallets,
+                                delivery_window_start=row.delivery_window_start,
+                                delivery_window_end=row.delivery_window_end, priority=row.priority))
+        return stores
+    
+    def load_stores_frame(self, filename: str = "store_locations.xlsx") -> pd.DataFrame:
+        # Columnar mode: one typed row per store with the column names load_stores uses
         file_path = self.input_dir / filename
         if not file_path.exists():
             raise FileNotFoundError(f"Store data file not found: {file_path}")
-        
-        df = pd.read_excel(file_path)
-        stores = []
-        
-        for _, row in df.iterrows():
-            # Handle both 'name' and 'store_name' column formats
-            store_name = row.get('name', row.get('store_name', 'Unknown Store'))
-            
-            location = Location(
-                name=store_name,
-                address=row['address'],
-                latitude=row['latitude'],
-                longitude=row['longitude'],
-                city=row['city'],
-                state=row['state'],
-                zip_code=str(row['zip_code']),
-                contact_info=row.get('contact_info')
-            )
-            
-            delivery_start = None
-            delivery_end = None
-            if 'delivery_window_start' in row and pd.notna(row['delivery_window_start']):
-                delivery_start = pd.to_datetime(row['delivery_window_start'])
-            if 'delivery_window_end' in row and pd.notna(row['delivery_window_end']):
-                delivery_end = pd.to_datetime(row['delivery_window_end'])
-            
-            # Handle priority mapping from text to numbers
-            priority_map = {'High': 1, 'Medium': 2, 'Low': 3, 'high': 1, 'medium': 2, 'low': 3}
-            priority_value = row.get('priority', 1)
-            if isinstance(priority_value, str):
-                priority_value = priority_map.get(priority_value, 1)
-            else:
-                priority_value = int(priority_value)
-            
-            store = Store(
-                id=str(row['store_id']),
-                name=store_name,
-                location=location,
-                demand_pallets=int(row['demand_pallets']),
-                delivery_window_start=delivery_start,
-                delivery_window_end=delivery_end,
-                priority=priority_value
-            )
-            stores.append(store)
-        
-        return stores
+        return self._cached_frame('stores', file_path, self._stores_frame)
+    
+    def _stores_frame(self, file_path: Path) -> pd.DataFrame:
+        df = _canonical_columns(self._read_table(file_path), STORE_COLUMNS)
+        _require_columns(df, ('store_id', 'address', 'city', 'state', 'zip_code', 'demand_pallets'), file_path)
+        df = self._fill_coordinates(df)
+        frame = _location_columns(df, 'Unknown Store')
+        frame.insert(0, 'store_id', df['store_id'].astype(str))
+        frame['demand_pallets'] = _int_values(df['demand_pallets'])
+        for column in ('delivery_window_start', 'delivery_window_end'):
+            frame[column] = _optional_values(pd.to_datetime(df[column]) if column in df.columns
+                                             else pd.Series(pd.NaT, index=df.index))
+        frame['priority'] = _priority_values(df['priority']) if 'priority' in df.columns else 1
+        return frame
     
     def load_suppliers(self, filename: str = "supplier_data.xlsx") -> List[Supplier]:
+        suppliers = []
+        for row in self.load_suppliers_frame(filename).itertuples(index=False):
+            location = Location(name=row.name, address=row.address, latitude=row.latitude,
+                                longitude=row.longitude, city=row.city, state=row.state,
+                                zip_code=row.zip_code, contact_info=row.contact_info)
+            suppliers.append(Supplier(id=row.supplier_id, name=row.name, location=location,
+                                      available_pallets=row.available_pallets,
+                                      cost_per_pallet=row.cost_per_pallet, lead_time_days=row.lead_time_days,
+                                      capacity_per_day=row.capacity_per_day,
+                                      reliability_score=row.reliability_score,
+                                      pallet_types=list(row.pallet_types)))
+        return suppliers
+    
+    def load_suppliers_frame(self, filename: str = "supplier_data.xlsx") -> pd.DataFrame:
         file_path = self.input_dir / filename
         if not file_path.exists():
             raise FileNotFoundError(f"Supplier data file not found: {file_path}")
+        return self._cached_frame('suppliers', file_path, self._suppliers_frame)
+    
+    def _suppliers_frame(self, file_path: Path) -> pd.DataFrame:
+        df = _canonical_columns(self._read_table(file_path), SUPPLIER_COLUMNS)
+        _require_columns(df, ('supplier_id', 'address', 'city', 'state', 'zip_code',
+                              'available_pallets', 'cost_per_pallet'), file_path)
+        df = self._fill_coordinates(df)
+        frame = _location_columns(df, 'Unknown Supplier')
+        frame.insert(0, 'supplier_id', df['supplier_id'].astype(str))
+        frame['available_pallets'] = _int_values(df['available_pallets'])
+        frame['cost_per_pallet'] = _float_values(df['cost_per_pallet'])
+        for column, default in SUPPLIER_DEFAULTS.items():
+            values = df[column] if column in df.columns else pd.Series(default, index=df.index)
+            frame[column] = (_float_values(values, default) if isinstance(default, float)
+                             else _int_values(values, default))
         
-        df = pd.read_excel(file_path)
-        suppliers = []
-        
-        for _, row in df.iterrows():
-            # Handle both 'name' and 'supplier_name' column formats
-            supplier_name = row.get('name', row.get('supplier_name', 'Unknown Supplier'))
-            
-            location = Location(
-                name=supplier_name,
-                address=row['address'],
-                latitude=row['latitude'],
-                longitude=row['longitude'],
-                city=row['city'],
-                state=row['state'],
-                zip_code=str(row['zip_code']),
-                contact_info=row.get('contact_info')
-            )
-            
-            pallet_types = []
-            if 'pallet_types' in row and pd.notna(row['pallet_types']):
-                type_str = str(row['pallet_types']).lower()
-                if 'standard' in type_str:
-                    pallet_types.append(PalletType.STANDARD)
-                if 'euro' in type_str:
-                    pallet_types.append(PalletType.EURO)
-                if 'custom' in type_str:
-                    pallet_types.append(PalletType.CUSTOM)
-            
-            if not pallet_types:
-                pallet_types = [PalletType.STANDARD]
-            
-            supplier = Supplier(
-                id=str(row['supplier_id']),
-                name=supplier_name,
-                location=location,
-                available_pallets=int(row['available_pallets']),
-                cost_per_pallet=float(row['cost_per_pallet']),
-                lead_time_days=int(row.get('lead_time_days', 1)),
-                capacity_per_day=int(row.get('capacity_per_day', 100)),
-                reliability_score=float(row.get('reliability_score', 1.0)),
-                pallet_types=pallet_types
-            )
-            suppliers.append(supplier)
-        
-        return suppliers
+        # "Standard, Euro" -> (STANDARD, EURO); blank or unrecognized lists mean standard pallets only
+        text = (df['pallet_types'].astype('string').str.lower().fillna('') if 'pallet_types' in df.columns
+                else pd.Series('', index=df.index))
+        kinds = (PalletType.STANDARD, PalletType.EURO, PalletType.CUSTOM)
+        flags = np.column_stack([text.str.contains(kind.value, regex=False).to_numpy(dtype=bool) for kind in kinds])
+        frame['pallet_types'] = [tuple(kind for kind, flag in zip(kinds, row) if flag) or (PalletType.STANDARD,)
+                                 for row in flags]
+        return frame
     
     def load_historical_orders(self, filename: str = "historical_orders.xlsx") -> List[Order]:
+        return [Order(id=row.order_id, store_id=row.store_id, supplier_id=row.supplier_id,
+                      quantity=row.quantity, pallet_type=row.pallet_type, requested_date=row.requested_date,
+                      priority=row.priority, special_instructions=row.special_instructions)
+                for row in self.load_orders_frame(filename).itertuples(index=False)]
+    
+    def load_orders_frame(self, filename: str = "historical_orders.xlsx") -> pd.DataFrame:
+        # Missing history is not an error: an empty frame with the usual columns
         file_path = self.input_dir / filename
         if not file_path.exists():
-            return []
+            return pd.DataFrame(columns=list(ORDER_FIELDS))
+        return self._cached_frame('orders', file_path, self._orders_frame)
+    
+    def _orders_frame(self, file_path: Path) -> pd.DataFrame:
+        return _order_columns(_canonical_columns(self._read_table(file_path), ORDER_COLUMNS), file_path)
+    
+    def iter_historical_orders(self, filename: str = "historical_orders.xlsx", chunk_size: int = 50_000,
+                               start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                               as_frames: bool = False) -> Iterator[Union[List[Order], pd.DataFrame]]:
+        """Stream the order history in chunks of at most chunk_size rows.
         
-        df = pd.read_excel(file_path)
-        orders = []
+        Yields lists of Order, or load_orders_frame-style DataFrames when as_frames is set. Rows outside
+        [start_date, end_date] are dropped before any other column is converted; undated rows count as now.
+        """
+        file_path = self.input_dir / filename
+        if not file_path.exists():
+            return
         
-        for _, row in df.iterrows():
-            pallet_type = PalletType.STANDARD
-            if 'pallet_type' in row and pd.notna(row['pallet_type']):
-                pallet_type = PalletType(row['pallet_type'].lower())
-            
-            # Handle quantity column - could be 'quantity' or 'pallets_ordered'
-            quantity = row.get('quantity', row.get('pallets_ordered', 0))
-            
-            # Handle requested_date - could be 'requested_date' or 'date'
-            date_field = row.get('requested_date', row.get('date'))
-            if date_field:
-                requested_date = pd.to_datetime(date_field)
-            else:
-                requested_date = pd.Timestamp.now()
+        start = pd.Timestamp(start_date) if start_date is not None else None
+        end = pd.Timestamp(end_date) if end_date is not None else None
+        # One "now" for the whole call, so undated rows agree across chunks and with the date filter
+        now = pd.Timestamp.now()
+        for chunk in self._iter_table_chunks(file_path, chunk_size):
+            chunk = _canonical_columns(chunk, ORDER_COLUMNS)
+            if (start is not None or end is not None) and len(chunk):
+                dates = _order_dates(chunk, now)
+                keep = np.ones(len(chunk), dtype=bool)
+                if start is not None:
+                    keep &= (dates >= start).to_numpy()
+                if end is not None:
+                    keep &= (dates <= end).to_numpy()
+                chunk = chunk[keep].assign(requested_date=dates[keep])
+            if not len(chunk):
+                continue
             
-            # Handle priority - could be text or number
-            priority_map = {'High': 1, 'Medium': 2, 'Low': 3}
-            priority_value = row.get('priority', row.get('order_priority', 1))
-            if isinstance(priority_value, str):
-                priority_value = priority_map.get(priority_value, 1)
+            frame = _order_columns(chunk, file_path, now)
+            if as_frames:
+                yield frame.reset_index(drop=True)
             else:
-                priority_value = int(priority_value) if priority_value else 1
-            
-            order = Order(
-                id=str(row['order_id']),
-                store_id=str(row['store_id']),
-                supplier_id=str(row['supplier_id']),
-                quantity=int(quantity),
-                pallet_type=pallet_type,
-                requested_date=requested_date,
-                priority=priority_value,
-                special_instructions=row.get('special_instructions', '')
-            )
-            orders.append(order)
-        
-        return orders
+                yield [Order(id=row.order_id, store_id=row.store_id, supplier_id=row.supplier_id,
+                             quantity=row.quantity, pallet_type=row.pallet_type,
+                             requested_date=row.requested_date, priority=row.priority,
+                             special_instructions=row.special_instructions)
+                       for row in frame.itertuples(index=False)]
     
     def load_toll_rates(self, filename: str = "toll_rates.xlsx") -> Dict[Tuple[str, str], float]:
+        return {(segment.from_location, segment.to_location): segment.rate_per_mile
+                for segment in self.load_toll_segments(filename)}
+    
+    def load_toll_segments(self, filename: str = "toll_rates.xlsx") -> List[TollSegment]:
+        return [TollSegment(from_location=row.from_location, to_location=row.to_location,
+                            rate_per_mile=row.rate_per_mile, flat_rate=row.flat_rate)
+                for row in self.load_toll_frame(filename).itertuples(index=False)]
+    
+    def load_toll_frame(self, filename: str = "toll_rates.xlsx") -> pd.DataFrame:
         file_path = self.input_dir / filename
-        toll_rates = {}
+        if not file_path.exists():
+            return pd.DataFrame(columns=list(TOLL_FIELDS))
+        return self._cached_frame('tolls', file_path, self._toll_frame)
+    
+    def _toll_frame(self, file_path: Path) -> pd.DataFrame:
+        df = _canonical_columns(self._read_table(file_path), TOLL_COLUMNS)
+        if 'from_location' in df.columns and 'to_location' in df.columns:
+            # Standard format
+            frame = pd.DataFrame({'from_location': df['from_location'].astype(str),
+                                  'to_location': df['to_location'].astype(str)})
+        elif 'route_segment' in df.columns:
+            # Frito-Lay format - "Chicago to Milwaukee"; anything else covers travel within one place
+            segment = df['route_segment'].astype(str).str.strip()
+            parts = segment.str.split(r'(?i)\s+to\s+', n=1, regex=True, expand=True).reindex(columns=[0, 1])
+            one_place = parts[1].isna()
+            frame = pd.DataFrame({'from_location': parts[0].str.strip().where(~one_place, segment),
+                                  'to_location': parts[1].str.strip().where(~one_place, segment)})
+        else:
+            return pd.DataFrame(columns=list(TOLL_FIELDS))
         
-        if file_path.exists():
-            df = pd.read_excel(file_path)
-            for _, row in df.iterrows():
-                # Handle different toll rate file formats
-                if 'from_location' in row and 'to_location' in row:
-                    # Standard format
-                    key = (str(row['from_location']), str(row['to_location']))
-                    toll_rates[key] = float(row['rate_per_mile'])
-                elif 'route_segment' in row:
-                    # Frito-Lay format - parse route segment
-                    route_segment = str(row['route_segment'])
-                    # Extract rate - could be 'toll_rate_per_mile' or 'rate_per_mile'
-                    rate = row.get('toll_rate_per_mile', row.get('rate_per_mile', 0.0))
-                    
-                    # Try to extract from/to from route segment
-                    if 'to' in route_segment.lower():
-                        parts = route_segment.split(' to ')
-                        if len(parts) == 2:
-                            from_loc = parts[0].strip()
-                            to_loc = parts[1].strip()
-                            key = (from_loc, to_loc)
-                            toll_rates[key] = float(rate)
-                    else:
-                        # Use route segment as a single key
-                        key = (route_segment, route_segment)
-                        toll_rates[key] = float(rate)
+        frame['rate_per_mile'] = (_float_values(df['rate_per_mile'], 0.0) if 'rate_per_mile' in df.columns
+                                  else 0.0)
+        frame['flat_rate'] = (_optional_values(pd.to_numeric(df['flat_rate']).astype(float))
+                              if 'flat_rate' in df.columns else None)
+        return frame.astype({'from_location': object, 'to_location': object})[list(TOLL_FIELDS)]
+    
+    def _cached_frame(self, table: str, file_path: Path,
+                      build: Callable[[Path], pd.DataFrame]) -> pd.DataFrame:
+        if self.parquet_store is None or file_path.suffix.lower() not in EXCEL_SUFFIXES:
+            return build(file_path)
+        return self.parquet_store.cached_frame(table, file_path, lambda: build(file_path))
+    
+    def _read_table(self, file_path: Path) -> pd.DataFrame:
+        # CSV and Parquet skip workbook parsing entirely, which dominates load time on large files
+        suffix = file_path.suffix.lower()
+        if suffix == '.csv':
+            return pd.read_csv(file_path, dtype=TEXT_DTYPES)
+        if suffix == '.parquet':
+            return pd.read_parquet(file_path)
+        if suffix in EXCEL_SUFFIXES:
+            return pd.read_excel(file_path, engine=EXCEL_ENGINE)
+        raise ValueError(f"Unsupported file type '{suffix}' for {file_path}. Options: .xlsx, .xls, .csv, .parquet")
+    
+    def _iter_table_chunks(self, file_path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+        # Raw rows in bounded chunks; only .xls has no streaming reader and is read whole
+        chunk_size = max(1, int(chunk_size))
+        suffix = file_path.suffix.lower()
+        if suffix == '.csv':
+            with pd.read_csv(file_path, dtype=TEXT_DTYPES, chunksize=chunk_size) as reader:
+                yield from reader
+        elif suffix == '.parquet':
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif suffix in ('.xlsx', '.xlsm'):
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                rows = workbook.active.iter_rows(values_only=True)
+                header = [str(value) if value is not None else f"column_{i}"
+                          for i, value in enumerate(next(rows, ()))]
+                batch = []
+                for row in rows:
+                    if any(value is not None for value in row):
+                        batch.append(row[:len(header)] + (None,) * (len(header) - len(row)))
+                    if len(batch) >= chunk_size:
+                        yield pd.DataFrame.from_records(batch, columns=header)
+                        batch = []
+                if batch:
+                    yield pd.DataFrame.from_records(batch, columns=header)
+            finally:
+                workbook.close()
+        else:
+            df = self._read_table(file_path)
+            for offset in range(0, len(df), chunk_size):
+                yield df.iloc[offset:offset + chunk_size]
+    
+    def _fill_coordinates(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Rows missing latitude or longitude are geocoded from their address in one batch
+        df = df.copy()
+        for column in ('latitude', 'longitude'):
+            if column not in df.columns:
+                df[column] = np.nan
+        missing = df['latitude'].isna() | df['longitude'].isna()
+        if not missing.any():
+            return df
         
-        return toll_rates
+        parts = [column for column in ('address', 'city', 'state', 'zip_code') if column in df.columns]
+        if not parts:
+            raise ValueError("Rows without latitude/longitude need an address to geocode")
+        addresses = [", ".join(str(value) for value in row if pd.notna(value) and str(value).strip())
+                     for row in df.loc[missing, parts].itertuples(index=False)]
+        
+        geocoder = self.geocoder or default_geocoding_service()
+        coordinates = geocoder.geocode_many(addresses)
+        failed = [address for address, coords in zip(addresses, coordinates) if coords is None]
+        if failed:
+            raise ValueError(f"Could not geocode {len(failed)} address(es), e.g. {'; '.join(failed[:3])}")
+        
+        df.loc[missing, 'latitude'] = [coords[0] for coords in coordinates]
+        df.loc[missing, 'longitude'] = [coords[1] for coords in coordinates]
+        return df
     
-    def save_optimization_results(self, result: OptimizationResult, filename: str = None):
+    def save_optimization_results(self, result: OptimizationResult, filename: str = None,
+                                  cost_breakdowns: Optional[Sequence[CostBreakdown]] = None) -> Path:
+        # Summary, Routes, per-stop Stops and Costs sheets; cost_breakdowns itemize the Costs sheet
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"optimization_results_{timestamp}.xlsx"
         
         file_path = self.output_dir / filename
+        write_report(file_path, report_frames(result, cost_breakdowns))
         
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            # Summary sheet
-            summary_data = {
-                'Metric': ['Total Cost', 'Total Distance', 'Total Time', 'Number of Routes', 
-                          'Utilization Rate', 'Solver Status', 'Solve Time', 'Objective Value'],
-                'Value': [f"${result.total_cost:,.2f}", f"{result.total_distance:.1f} miles",
-                         f"{result.total_time:.1f} hours", len(result.routes),
-                         f"{result.utilization_rate:.1%}", result.solver_status,
-                         f"{result.solve_time:.2f} seconds", f"{result.objective_value:,.2f}"]
-            }
-            summary_df = pd.DataFrame(summary_data)
-            summary_df.to_excel(writer, sheet_name='Summary', index=False)
-            
-            # Routes sheet
-            routes_data = []
-            for route in result.routes:
-                routes_data.append({
-                    'Route ID': route.id,
-                    'Vehicle ID': route.vehicle_id,
-                    'Stops': ' -> '.join(route.stops),
-                    'Distance (miles)': route.total_distance,
-                    'Time (hours)': route.total_time,
-                    'Cost': route.total_cost,
-                    'Pallets': route.pallets_delivered,
-                    'Status': route.status.value
-                })
-            
-            if routes_data:
-                routes_df = pd.DataFrame(routes_data)
-                routes_df.to_excel(writer, sheet_name='Routes', index=False)
-            
-            # Format the workbook
-            self._format_workbook(writer.book)
-    
-    def _format_workbook(self, workbook):
-        # Apply formatting to all sheets
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-            
-            # Header formatting
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            
-            for cell in sheet[1]:
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal="center")
-            
-            # Auto-adjust column widths
-            for column in sheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                
-                adjusted_width = min(max_length + 2, 50)
-                sheet.column_dimensions[column_letter].width = adjusted_width
+        if self.parquet_store is not None:
+            self.parquet_store.append_routes(result, run_id=file_path.stem)
+        return file_path
     
     def create_template_files(self):
         # Create store template - use 'name' column to match actual data files
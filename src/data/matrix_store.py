@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.models import DistanceMatrix
+from utils.geo_utils import DEFAULT_SPEED_MPH, CoordinateArray, to_coordinate_array
+from utils.routing import GreatCircleBackend, RoutingBackend
+
+
+MANIFEST_FILE = "manifest.json"
+DISTANCES_FILE = "distances.npy"
+TIMES_FILE = "times.npy"
+# hash -> key set and size of every entry, so lookups never have to open each manifest
+INDEX_FILE = "index.json"
+
+# Least recently used entries are evicted past either limit
+DEFAULT_MAX_ENTRIES = 32
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Coordinates are rounded before hashing so float noise from Excel does not miss the cache
+COORDINATE_DECIMALS = 6
+
+
+def location_keys(names: Sequence[str], coordinates: CoordinateArray) -> List[Tuple[str, float, float]]:
+    coords = np.round(to_coordinate_array(coordinates), COORDINATE_DECIMALS)
+    if len(coords) != len(names):
+        raise ValueError(f"Got {len(names)} names but {len(coords)} coordinates")
+    return [(str(name), float(lat), float(lon)) for name, (lat, lon) in zip(names, coords)]
+
+
+def location_set_hash(keys: Sequence[Tuple[str, float, float]], method: str,
+                      avg_speed_mph: float) -> str:
+    # Order-independent: the same stores in a different order hit the same entry
+    payload = json.dumps({
+        'locations': sorted(keys),
+        'method': method,
+        'avg_speed_mph': avg_speed_mph,
+    }, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class DistanceMatrixStore:
+    def __init__(self, directory: str = "data/reference/distance_cache",
+                 method: str = 'haversine', avg_speed_mph: float = DEFAULT_SPEED_MPH,
+                 dtype: np.dtype = np.float64, backend: Optional[RoutingBackend] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Entries are keyed by the backend, so road and great-circle matrices never mix
+        self.backend = backend or GreatCircleBackend(method, avg_speed_mph, dtype)
+        self.method = self.backend.cache_key
+        self.avg_speed_mph = self.backend.avg_speed_mph
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+    
+    def get_matrix(self, names: Sequence[str], coordinates: CoordinateArray) -> DistanceMatrix:
+        keys = location_keys(names, coordinates)
+        key_hash = location_set_hash(keys, self.method, self.avg_speed_mph)
+        
+        cached = self.load(key_hash)
+        if cached is not None:
+            return cached
+        
+        requested = set(keys)
+        best_entry = None
+        best_overlap = 0
+        for entry_hash, entry in self._read_index().items():
+            if entry.get('method') != self.method or entry.get('avg_speed_mph') != self.avg_speed_mph:
+                continue
+            entry_keys = set(self._manifest_keys(entry))
+            if requested <= entry_keys:
+                # A superset already answers every lookup for these names
+                matrix = self.load(entry_hash)
+                if matrix is not None:
+                    return matrix
+            elif entry_keys <= requested and len(entry_keys) > best_overlap:
+                best_entry, best_overlap = entry_hash, len(entry_keys)
+        
+        if best_entry is not None:
+            distances, times = self._extend(best_entry, keys)
+        else:
+            distances, times = self._compute(keys)
+        
+        # Stand-in answers from a routing fallback are used for this run but never cached
+        if not self.backend.last_complete:
+            return DistanceMatrix([k[0] for k in keys], distances, times)
+        self.save(keys, distances, times)
+        matrix = self.load(key_hash)
+        if matrix is None:
+            matrix = DistanceMatrix([k[0] for k in keys], distances, times)
+        return matrix
+    
+    def load(self, key_hash: str) -> Optional[DistanceMatrix]:
+        entry_dir = self.directory / key_hash
+        manifest_path = entry_dir / MANIFEST_FILE
+        if not manifest_path.exists():
+            return None
+        
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            distances = np.load(entry_dir / DISTANCES_FILE, mmap_mode='r')
+            times = np.load(entry_dir / TIMES_FILE, mmap_mode='r')
+            matrix = DistanceMatrix(manifest['names'], distances, times)
+        except (OSError, ValueError, KeyError):
+            # Partially written or corrupted entry; it will be recomputed
+            return None
+        
+        # The manifest's mtime marks the entry's last use for eviction
+        try:
+            os.utime(manifest_path)
+        except OSError:
+            pass
+        return matrix
+    
+    def save(self, keys: Sequence[Tuple[str, float, float]], distances: np.ndarray,
+             times: np.ndarray) -> str:
+        key_hash = location_set_hash(keys, self.method, self.avg_speed_mph)
+        entry_dir = self.directory / key_hash
+        if (entry_dir / MANIFEST_FILE).exists():
+            return key_hash
+        
+        manifest = {
+            'names': [k[0] for k in keys],
+            'latitudes': [k[1] for k in keys],
+            'longitudes': [k[2] for k in keys],
+            'method': self.method,
+            'avg_speed_mph': self.avg_speed_mph,
+            'dtype': self.dtype.name,
+            'created_at': datetime.now().isoformat(),
+        }
+        
+        # Write into a temp dir and rename so readers never see a half-written entry
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{key_hash}.", dir=self.directory))
+        try:
+            np.save(tmp_dir / DISTANCES_FILE, np.asarray(distances, dtype=self.dtype))
+            np.save(tmp_dir / TIMES_FILE, np.asarray(times, dtype=self.dtype))
+            with open(tmp_dir / MANIFEST_FILE, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not (entry_dir / MANIFEST_FILE).exists():
+                raise
+        
+        index = self._read_index()
+        index[key_hash] = dict(manifest, bytes=self._entry_bytes(entry_dir))
+        self._evict(index, keep=key_hash)
+        self._write_index(index)
+        return key_hash
+    
+    def clear(self):
+        for entry in self.directory.iterdir():
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+        (self.directory / INDEX_FILE).unlink(missing_ok=True)
+    
+    def _evict(self, index: Dict[str, Dict], keep: Optional[str] = None):
+        # Drop least recently used entries until both the entry count and total size fit
+        def last_used(entry_hash: str) -> float:
+            try:
+                return (self.directory / entry_hash / MANIFEST_FILE).stat().st_mtime
+            except OSError:
+                return 0.0
+        
+        total = sum(entry.get('bytes', 0) for entry in index.values())
+        for entry_hash in sorted(index, key=last_used):
+            if len(index) <= self.max_entries and total <= self.max_bytes:
+                break
+            if entry_hash == keep:
+                continue
+            total -= index.pop(entry_hash).get('bytes', 0)
+            shutil.rmtree(self.directory / entry_hash, ignore_errors=True)
+    
+    def _read_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self.directory / INDEX_FILE, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            # Missing or unreadable: rebuild once from the entries' own manifests
+            index = dict(self._iter_manifests())
+            self._write_index(index)
+            return index
+        # Entries another process evicted are skipped
+        return {entry_hash: entry for entry_hash, entry in index.items()
+                if (self.directory / entry_hash).is_dir()}
+    
+    def _write_index(self, index: Dict[str, Dict]):
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{INDEX_FILE}.", dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f, separators=(',', ':'))
+            os.replace(tmp_path, self.directory / INDEX_FILE)
+        except OSError:
+            Path(tmp_path).unlink(missing_ok=True)
+    
+    def _compute(self, keys: Sequence[Tuple[str, float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        coords = np.array([(k[1], k[2]) for k in keys], dtype=np.float64)
+        distances, times = self.backend.table(coords)
+        return distances.astype(self.dtype, copy=False), times.astype(self.dtype, copy=False)
+    
+    def _extend(self, base_hash: str,
+                keys: Sequence[Tuple[str, float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        # Reuse the cached block and compute only rows/columns for the new locations
+        base = self.load(base_hash)
+        with open(self.directory / base_hash / MANIFEST_FILE, 'r') as f:
+            base_keys = self._manifest_keys(json.load(f))
+        
+        base_set = set(base_keys)
+        new_keys = [k for k in keys if k not in base_set]
+        ordered = list(base_keys) + new_keys
+        n_base, n = len(base_keys), len(ordered)
+        
+        distances = np.empty((n, n), dtype=self.dtype)
+        times = np.empty_like(distances)
+        distances[:n_base, :n_base] = base.distance_array
+        times[:n_base, :n_base] = base.time_array
+        
+        new_coords = np.array([(k[1], k[2]) for k in new_keys], dtype=np.float64)
+        all_coords = np.array([(k[1], k[2]) for k in ordered], dtype=np.float64)
+        distances[n_base:, :], times[n_base:, :] = self.backend.table(new_coords, all_coords)
+        if self.backend.symmetric:
+            distances[:n_base, n_base:] = distances[n_base:, :n_base].T
+            times[:n_base, n_base:] = times[n_base:, :n_base].T
+        else:
+            complete = self.backend.last_complete
+            distances[:n_base, n_base:], times[:n_base, n_base:] = self.backend.table(all_coords[:n_base],
+                                                                                      new_coords)
+            self.backend.last_complete = complete and self.backend.last_complete
+        np.fill_diagonal(distances, 0.0)
+        np.fill_diagonal(times, 0.0)
+        
+        # Reorder to the requested key order
+        position = {key: i for i, key in enumerate(ordered)}
+        order = np.array([position[k] for k in keys], dtype=np.intp)
+        return distances[np.ix_(order, order)], times[np.ix_(order, order)]
+    
+    def _iter_manifests(self):
+        for manifest_path in self.directory.glob(f"*/{MANIFEST_FILE}"):
+            try:
+                with open(manifest_path, 'r') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield manifest_path.parent.name, dict(manifest, bytes=self._entry_bytes(manifest_path.parent))
+    
+    @staticmethod
+    def _entry_bytes(entry_dir: Path) -> int:
+        return sum(path.stat().st_size for path in entry_dir.iterdir() if path.is_file())
+    
+    @staticmethod
+    def _manifest_keys(manifest: Dict) -> List[Tuple[str, float, float]]:
+        return list(zip(manifest['names'], manifest['latitudes'], manifest['longitudes']))
@@ -1,8 +1,10 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Optional, Tuple, Iterator, Mapping, Sequence
 from datetime import datetime
 from enum import Enum
 
+import numpy as np
+
 
 class PalletType(Enum):
     STANDARD = "standard"
@@ -77,6 +79,7 @@ class Route:
     pallets_delivered: int
     status: RouteStatus = RouteStatus.PLANNED
     created_at: datetime = field(default_factory=datetime.now)
+    arrival_times: List[datetime] = field(default_factory=list)  # per stop, when time windows apply
 
 
 @dataclass
@@ -99,11 +102,137 @@ class TollSegment:
     flat_rate: Optional[float] = None
 
 
+class MatrixView(Mapping):
+    """Read-only (from, to) -> value mapping over a dense matrix, for legacy dict callers."""
+    
+    def __init__(self, index: Dict[str, int], values: np.ndarray):
+        self._index = index
+        self._values = values
+    
+    def __getitem__(self, key: Tuple[str, str]) -> float:
+        i, j = self._index[key[0]], self._index[key[1]]
+        return float(self._values[i, j])
+    
+    def __contains__(self, key) -> bool:
+        try:
+            return key[0] in self._index and key[1] in self._index
+        except (TypeError, IndexError):
+            return False
+    
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for a in self._index:
+            for b in self._index:
+                yield (a, b)
+    
+    def __len__(self) -> int:
+        return len(self._index) ** 2
+
+
 @dataclass
 class DistanceMatrix:
     locations: List[str]
-    distances: Dict[Tuple[str, str], float]
-    travel_times: Dict[Tuple[str, str], float]
+    distance_array: np.ndarray
+    time_array: np.ndarray
+    index: Dict[str, int] = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self.locations = list(self.locations)
+        self.distance_array = np.ascontiguousarray(self.distance_array)
+        self.time_array = np.ascontiguousarray(self.time_array)
+        
+        n = len(self.locations)
+        if self.distance_array.shape != (n, n) or self.time_array.shape != (n, n):
+            raise ValueError(f"Matrix shapes {self.distance_array.shape} / {self.time_array.shape} "
+                             f"do not match {n} locations")
+        
+        self.index = {name: i for i, name in enumerate(self.locations)}
+        if len(self.index) != n:
+            raise ValueError("Location names in a DistanceMatrix must be unique")
+    
+    @property
+    def distances(self) -> MatrixView:
+        return MatrixView(self.index, self.distance_array)
+    
+    @property
+    def travel_times(self) -> MatrixView:
+        return MatrixView(self.index, self.time_array)
+    
+    def __len__(self) -> int:
+        return len(self.locations)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+    
+    def indices(self, names: Sequence[str], missing: int = -1) -> np.ndarray:
+        return np.fromiter((self.index.get(name, missing) for name in names),
+                           dtype=np.intp, count=len(names))
+    
+    def distance(self, from_location: str, to_location: str,
+                 default: Optional[float] = None) -> Optional[float]:
+        i = self.index.get(from_location)
+        j = self.index.get(to_location)
+        if i is None or j is None:
+            return default
+        return float(self.distance_array[i, j])
+    
+    def travel_time(self, from_location: str, to_location: str,
+                    default: Optional[float] = None) -> Optional[float]:
+        i = self.index.get(from_location)
+        j = self.index.get(to_location)
+        if i is None or j is None:
+            return default
+        return float(self.time_array[i, j])
+    
+    def submatrix(self, names: Sequence[str], default: float = np.nan,
+                  times: bool = False) -> np.ndarray:
+        # Matrix restricted to names (in that order); unknown names get `default`
+        source = self.time_array if times else self.distance_array
+        idx = self.indices(names)
+        known = idx >= 0
+        result = np.full((len(names), len(names)), default, dtype=np.float64)
+        result[np.ix_(known, known)] = source[np.ix_(idx[known], idx[known])]
+        np.fill_diagonal(result, 0.0)
+        return result
+    
+    def segment_distances(self, sequence: Sequence[int]) -> np.ndarray:
+        seq = np.asarray(sequence, dtype=np.intp)
+        return self.distance_array[seq[:-1], seq[1:]]
+    
+    def segment_times(self, sequence: Sequence[int]) -> np.ndarray:
+        seq = np.asarray(sequence, dtype=np.intp)
+        return self.time_array[seq[:-1], seq[1:]]
+    
+    def route_distance(self, sequence: Sequence[int]) -> float:
+        return float(self.segment_distances(sequence).sum())
+    
+    def route_time(self, sequence: Sequence[int]) -> float:
+        return float(self.segment_times(sequence).sum())
+    
+    def route_distances(self, sequences: Sequence[Sequence[int]]) -> np.ndarray:
+        # Total length of many routes in one gather; each sequence lists index stops in order
+        return _batched_route_sums(self.distance_array, sequences)
+    
+    def route_times(self, sequences: Sequence[Sequence[int]]) -> np.ndarray:
+        return _batched_route_sums(self.time_array, sequences)
+    
+    def route_sums(self, values: np.ndarray, sequences: Sequence[Sequence[int]]) -> np.ndarray:
+        # Same as route_distances for any per-arc array aligned with this matrix (costs, tolls)
+        return _batched_route_sums(values, sequences)
+
+
+def _batched_route_sums(values: np.ndarray, sequences: Sequence[Sequence[int]]) -> np.ndarray:
+    totals = np.zeros(len(sequences), dtype=np.float64)
+    lengths = np.fromiter((len(seq) for seq in sequences), dtype=np.intp, count=len(sequences))
+    if lengths.sum() == 0:
+        return totals
+    flat = np.concatenate([np.asarray(seq, dtype=np.intp) for seq in sequences])
+    
+    # Segments crossing from one route into the next are masked out
+    segment_values = values[flat[:-1], flat[1:]]
+    route_ids = np.repeat(np.arange(len(sequences)), lengths)
+    same_route = route_ids[:-1] == route_ids[1:]
+    return np.bincount(route_ids[:-1][same_route], weights=segment_values[same_route],
+                       minlength=len(sequences)).astype(np.float64)
 
 
 @dataclass
@@ -117,6 +246,16 @@ class OptimizationResult:
     solve_time: float
     objective_value: float
     gap: Optional[float] = None
+    solver_stats: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class OrderChanges:
+    # What changed since an OptimizationResult was produced; modified stores replace those with the same id
+    added_stores: List[Store] = field(default_factory=list)
+    removed_store_ids: List[str] = field(default_factory=list)
+    modified_stores: List[Store] = field(default_factory=list)
+    unavailable_vehicle_ids: List[str] = field(default_factory=list)
 
 
 @dataclass
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from data.models import DistanceMatrix, OptimizationResult, PalletType
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+PARQUET_AVAILABLE = pq is not None
+
+MANIFEST_FILE = "_dataset.json"
+# Partitioning groups rows by key; this column restores the order they were written in
+ROW_NUMBER = "row_number"
+# Appended tables number rows per write, so runs are ordered first
+ORDER_BY = {'routes': ['run_id']}
+# Table -> hive partition columns: locations by state (region), orders by month, result routes by run date
+PARTITIONS = {
+    'stores': ['state'],
+    'suppliers': ['state'],
+    'orders': ['order_month'],
+    'tolls': [],
+    'distance_matrices': [],
+    'routes': ['run_date'],
+}
+
+Filters = List[tuple]
+
+
+def file_fingerprint(path: Path) -> Dict:
+    stat = Path(path).stat()
+    return {'path': str(Path(path).resolve()), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _python_objects(values: pd.Series) -> pd.Series:
+    return values.astype(object).where(values.notna(), None)
+
+
+def _encode(table: str, frame: pd.DataFrame) -> pd.DataFrame:
+    # Enums and Python objects become plain Arrow types; decoded again by _decode
+    frame = frame.copy()
+    if 'pallet_type' in frame.columns:
+        frame['pallet_type'] = [kind.value for kind in frame['pallet_type']]
+    if 'pallet_types' in frame.columns:
+        frame['pallet_types'] = [[kind.value for kind in kinds] for kinds in frame['pallet_types']]
+    for column in ('delivery_window_start', 'delivery_window_end'):
+        if column in frame.columns:
+            frame[column] = pd.to_datetime(frame[column])
+    frame[ROW_NUMBER] = np.arange(len(frame), dtype=np.int64)
+    if table == 'orders':
+        frame['order_month'] = pd.to_datetime(frame['requested_date']).dt.strftime('%Y-%m')
+    return frame
+
+
+def _decode(frame: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    if 'pallet_type' in frame.columns:
+        frame['pallet_type'] = frame['pallet_type'].map({kind.value: kind for kind in PalletType}).astype(object)
+    if 'pallet_types' in frame.columns:
+        frame['pallet_types'] = [tuple(PalletType(value) for value in values) for values in frame['pallet_types']]
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            # Partition keys come back dictionary-encoded
+            frame[column] = frame[column].astype(str if dtypes.get(column) != 'object' else object)
+        if dtypes.get(column) == 'object':
+            frame[column] = _python_objects(frame[column])
+    return frame
+
+
+class ParquetStore:
+    """Parquet datasets under one directory: <table>/<name>/ with hive partitions and a JSON manifest.
+    
+    Excel inputs stay the source of truth; cached_frame converts a workbook once and re-reads the Parquet
+    copy until the workbook's contents change.
+    """
+    
+    def __init__(self, directory: str = "data/lake"):
+        if not PARQUET_AVAILABLE:
+            raise ImportError("Parquet storage needs pyarrow (pip install pyarrow)")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def write(self, table: str, name: str, frame: pd.DataFrame, source: Optional[Dict] = None) -> Path:
+        dataset = self._dataset_dir(table, name)
+        encoded = _encode(table, frame)
+        manifest = {
+            'table': table,
+            'columns': list(frame.columns),
+            'dtypes': {column: str(dtype) for column, dtype in frame.dtypes.items()},
+            'source': source,
+            'created_at': datetime.now().isoformat(),
+        }
+        
+        # Written beside the old copy and swapped in, so readers never see a half-written dataset
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{name}.", dir=dataset.parent))
+        try:
+            arrow_table = pa.Table.from_pandas(encoded, preserve_index=False)
+            partition_cols = PARTITIONS.get(table) or None
+            if partition_cols and len(encoded):
+                pq.write_to_dataset(arrow_table, tmp_dir, partition_cols=partition_cols)
+            else:
+                pq.write_table(arrow_table, tmp_dir / "part-0.parquet")
+            with open(tmp_dir / MANIFEST_FILE, 'w') as f:
+                json.dump(manifest, f)
+            
+            old_dir = None
+            if dataset.exists():
+                old_dir = Path(tempfile.mkdtemp(prefix=f".{name}.old.", dir=dataset.parent))
+                os.replace(dataset, old_dir / name)
+            os.replace(tmp_dir, dataset)
+            if old_dir is not None:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return dataset
+    
+    def read(self, table: str, name: str, columns: Optional[Sequence[str]] = None,
+             filters: Optional[Filters] = None) -> pd.DataFrame:
+        # columns are projected and filters (pyarrow DNF, e.g. [('state', 'in', ['IL', 'WI'])]) pushed down,
+        # so only matching partitions and row groups are decoded
+        dataset = self._dataset_dir(table, name)
+        manifest = self._manifest(dataset)
+        if manifest is None:
+            raise FileNotFoundError(f"No {table} dataset named '{name}' in {self.directory}")
+        
+        wanted = list(columns) if columns is not None else manifest['columns']
+        order_by = ORDER_BY.get(table, []) + [ROW_NUMBER]
+        extra = [column for column in order_by if column not in wanted]
+        arrow_table = pq.read_table(dataset, columns=wanted + extra, filters=filters or None,
+                                    partitioning='hive')
+        arrow_table = arrow_table.sort_by([(column, 'ascending') for column in order_by])
+        frame = arrow_table.drop_columns(extra).to_pandas()
+        return _decode(frame[wanted], manifest['dtypes'])
+    
+    def exists(self, table: str, name: str) -> bool:
+        return self._manifest(self._dataset_dir(table, name)) is not None
+    
+    def cached_frame(self, table: str, source: Path, build: Callable[[], pd.DataFrame],
+                     columns: Optional[Sequence[str]] = None,
+                     filters: Optional[Filters] = None) -> pd.DataFrame:
+        # Fresh when mtime and size match; a touched file whose bytes are unchanged is still fresh
+        source = Path(source)
+        name = self.source_name(source)
+        dataset = self._dataset_dir(table, name)
+        manifest = self._manifest(dataset)
+        fingerprint = file_fingerprint(source)
+        
+        recorded = (manifest or {}).get('source') or {}
+        fresh = all(recorded.get(key) == fingerprint[key] for key in ('path', 'mtime_ns', 'size'))
+        if not fresh and recorded.get('size') == fingerprint['size'] and recorded.get('sha256') == file_hash(source):
+            recorded.update(fingerprint)
+            with open(dataset / MANIFEST_FILE, 'w') as f:
+                json.dump(manifest, f)
+            fresh = True
+        
+        if not fresh:
+            frame = build()
+            self.write(table, name, frame, source={**fingerprint, 'sha256': file_hash(source)})
+            if columns is None and filters is None:
+                return frame
+        return self.read(table, name, columns, filters)
+    
+    def read_orders(self, name: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                    columns: Optional[Sequence[str]] = None, filters: Optional[Filters] = None) -> pd.DataFrame:
+        # Date bounds prune whole month partitions before the row-level filter on requested_date
+        filters = list(filters or [])
+        if start_date is not None:
+            start = pd.Timestamp(start_date)
+            filters += [('order_month', '>=', start.strftime('%Y-%m')), ('requested_date', '>=', start)]
+        if end_date is not None:
+            end = pd.Timestamp(end_date)
+            filters += [('order_month', '<=', end.strftime('%Y-%m')), ('requested_date', '<=', end)]
+        return self.read('orders', name, columns, filters)
+    
+    def write_distance_matrix(self, name: str, matrix: DistanceMatrix) -> Path:
+        # Long format, one row per (from, to) pair, so a subset of locations can be read by predicate
+        n = len(matrix.locations)
+        names = pd.Categorical(matrix.locations)
+        frame = pd.DataFrame({
+            'from_location': names[np.repeat(np.arange(n), n)],
+            'to_location': names[np.tile(np.arange(n), n)],
+            'distance_miles': np.asarray(matrix.distance_array, dtype=np.float64).ravel(),
+            'time_hours': np.asarray(matrix.time_array, dtype=np.float64).ravel(),
+        })
+        return self.write('distance_matrices', name, frame)
+    
+    def read_distance_matrix(self, name: str, locations: Optional[Sequence[str]] = None) -> DistanceMatrix:
+        filters = None
+        if locations is not None:
+            locations = list(locations)
+            filters = [('from_location', 'in', locations), ('to_location', 'in', locations)]
+        frame = self.read('distance_matrices', name, filters=filters)
+        if locations is None:
+            locations = list(pd.unique(frame['from_location']))
+        
+        position = {location: i for i, location in enumerate(locations)}
+        rows = frame['from_location'].map(position).to_numpy()
+        cols = frame['to_location'].map(position).to_numpy()
+        n = len(locations)
+        if len(frame) != n * n:
+            missing = sorted(set(locations) - set(frame['from_location']))
+            raise ValueError(f"Distance matrix '{name}' lacks {len(missing)} location(s), e.g. {missing[:3]}")
+        distances = np.empty((n, n))
+        times = np.empty((n, n))
+        distances[rows, cols] = frame['distance_miles'].to_numpy()
+        times[rows, cols] = frame['time_hours'].to_numpy()
+        return DistanceMatrix(locations, distances, times)
+    
+    def append_routes(self, result: OptimizationResult, run_id: Optional[str] = None,
+                      run_date: Optional[datetime] = None) -> str:
+        # One row per route; each run adds its own files to the run_date partition
+        run_date = run_date or datetime.now()
+        run_id = run_id or run_date.strftime("%Y%m%d_%H%M%S_%f")
+        frame = pd.DataFrame({
+            'run_id': run_id,
+            'route_id': [route.id for route in result.routes],
+            'vehicle_id': [route.vehicle_id for route in result.routes],
+            'stops': [list(route.stops) for route in result.routes],
+            'total_distance': [route.total_distance for route in result.routes],
+            'total_time': [route.total_time for route in result.routes],
+            'total_cost': [route.total_cost for route in result.routes],
+            'pallets_delivered': [route.pallets_delivered for route in result.routes],
+            'status': [route.status.value for route in result.routes],
+            'solver_status': result.solver_status,
+            'run_date': run_date.strftime('%Y-%m-%d'),
+        })
+        if frame.empty:
+            return run_id
+        
+        dataset = self._dataset_dir('routes', 'results')
+        pq.write_to_dataset(pa.Table.from_pandas(_encode('routes', frame), preserve_index=False), dataset,
+                            partition_cols=PARTITIONS['routes'], basename_template=f"{run_id}-{{i}}.parquet",
+                            existing_data_behavior='overwrite_or_ignore')
+        manifest_path = dataset / MANIFEST_FILE
+        if not manifest_path.exists():
+            with open(manifest_path, 'w') as f:
+                json.dump({'table': 'routes', 'columns': list(frame.columns),
+                           'dtypes': {column: str(dtype) for column, dtype in frame.dtypes.items()},
+                           'source': None, 'created_at': datetime.now().isoformat()}, f)
+        return run_id
+    
+    def read_routes(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                    columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        filters = []
+        if start_date is not None:
+            filters.append(('run_date', '>=', pd.Timestamp(start_date).strftime('%Y-%m-%d')))
+        if end_date is not None:
+            filters.append(('run_date', '<=', pd.Timestamp(end_date).strftime('%Y-%m-%d')))
+        return self.read('routes', 'results', columns, filters)
+    
+    def clear(self, table: Optional[str] = None):
+        target = self.directory / table if table else self.directory
+        for entry in target.iterdir() if target.exists() else ():
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+    
+    @staticmethod
+    def source_name(source: Path) -> str:
+        # Same file name in two input directories must not share a dataset
+        source = Path(source)
+        digest = hashlib.sha256(str(source.resolve()).encode('utf-8')).hexdigest()[:8]
+        return f"{source.stem}-{digest}"
+    
+    def _dataset_dir(self, table: str, name: str) -> Path:
+        if table not in PARTITIONS:
+            raise ValueError(f"Unknown table '{table}'. Options: {', '.join(PARTITIONS)}")
+        path = self.directory / table / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+    
+    @staticmethod
+    def _manifest(dataset: Path) -> Optional[Dict]:
+        try:
+            with open(dataset / MANIFEST_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
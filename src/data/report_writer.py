@@ -0,0 +1,161 @@
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from data.models import CostBreakdown, OptimizationResult
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+HEADER_COLOR = "366092"
+MAX_COLUMN_WIDTH = 50
+DATE_FORMAT = "yyyy-mm-dd hh:mm"
+
+
+def summary_frame(result: OptimizationResult) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Metric': ['Total Cost', 'Total Distance', 'Total Time', 'Number of Routes',
+                   'Utilization Rate', 'Solver Status', 'Solve Time', 'Objective Value'],
+        'Value': [f"${result.total_cost:,.2f}", f"{result.total_distance:.1f} miles",
+                  f"{result.total_time:.1f} hours", len(result.routes),
+                  f"{result.utilization_rate:.1%}", result.solver_status,
+                  f"{result.solve_time:.2f} seconds", f"{result.objective_value:,.2f}"]
+    })
+
+
+def routes_frame(result: OptimizationResult) -> pd.DataFrame:
+    routes = result.routes
+    return pd.DataFrame({
+        'Route ID': [route.id for route in routes],
+        'Vehicle ID': [route.vehicle_id for route in routes],
+        'Stops': [' -> '.join(route.stops) for route in routes],
+        'Distance (miles)': [route.total_distance for route in routes],
+        'Time (hours)': [route.total_time for route in routes],
+        'Cost': [route.total_cost for route in routes],
+        'Pallets': [route.pallets_delivered for route in routes],
+        'Status': [route.status.value for route in routes],
+    })
+
+
+def stops_frame(result: OptimizationResult) -> pd.DataFrame:
+    # One row per visit; arrival times only where the route carries one per stop
+    routes = result.routes
+    counts = np.array([len(route.stops) for route in routes], dtype=np.intp)
+    arrivals = chain.from_iterable(route.arrival_times if len(route.arrival_times) == len(route.stops)
+                                   else [None] * len(route.stops) for route in routes)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+    return pd.DataFrame({
+        'Route ID': np.repeat([route.id for route in routes], counts),
+        'Vehicle ID': np.repeat([route.vehicle_id for route in routes], counts),
+        'Stop #': np.arange(counts.sum()) - np.repeat(starts, counts) + 1,
+        'Stop': list(chain.from_iterable(route.stops for route in routes)),
+        'Arrival': list(arrivals),
+    })
+
+
+def cost_frame(result: OptimizationResult,
+               cost_breakdowns: Optional[Sequence[CostBreakdown]] = None) -> pd.DataFrame:
+    # Itemized when the caller passes breakdowns (CostCalculator.calculate_route_costs); totals otherwise
+    routes = result.routes
+    frame = pd.DataFrame({'Route ID': [route.id for route in routes]})
+    total = np.array([route.total_cost for route in routes], dtype=np.float64)
+    if cost_breakdowns is not None:
+        if len(cost_breakdowns) != len(routes):
+            raise ValueError(f"Got {len(cost_breakdowns)} cost breakdowns for {len(routes)} routes")
+        for label, attribute in (('Fuel', 'fuel_cost'), ('Driver', 'driver_cost'), ('Tolls', 'toll_cost'),
+                                 ('Handling', 'handling_cost')):
+            frame[label] = [getattr(breakdown, attribute) for breakdown in cost_breakdowns]
+        total = np.array([breakdown.total_cost for breakdown in cost_breakdowns], dtype=np.float64)
+    
+    pallets = np.array([route.pallets_delivered for route in routes], dtype=np.float64)
+    miles = np.array([route.total_distance for route in routes], dtype=np.float64)
+    frame['Total Cost'] = total
+    frame['Cost per Pallet'] = total / np.maximum(pallets, 1)
+    frame['Cost per Mile'] = total / np.maximum(miles, 1)
+    return frame
+
+
+def report_frames(result: OptimizationResult,
+                  cost_breakdowns: Optional[Sequence[CostBreakdown]] = None) -> Dict[str, pd.DataFrame]:
+    frames = {'Summary': summary_frame(result)}
+    if result.routes:
+        frames['Routes'] = routes_frame(result)
+        frames['Stops'] = stops_frame(result)
+        frames['Costs'] = cost_frame(result, cost_breakdowns)
+    return frames
+
+
+def column_widths(frame: pd.DataFrame) -> List[int]:
+    # Longest rendered value per column, header included, from string lengths rather than cell by cell
+    widths = []
+    for column in frame.columns:
+        values = frame[column]
+        # Blanks render as empty cells, so an all-blank column (no arrival times) is header-wide
+        lengths = values.astype(object).where(values.notna(), '').map(str).str.len()
+        longest = 0 if lengths.empty else int(lengths.max())
+        widths.append(int(min(max(longest, len(str(column))) + 2, MAX_COLUMN_WIDTH)))
+    return widths
+
+
+def write_report(path: Path, frames: Dict[str, pd.DataFrame]) -> Path:
+    """Write each frame to its own sheet with a styled header row, streaming rows to disk.
+    
+    Uses xlsxwriter's constant_memory mode when it is installed, openpyxl's write-only mode otherwise.
+    """
+    if xlsxwriter is not None:
+        _write_xlsxwriter(path, frames)
+    else:
+        _write_openpyxl(path, frames)
+    return path
+
+
+def _rows(frame: pd.DataFrame):
+    # Native Python values with blanks as None, which both engines leave as empty cells
+    return frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+
+
+def _write_xlsxwriter(path: Path, frames: Dict[str, pd.DataFrame]):
+    workbook = xlsxwriter.Workbook(str(path), {'constant_memory': True, 'default_date_format': DATE_FORMAT})
+    try:
+        header = workbook.add_format({'bold': True, 'font_color': 'white', 'bg_color': f"#{HEADER_COLOR}",
+                                      'align': 'center'})
+        for name, frame in frames.items():
+            sheet = workbook.add_worksheet(name)
+            for i, width in enumerate(column_widths(frame)):
+                sheet.set_column(i, i, width)
+            # constant_memory flushes each row once the next starts, so rows go out strictly in order
+            sheet.write_row(0, 0, [str(column) for column in frame.columns], header)
+            for r, row in enumerate(_rows(frame), start=1):
+                sheet.write_row(r, 0, row)
+    finally:
+        workbook.close()
+
+
+def _write_openpyxl(path: Path, frames: Dict[str, pd.DataFrame]):
+    workbook = openpyxl.Workbook(write_only=True)
+    font = Font(bold=True, color="FFFFFF")
+    fill = PatternFill(start_color=HEADER_COLOR, end_color=HEADER_COLOR, fill_type="solid")
+    alignment = Alignment(horizontal="center")
+    for name, frame in frames.items():
+        sheet = workbook.create_sheet(name)
+        for i, width in enumerate(column_widths(frame), start=1):
+            sheet.column_dimensions[get_column_letter(i)].width = width
+        
+        header = []
+        for column in frame.columns:
+            cell = WriteOnlyCell(sheet, value=str(column))
+            cell.font, cell.fill, cell.alignment = font, fill, alignment
+            header.append(cell)
+        sheet.append(header)
+        for row in _rows(frame):
+            sheet.append(row)
+    workbook.save(path)
@@ -1,8 +1,41 @@
 import math
+import re
 import requests
-from typing import Dict, List, Tuple, Optional
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional, Sequence, Union
 from geopy.distance import geodesic
-from geopy.geocoders import Nominatim
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # SpatialIndex falls back to blocked brute-force search
+    cKDTree = None
+
+from utils.geocoding import default_geocoding_service
+
+
+EARTH_RADIUS_MILES = 3959.0
+
+# Average truck speed for turning great-circle miles into hours when no road network is used
+DEFAULT_SPEED_MPH = 55.0
+
+# WGS-84 ellipsoid, used by the Vincenty accuracy mode
+WGS84_SEMI_MAJOR_MILES = 6378137.0 / 1609.344
+WGS84_FLATTENING = 1 / 298.257223563
+WGS84_SEMI_MINOR_MILES = WGS84_SEMI_MAJOR_MILES * (1 - WGS84_FLATTENING)
+
+WEISZFELD_TOLERANCE_MILES = 1e-3
+MAX_WEISZFELD_ITERATIONS = 1000
+
+# Upper bound on elements per computed block, keeps temporaries around 32 MB each
+MAX_BLOCK_ELEMENTS = 4_000_000
+
+CoordinateArray = Union[np.ndarray, Sequence[Tuple[float, float]]]
+
+
+def normalize_location(name: str) -> str:
+    # "St. Louis", "ST LOUIS " and "st-louis" all become "st louis"
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(name).casefold()).split())
 
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -10,7 +43,7 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 
 
 def calculate_travel_time(lat1: float, lon1: float, lat2: float, lon2: float, 
-                         avg_speed_mph: float = 55.0) -> float:
+                         avg_speed_mph: float = DEFAULT_SPEED_MPH) -> float:
     distance = calculate_distance(lat1, lon1, lat2, lon2)
     return distance / avg_speed_mph
 
@@ -34,60 +67,387 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 
 
 def geocode_address(address: str, geocoder_api_key: Optional[str] = None) -> Tuple[float, float]:
-    try:
-        geolocator = Nominatim(user_agent="pallet_optimizer")
-        location = geolocator.geocode(address)
+    # Shared client with a persistent cache and rate limit; see utils.geocoding for batch lookups
+    return default_geocoding_service().geocode(address)
+
+
+def geocode_addresses(addresses: Sequence[str]) -> List[Optional[Tuple[float, float]]]:
+    return default_geocoding_service().geocode_many(addresses)
+
+
+def to_coordinate_array(locations: CoordinateArray) -> np.ndarray:
+    coords = np.asarray(locations, dtype=np.float64)
+    if coords.size == 0:
+        return np.empty((0, 2), dtype=np.float64)
+    if coords.ndim != 2 or coords.shape[1] != 2:
+        raise ValueError(f"Expected (n, 2) array of (lat, lon) pairs, got shape {coords.shape}")
+    return coords
+
+
+def _haversine_kernel(lat1: np.ndarray, lon1: np.ndarray,
+                      lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    # Inputs are in radians and broadcast against each other
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _vincenty_kernel(lat1: np.ndarray, lon1: np.ndarray,
+                     lat2: np.ndarray, lon2: np.ndarray,
+                     max_iterations: int = 200, tolerance: float = 1e-12) -> np.ndarray:
+    a, b, f = WGS84_SEMI_MAJOR_MILES, WGS84_SEMI_MINOR_MILES, WGS84_FLATTENING
+    
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(lat1, lon1, lat2, lon2)
+    U1 = np.arctan((1 - f) * np.tan(lat1))
+    U2 = np.arctan((1 - f) * np.tan(lat2))
+    sin_u1, cos_u1 = np.sin(U1), np.cos(U1)
+    sin_u2, cos_u2 = np.sin(U2), np.cos(U2)
+    
+    L = lon2 - lon1
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(max_iterations):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.sqrt((cos_u2 * sin_lam) ** 2 +
+                                (cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam) ** 2)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            
+            sin_alpha = np.where(sin_sigma > 0, cos_u1 * cos_u2 * sin_lam / sin_sigma, 0.0)
+            cos_sq_alpha = 1 - sin_alpha ** 2
+            # Equatorial lines have cos_sq_alpha == 0
+            cos_2sigma_m = np.where(cos_sq_alpha > 0,
+                                    cos_sigma - 2 * sin_u1 * sin_u2 / cos_sq_alpha, 0.0)
+            C = f / 16 * cos_sq_alpha * (4 + f * (4 - 3 * cos_sq_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = np.abs(lam - lam_prev) <= tolerance
+            if converged.all():
+                break
         
-        if location:
-            return location.latitude, location.longitude
-        else:
-            raise ValueError(f"Could not geocode address: {address}")
+        u_sq = cos_sq_alpha * (a ** 2 - b ** 2) / b ** 2
+        A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) -
+            B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        distance = b * A * (sigma - delta_sigma)
+    
+    # Nearly antipodal pairs may not converge; fall back to the spherical answer
+    fallback = ~converged | ~np.isfinite(distance)
+    if fallback.any():
+        distance = np.where(fallback, _haversine_kernel(lat1, lon1, lat2, lon2), distance)
     
-    except Exception as e:
-        raise ValueError(f"Geocoding failed for {address}: {str(e)}")
+    return distance
 
 
-def calculate_distance_matrix(locations: List[Tuple[float, float]], 
-                            api_key: Optional[str] = None) -> Dict[Tuple[int, int], float]:
-    distance_matrix = {}
+DISTANCE_KERNELS = {
+    'haversine': _haversine_kernel,
+    'vincenty': _vincenty_kernel,
+}
+
+
+def _get_kernel(method: str):
+    if method not in DISTANCE_KERNELS:
+        raise ValueError(f"Unknown distance method '{method}'. "
+                         f"Options: {', '.join(DISTANCE_KERNELS)}")
+    return DISTANCE_KERNELS[method]
+
+
+def _resolve_chunk_size(n_columns: int, chunk_size: Optional[int]) -> int:
+    if chunk_size is not None:
+        return max(1, int(chunk_size))
+    return max(1, MAX_BLOCK_ELEMENTS // max(n_columns, 1))
+
+
+def distance_matrix_array(origins: CoordinateArray,
+                          destinations: Optional[CoordinateArray] = None,
+                          method: str = 'haversine',
+                          dtype: np.dtype = np.float64,
+                          chunk_size: Optional[int] = None,
+                          out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Dense distance matrix in miles, computed in row blocks of bounded size.
+    
+    With no destinations the matrix is square and symmetric, so only the upper
+    triangle blocks are computed and mirrored. `out` may be a preallocated array
+    or memmap of the right shape.
+    """
+    kernel = _get_kernel(method)
+    origin_rad = np.radians(to_coordinate_array(origins))
+    symmetric = destinations is None
+    dest_rad = origin_rad if symmetric else np.radians(to_coordinate_array(destinations))
+    
+    n_rows, n_cols = len(origin_rad), len(dest_rad)
+    if out is None:
+        out = np.empty((n_rows, n_cols), dtype=dtype)
+    elif out.shape != (n_rows, n_cols):
+        raise ValueError(f"Output array has shape {out.shape}, expected {(n_rows, n_cols)}")
+    
+    if n_rows == 0 or n_cols == 0:
+        return out
+    
+    step = _resolve_chunk_size(n_cols, chunk_size)
+    dest_lat = dest_rad[:, 0][np.newaxis, :]
+    dest_lon = dest_rad[:, 1][np.newaxis, :]
+    
+    for start in range(0, n_rows, step):
+        stop = min(start + step, n_rows)
+        row_lat = origin_rad[start:stop, 0][:, np.newaxis]
+        row_lon = origin_rad[start:stop, 1][:, np.newaxis]
+        
+        if symmetric:
+            # Block of rows [start, stop) against columns [start, n)
+            block = kernel(row_lat, row_lon, dest_lat[:, start:], dest_lon[:, start:])
+            out[start:stop, start:] = block
+            out[start:, start:stop] = block.T
+        else:
+            out[start:stop, :] = kernel(row_lat, row_lon, dest_lat, dest_lon)
     
-    for i, loc1 in enumerate(locations):
-        for j, loc2 in enumerate(locations):
-            if i != j:
-                distance = calculate_distance(loc1[0], loc1[1], loc2[0], loc2[1])
-                distance_matrix[(i, j)] = distance
-            else:
-                distance_matrix[(i, j)] = 0.0
+    if symmetric:
+        np.fill_diagonal(out, 0.0)
     
-    return distance_matrix
+    return out
+
+
+def time_matrix_array(distances: np.ndarray, avg_speed_mph: float = DEFAULT_SPEED_MPH) -> np.ndarray:
+    return distances / avg_speed_mph
+
+
+def paired_distances(origins: CoordinateArray, destinations: CoordinateArray,
+                     method: str = 'haversine') -> np.ndarray:
+    # Element-wise distance between origins[i] and destinations[i]
+    kernel = _get_kernel(method)
+    a = np.radians(to_coordinate_array(origins))
+    b = np.radians(to_coordinate_array(destinations))
+    if len(a) != len(b):
+        raise ValueError("origins and destinations must have the same length")
+    return kernel(a[:, 0], a[:, 1], b[:, 0], b[:, 1])
+
+
+def _array_to_index_dict(matrix: np.ndarray) -> Dict[Tuple[int, int], float]:
+    n_rows, n_cols = matrix.shape
+    keys = ((i, j) for i in range(n_rows) for j in range(n_cols))
+    return dict(zip(keys, matrix.ravel().tolist()))
+
+
+def calculate_distance_matrix(locations: List[Tuple[float, float]], 
+                            api_key: Optional[str] = None,
+                            method: str = 'haversine') -> Dict[Tuple[int, int], float]:
+    return _array_to_index_dict(distance_matrix_array(locations, method=method))
 
 
 def calculate_time_matrix(locations: List[Tuple[float, float]], 
-                         avg_speed_mph: float = 55.0) -> Dict[Tuple[int, int], float]:
-    time_matrix = {}
+                         avg_speed_mph: float = DEFAULT_SPEED_MPH,
+                         method: str = 'haversine') -> Dict[Tuple[int, int], float]:
+    distances = distance_matrix_array(locations, method=method)
+    return _array_to_index_dict(time_matrix_array(distances, avg_speed_mph))
+
+
+def unit_vectors(coordinates: CoordinateArray) -> np.ndarray:
+    # (lat, lon) degrees to points on the unit sphere; straight-line (chord) order matches great-circle order
+    coords = np.radians(to_coordinate_array(coordinates))
+    cos_lat = np.cos(coords[:, 0])
+    return np.column_stack((cos_lat * np.cos(coords[:, 1]), cos_lat * np.sin(coords[:, 1]), np.sin(coords[:, 0])))
+
+
+def chord_to_miles(chord: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.clip(np.asarray(chord) / 2, 0.0, 1.0))
+
+
+def miles_to_chord(miles: float) -> float:
+    return 2 * math.sin(min(max(miles, 0.0) / (2 * EARTH_RADIUS_MILES), math.pi / 2))
+
+
+def to_lat_lon(vectors: np.ndarray) -> np.ndarray:
+    vectors = vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.degrees(np.column_stack((np.arcsin(np.clip(vectors[:, 2], -1.0, 1.0)),
+                                       np.arctan2(vectors[:, 1], vectors[:, 0]))))
+
+
+def geometric_median(coordinates: CoordinateArray,
+                     weights: Optional[Sequence[float]] = None) -> Tuple[float, float]:
+    # Point minimizing the weighted sum of great-circle distances (Weiszfeld on the unit sphere)
+    points = unit_vectors(coordinates)
+    if len(points) == 0:
+        return 0.0, 0.0
+    weights = point_weights(weights, len(points))
+    labels = np.zeros(len(points), dtype=np.intp)
+    centers, _ = weiszfeld(points, weights, labels, _weighted_centers(points, weights, labels, 1))
+    lat, lon = to_lat_lon(centers)[0]
+    return float(lat), float(lon)
+
+
+def weiszfeld(points: np.ndarray, weights: np.ndarray, labels: np.ndarray, centers: np.ndarray,
+              tolerance_miles: float = WEISZFELD_TOLERANCE_MILES,
+              max_iter: int = MAX_WEISZFELD_ITERATIONS) -> Tuple[np.ndarray, int]:
+    # Geometric median of every group of unit vectors at once; points[labels == c] belong to centers[c].
+    # Iterates that land on a store use the Vardi-Zhang step instead of dividing by zero.
+    p = len(centers)
+    centers = centers.copy()
+    tolerance = tolerance_miles / EARTH_RADIUS_MILES
+    for iteration in range(1, max_iter + 1):
+        offsets = points - centers[labels]
+        distances = np.linalg.norm(offsets, axis=1)
+        at_center = distances < 1e-12
+        inverse = np.where(at_center, 0.0, weights / np.where(at_center, 1.0, distances))
+        
+        denominator = np.bincount(labels, weights=inverse, minlength=p)
+        target = np.column_stack([np.bincount(labels, weights=inverse * points[:, d], minlength=p)
+                                  for d in range(3)])
+        pull = np.column_stack([np.bincount(labels, weights=inverse * offsets[:, d], minlength=p)
+                                for d in range(3)])
+        stuck = np.bincount(labels, weights=np.where(at_center, weights, 0.0), minlength=p)
+        
+        moving = denominator > 0
+        target[moving] /= denominator[moving, None]
+        target[~moving] = centers[~moving]
+        # With a store under the center, move only as far as the pull of the others outweighs it
+        strength = np.linalg.norm(pull, axis=1)
+        share = np.where(strength > 0, np.minimum(stuck / np.where(strength > 0, strength, 1.0), 1.0), 1.0)
+        updated = (1.0 - share)[:, None] * target + share[:, None] * centers
+        updated /= np.linalg.norm(updated, axis=1, keepdims=True)
+        
+        step = np.linalg.norm(updated - centers, axis=1).max(initial=0.0)
+        centers = updated
+        if step < tolerance:
+            break
+    return centers, iteration
+
+
+def point_weights(weights: Optional[Sequence[float]], n: int) -> np.ndarray:
+    if weights is None or len(weights) != n:
+        return np.ones(n)
+    return np.asarray(weights, dtype=np.float64)
+
+
+def _weighted_centers(points: np.ndarray, weights: np.ndarray, labels: np.ndarray, p: int) -> np.ndarray:
+    sums = np.column_stack([np.bincount(labels, weights=weights * points[:, d], minlength=p) for d in range(3)])
+    return sums / np.linalg.norm(sums, axis=1, keepdims=True)
+
+
+class SpatialIndex:
+    """k-nearest and radius queries over fixed (lat, lon) points, by great-circle (haversine) miles.
+    
+    Points live on the unit sphere in a KD-tree (scipy), so each query is O(log n); without scipy
+    queries are answered by blocked brute force over the same vectors.
+    """
+    
+    def __init__(self, coordinates: CoordinateArray):
+        self.points = unit_vectors(coordinates)
+        self.tree = cKDTree(self.points) if cKDTree is not None and len(self.points) else None
+    
+    def __len__(self) -> int:
+        return len(self.points)
     
-    for i, loc1 in enumerate(locations):
-        for j, loc2 in enumerate(locations):
-            if i != j:
-                travel_time = calculate_travel_time(loc1[0], loc1[1], loc2[0], loc2[1], avg_speed_mph)
-                time_matrix[(i, j)] = travel_time
-            else:
-                time_matrix[(i, j)] = 0.0
+    def query(self, coordinates: CoordinateArray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        # (m, k) distances in miles and indices, nearest first, for every query point
+        queries = unit_vectors(coordinates)
+        k = min(k, len(self.points))
+        if k <= 0 or len(queries) == 0:
+            return np.zeros((len(queries), 0)), np.zeros((len(queries), 0), dtype=np.intp)
+        
+        if self.tree is not None:
+            chords, indices = self.tree.query(queries, k=k)
+            chords, indices = chords.reshape(len(queries), k), indices.reshape(len(queries), k)
+        else:
+            chords = np.empty((len(queries), k))
+            indices = np.empty((len(queries), k), dtype=np.intp)
+            step = _resolve_chunk_size(len(self.points), None)
+            for start in range(0, len(queries), step):
+                block = self._chords(queries[start:start + step])
+                nearest = np.argpartition(block, k - 1, axis=1)[:, :k] if k < block.shape[1] else \
+                    np.tile(np.arange(block.shape[1]), (len(block), 1))
+                order = np.take_along_axis(block, nearest, axis=1).argsort(axis=1)
+                indices[start:start + step] = np.take_along_axis(nearest, order, axis=1)
+                chords[start:start + step] = np.take_along_axis(block, indices[start:start + step], axis=1)
+        return chord_to_miles(chords), indices.astype(np.intp)
+    
+    def query_radius(self, coordinates: CoordinateArray, radius_miles: float) -> List[np.ndarray]:
+        # Indices within radius_miles of each query point, nearest first
+        queries = unit_vectors(coordinates)
+        if len(self.points) == 0:
+            return [np.zeros(0, dtype=np.intp) for _ in range(len(queries))]
+        
+        chord = miles_to_chord(radius_miles)
+        if self.tree is not None:
+            found = [np.asarray(hits, dtype=np.intp) for hits in self.tree.query_ball_point(queries, r=chord)]
+        else:
+            found = []
+            step = _resolve_chunk_size(len(self.points), None)
+            for start in range(0, len(queries), step):
+                found.extend(np.flatnonzero(row <= chord) for row in self._chords(queries[start:start + step]))
+        
+        ordered = []
+        for query, hits in zip(queries, found):
+            distances = np.linalg.norm(self.points[hits] - query, axis=1)
+            ordered.append(hits[np.argsort(distances, kind='stable')])
+        return ordered
     
-    return time_matrix
+    def nearest(self, lat: float, lon: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        distances, indices = self.query([(lat, lon)], k)
+        return distances[0], indices[0]
+    
+    def within(self, lat: float, lon: float, radius_miles: float) -> np.ndarray:
+        return self.query_radius([(lat, lon)], radius_miles)[0]
+    
+    def _chords(self, queries: np.ndarray) -> np.ndarray:
+        squared = 2.0 - 2.0 * (queries @ self.points.T)
+        return np.sqrt(np.maximum(squared, 0.0))
+
+
+def spatial_index(coordinates: CoordinateArray) -> SpatialIndex:
+    # Indexes are reused for repeated queries against the same location set
+    coords = np.ascontiguousarray(to_coordinate_array(coordinates))
+    return _cached_spatial_index(coords.tobytes(), len(coords))
+
+
+@lru_cache(maxsize=16)
+def _cached_spatial_index(key: bytes, n: int) -> SpatialIndex:
+    return SpatialIndex(np.frombuffer(key, dtype=np.float64).reshape(n, 2))
 
 
 def find_nearest_locations(target_lat: float, target_lon: float, 
                           locations: List[Tuple[str, float, float]], 
-                          n: int = 5) -> List[Tuple[str, float]]:
-    distances = []
+                          n: int = 5, index: Optional[SpatialIndex] = None) -> List[Tuple[str, float]]:
+    # The index picks the candidates; reported distances are geodesic as before
+    if not locations or n <= 0:
+        return []
+    index = index or spatial_index([(lat, lon) for _, lat, lon in locations])
+    _, nearest = index.nearest(target_lat, target_lon, n)
     
-    for name, lat, lon in locations:
-        distance = calculate_distance(target_lat, target_lon, lat, lon)
-        distances.append((name, distance))
+    distances = []
+    for i in nearest.tolist():
+        name, lat, lon = locations[i]
+        distances.append((name, calculate_distance(target_lat, target_lon, lat, lon)))
     
     distances.sort(key=lambda x: x[1])
-    return distances[:n]
+    return distances
+
+
+def locations_within_radius(center_lat: float, center_lon: float,
+                            locations: List[Tuple[str, float, float]], radius_miles: float,
+                            index: Optional[SpatialIndex] = None) -> List[Tuple[str, float]]:
+    # Batch form of is_within_radius: every location within radius_miles, nearest first
+    if not locations:
+        return []
+    index = index or spatial_index([(lat, lon) for _, lat, lon in locations])
+    
+    # Spherical candidates with a little slack, then the same geodesic test as is_within_radius
+    within = []
+    for i in index.within(center_lat, center_lon, radius_miles * 1.01 + 0.1).tolist():
+        name, lat, lon = locations[i]
+        distance = calculate_distance(center_lat, center_lon, lat, lon)
+        if distance <= radius_miles:
+            within.append((name, distance))
+    
+    within.sort(key=lambda x: x[1])
+    return within
 
 
 def calculate_route_distance(route_coordinates: List[Tuple[float, float]]) -> float:
@@ -131,21 +491,12 @@ def calculate_centroid(locations: List[Tuple[float, float]]) -> Tuple[float, flo
 
 def optimize_depot_location(store_locations: List[Tuple[float, float]], 
                            weights: Optional[List[float]] = None) -> Tuple[float, float]:
+    # Weighted geometric median: the point with the least total (weighted) distance to the stores.
+    # Multi-depot and candidate-site studies use core.facility_location.locate_facilities.
     if not store_locations:
         return 0.0, 0.0
     
-    if weights is None:
-        weights = [1.0] * len(store_locations)
-    
-    if len(weights) != len(store_locations):
+    if weights is None or len(weights) != len(store_locations):
         weights = [1.0] * len(store_locations)
     
-    total_weight = sum(weights)
-    
-    weighted_lat = sum(loc[0] * weight for loc, weight in zip(store_locations, weights))
-    weighted_lon = sum(loc[1] * weight for loc, weight in zip(store_locations, weights))
-    
-    optimal_lat = weighted_lat / total_weight
-    optimal_lon = weighted_lon / total_weight
-    
-    return optimal_lat, optimal_lon
\ No newline at end of file
+    return geometric_median(store_locations, weights)
@@ -0,0 +1,202 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from geopy.geocoders import Nominatim
+
+
+logger = logging.getLogger('pallet_optimizer')
+
+Coordinates = Tuple[float, float]
+
+DEFAULT_CACHE_PATH = "data/reference/geocode_cache.sqlite"
+# Nominatim's usage policy allows one request per second
+DEFAULT_RATE_PER_SECOND = 1.0
+
+
+def normalize_address(address: str) -> str:
+    # "100 N. State St,  Chicago" and "100 n state st chicago" share a cache entry
+    return " ".join(re.sub(r"[^0-9a-z#]+", " ", str(address).casefold()).split())
+
+
+class GeocoderBackend:
+    """Turns one address into (latitude, longitude); None when the address is unknown."""
+    
+    name = "base"
+    
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        raise NotImplementedError
+
+
+class NominatimBackend(GeocoderBackend):
+    # domain/scheme point the client at a self-hosted or stand-in Nominatim server
+    name = "nominatim"
+    
+    def __init__(self, user_agent: str = "pallet_optimizer", domain: Optional[str] = None,
+                 scheme: Optional[str] = None, timeout: float = 10.0):
+        options = {'user_agent': user_agent, 'timeout': timeout}
+        if domain:
+            options['domain'] = domain
+        if scheme:
+            options['scheme'] = scheme
+        self.client = Nominatim(**options)
+    
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        location = self.client.geocode(address)
+        return (location.latitude, location.longitude) if location else None
+
+
+class StandInGeocoder(GeocoderBackend):
+    """Answers from a fixed address table, so geocoding runs offline (tests, demos).
+    
+    Addresses are matched after normalize_address; unknown ones are not found. Addresses in
+    failing raise instead, like a backend outage. lookups records every address asked for.
+    """
+    
+    name = "stand-in"
+    
+    def __init__(self, table: Optional[Dict[str, Coordinates]] = None):
+        self.table = {normalize_address(address): coords for address, coords in (table or {}).items()}
+        self.failing: Set[str] = set()
+        self.lookups: List[str] = []
+        self.lock = threading.Lock()
+    
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        key = normalize_address(address)
+        with self.lock:
+            self.lookups.append(address)
+        if key in {normalize_address(failing) for failing in self.failing}:
+            raise ConnectionError(f"Stand-in geocoder failure for {address}")
+        return self.table.get(key)
+
+
+class RateLimiter:
+    """Spaces calls at least 1 / rate seconds apart across all threads."""
+    
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second and rate_per_second > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class GeocodeCache:
+    """Results keyed by normalized address in an SQLite file; addresses that failed are cached too."""
+    
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS geocodes (address TEXT PRIMARY KEY, latitude REAL, "
+                         "longitude REAL, backend TEXT, updated_at REAL)")
+    
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Optional[Coordinates]]:
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(keys), 500):
+                chunk = list(keys[start:start + 500])
+                rows = conn.execute(f"SELECT address, latitude, longitude FROM geocodes "
+                                    f"WHERE address IN ({','.join('?' * len(chunk))})", chunk)
+                for key, lat, lon in rows:
+                    found[key] = None if lat is None else (lat, lon)
+        return found
+    
+    def put_many(self, results: Dict[str, Optional[Coordinates]], backend: str):
+        now = time.time()
+        rows = [(key, coords[0] if coords else None, coords[1] if coords else None, backend, now)
+                for key, coords in results.items()]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?)", rows)
+    
+    def forget_failures(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM geocodes WHERE latitude IS NULL")
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+class GeocodingService:
+    def __init__(self, backend: Optional[GeocoderBackend] = None, cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 rate_per_second: float = DEFAULT_RATE_PER_SECOND, workers: int = 4):
+        self.backend = backend or NominatimBackend()
+        self.cache = GeocodeCache(cache_path) if cache_path else None
+        self.rate_limiter = RateLimiter(rate_per_second)
+        self.workers = max(1, workers)
+        # Session results, so repeated lookups skip the database as well
+        self.memory: Dict[str, Optional[Coordinates]] = {}
+    
+    def geocode(self, address: str) -> Coordinates:
+        coords = self.geocode_many([address])[0]
+        if coords is None:
+            raise ValueError(f"Could not geocode address: {address}")
+        return coords
+    
+    def geocode_many(self, addresses: Sequence[str]) -> List[Optional[Coordinates]]:
+        # Each distinct address is looked up once: memory, then the cache file, then the backend
+        keys = [normalize_address(address) for address in addresses]
+        first_address = {}
+        for key, address in zip(keys, addresses):
+            first_address.setdefault(key, address)
+        
+        missing = [key for key in first_address if key not in self.memory]
+        if missing and self.cache is not None:
+            self.memory.update(self.cache.get_many(missing))
+            missing = [key for key in missing if key not in self.memory]
+        
+        if missing:
+            fetched = self._fetch([first_address[key] for key in missing])
+            # Backend errors are retried next time; only definite answers are kept
+            results = {key: coords for key, (coords, ok) in zip(missing, fetched) if ok}
+            self.memory.update(results)
+            if self.cache is not None and results:
+                self.cache.put_many(results, self.backend.name)
+            found = sum(coords is not None for coords, _ in fetched)
+            logger.info(f"Geocoded {found} of {len(missing)} new addresses")
+        
+        return [self.memory.get(key) for key in keys]
+    
+    def _fetch(self, addresses: List[str]) -> List[Tuple[Optional[Coordinates], bool]]:
+        def lookup(address: str) -> Tuple[Optional[Coordinates], bool]:
+            self.rate_limiter.wait()
+            try:
+                return self.backend.geocode(address), True
+            except Exception as e:
+                logger.warning(f"Geocoding failed for {address}: {e}")
+                return None, False
+        
+        if self.workers == 1 or len(addresses) == 1:
+            return [lookup(address) for address in addresses]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(addresses))) as pool:
+            return list(pool.map(lookup, addresses))
+
+
+_default_service: Optional[GeocodingService] = None
+
+
+def default_geocoding_service() -> GeocodingService:
+    global _default_service
+    if _default_service is None:
+        _default_service = GeocodingService()
+    return _default_service
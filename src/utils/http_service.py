@@ -0,0 +1,83 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Collection, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def pooled_session(pool_size: int = 4, retries: int = 2,
+                   allowed_methods: Union[Collection[str], None] = Retry.DEFAULT_ALLOWED_METHODS) -> requests.Session:
+    # Keep-alive connections shared by every request, retried with backoff on busy or failing servers.
+    # allowed_methods=None retries any method, POST included.
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=Retry(total=retries, backoff_factor=0.5, status_forcelist=RETRY_STATUSES,
+                                            allowed_methods=allowed_methods))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class StandInServer:
+    """Local JSON server on a background thread, so HTTP clients can run offline (tests, demos).
+    
+    Subclasses implement answer(path, body) -> (status, JSON body) for GET and POST requests;
+    requests counts the requests served.
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.requests = 0
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.respond(b'')
+            
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.respond(self.rfile.read(length))
+            
+            def respond(self, body: bytes):
+                server.requests += 1
+                status, answer = server.answer(self.path, body)
+                payload = json.dumps(answer).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def answer(self, path: str, body: bytes) -> Tuple[int, Dict]:
+        raise NotImplementedError
+    
+    def start(self) -> 'StandInServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
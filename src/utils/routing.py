@@ -0,0 +1,178 @@
+import logging
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import requests
+
+from utils.geo_utils import (
+    DEFAULT_SPEED_MPH, CoordinateArray, distance_matrix_array, time_matrix_array, to_coordinate_array
+)
+from utils.http_service import StandInServer, pooled_session
+
+
+logger = logging.getLogger('pallet_optimizer')
+
+METERS_PER_MILE = 1609.344
+# OSRM's default --max-table-size: coordinates per /table request, sources and destinations together
+OSRM_MAX_TABLE_SIZE = 100
+
+
+class RoutingBackend:
+    """Many-to-many travel distances (miles) and times (hours) between (lat, lon) points."""
+    
+    # Identifies cached matrices; two backends with the same key must give the same answers
+    cache_key = "base"
+    avg_speed_mph: Optional[float] = None
+    # Road networks are not symmetric (one-way streets, ramps); great-circle distances are
+    symmetric = False
+    # False when the last table() had to fill in some answers from a fallback; such results are not cached
+    last_complete = True
+    
+    def table(self, origins: CoordinateArray,
+              destinations: Optional[CoordinateArray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+
+class GreatCircleBackend(RoutingBackend):
+    symmetric = True
+    
+    def __init__(self, method: str = 'haversine', avg_speed_mph: float = DEFAULT_SPEED_MPH,
+                 dtype: np.dtype = np.float64):
+        self.method = method
+        self.avg_speed_mph = avg_speed_mph
+        self.dtype = np.dtype(dtype)
+        # Same key as the matrix cache has always used, so existing entries stay valid
+        self.cache_key = method
+    
+    def table(self, origins: CoordinateArray,
+              destinations: Optional[CoordinateArray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        distances = distance_matrix_array(origins, destinations, method=self.method, dtype=self.dtype)
+        return distances, time_matrix_array(distances, self.avg_speed_mph)
+
+
+class OSRMBackend(RoutingBackend):
+    """OSRM /table client: blocks of sources x destinations per request over one pooled session.
+    
+    Pairs OSRM cannot route, and whole blocks whose request fails, use the fallback backend.
+    """
+    
+    def __init__(self, base_url: str, profile: str = 'driving', max_table_size: int = OSRM_MAX_TABLE_SIZE,
+                 timeout: float = 30.0, pool_size: int = 4, retries: int = 2,
+                 fallback: Optional[RoutingBackend] = None, session: Optional[requests.Session] = None):
+        self.base_url = base_url.rstrip('/')
+        self.profile = profile
+        self.max_table_size = max(int(max_table_size), 2)
+        self.timeout = timeout
+        self.fallback = fallback or GreatCircleBackend()
+        self.cache_key = f"osrm:{self.base_url}/{profile}"
+        
+        self.session = session or pooled_session(pool_size, retries)
+    
+    def table(self, origins: CoordinateArray,
+              destinations: Optional[CoordinateArray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        sources = to_coordinate_array(origins)
+        targets = sources if destinations is None else to_coordinate_array(destinations)
+        distances = np.empty((len(sources), len(targets)))
+        times = np.empty((len(sources), len(targets)))
+        if len(sources) == 0 or len(targets) == 0:
+            return distances, times
+        
+        self.last_complete = True
+        # Square-ish blocks use the per-request coordinate budget best
+        rows = max(1, min(len(sources), self.max_table_size // 2))
+        cols = max(1, min(len(targets), self.max_table_size - rows))
+        for r in range(0, len(sources), rows):
+            for c in range(0, len(targets), cols):
+                block = (slice(r, r + rows), slice(c, c + cols))
+                distances[block], times[block] = self._table_block(sources[block[0]], targets[block[1]])
+        
+        if destinations is None:
+            np.fill_diagonal(distances, 0.0)
+            np.fill_diagonal(times, 0.0)
+        return distances, times
+    
+    def close(self):
+        self.session.close()
+    
+    def _table_block(self, sources: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        points = np.concatenate((sources, targets))
+        coordinates = ";".join(f"{lon:.6f},{lat:.6f}" for lat, lon in points)
+        params = {
+            'sources': ";".join(map(str, range(len(sources)))),
+            'destinations': ";".join(map(str, range(len(sources), len(points)))),
+            'annotations': 'duration,distance',
+        }
+        try:
+            response = self.session.get(f"{self.base_url}/table/v1/{self.profile}/{coordinates}",
+                                        params=params, timeout=self.timeout)
+            response.raise_for_status()
+            body = response.json()
+            if body.get('code') != 'Ok':
+                raise ValueError(body.get('message') or body.get('code'))
+            durations = np.array(body['durations'], dtype=np.float64) / 3600.0
+            distances = np.array(body['distances'], dtype=np.float64) / METERS_PER_MILE
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Routing table request failed ({e}); using {self.fallback.cache_key} distances")
+            self.last_complete = False
+            return self.fallback.table(sources, targets)
+        
+        # null entries come back as NaN: no road route between that pair
+        unroutable = np.isnan(distances) | np.isnan(durations)
+        if unroutable.any():
+            fallback_distances, fallback_times = self.fallback.table(sources, targets)
+            distances[unroutable] = fallback_distances[unroutable]
+            durations[unroutable] = fallback_times[unroutable]
+        return distances, durations
+
+
+def create_routing_backend(config: Optional[Dict] = None) -> RoutingBackend:
+    # config is the 'routing' section: backend 'great_circle' (method, avg_speed_mph) or 'osrm' (url, profile)
+    config = config or {}
+    fallback = GreatCircleBackend(config.get('method', 'haversine'),
+                                  config.get('avg_speed_mph', DEFAULT_SPEED_MPH))
+    backend = config.get('backend', 'great_circle')
+    if backend == 'great_circle':
+        return fallback
+    if backend == 'osrm':
+        if not config.get('url'):
+            raise ValueError("The osrm routing backend needs a 'url'")
+        return OSRMBackend(config['url'], profile=config.get('profile', 'driving'),
+                           max_table_size=config.get('max_table_size', OSRM_MAX_TABLE_SIZE),
+                           timeout=config.get('timeout_seconds', 30.0),
+                           pool_size=config.get('pool_size', 4), fallback=fallback)
+    raise ValueError(f"Unknown routing backend '{backend}'. Options: great_circle, osrm")
+
+
+class StandInTableServer(StandInServer):
+    """Local server answering OSRM /table requests from great-circle miles scaled by a detour factor.
+    
+    Lets the OSRM client run offline (tests, demos) against answers that differ from the fallback's.
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, detour_factor: float = 1.25,
+                 avg_speed_mph: float = 40.0):
+        super().__init__(host, port)
+        self.detour_factor = detour_factor
+        self.avg_speed_mph = avg_speed_mph
+    
+    def answer(self, path: str, body: bytes = b'') -> Tuple[int, Dict]:
+        url = urlsplit(path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 4 or parts[0] != 'table':
+            return 400, {'code': 'InvalidUrl', 'message': f"Unsupported path {url.path}"}
+        try:
+            points = np.array([[float(v) for v in pair.split(',')][::-1] for pair in parts[3].split(';')])
+            query = parse_qs(url.query)
+            sources = [int(i) for i in query['sources'][0].split(';')] if 'sources' in query else range(len(points))
+            targets = ([int(i) for i in query['destinations'][0].split(';')] if 'destinations' in query
+                       else range(len(points)))
+            miles = distance_matrix_array(points[list(sources)], points[list(targets)]) * self.detour_factor
+        except (ValueError, IndexError):
+            return 400, {'code': 'InvalidQuery', 'message': "Malformed coordinates or indices"}
+        
+        return 200, {
+            'code': 'Ok',
+            'distances': (miles * METERS_PER_MILE).round(1).tolist(),
+            'durations': (miles / self.avg_speed_mph * 3600.0).round(1).tolist(),
+        }
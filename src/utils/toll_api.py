@@ -0,0 +1,286 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+import requests
+
+from data.models import Location, TollSegment
+from utils.geo_utils import normalize_location
+from utils.http_service import StandInServer, pooled_session
+
+
+logger = logging.getLogger('pallet_optimizer')
+
+Arc = Tuple[str, str]
+
+CACHE_FILE = "tolls.sqlite"
+DEFAULT_TTL_HOURS = 24 * 7
+DEFAULT_MEMORY_SIZE = 50_000
+
+
+class TollProvider:
+    """Source of per-segment toll rates. fetch answers a whole batch of arcs; None means no toll data."""
+    
+    name = "base"
+    # Arcs the last fetch could not get an answer for; they read as None but are not cached
+    failed: FrozenSet[Arc] = frozenset()
+    
+    def fetch(self, arcs: Sequence[Arc],
+              locations: Mapping[str, Location]) -> Dict[Arc, Optional[TollSegment]]:
+        raise NotImplementedError
+
+
+class FileTollProvider(TollProvider):
+    # Rate table keyed by stop or city names, e.g. toll_rates.xlsx
+    def __init__(self, segments: Sequence[TollSegment]):
+        self.segments: Dict[Arc, TollSegment] = {}
+        for segment in segments:
+            key = (normalize_location(segment.from_location), normalize_location(segment.to_location))
+            self.segments[key] = segment
+        
+        # Cached answers are keyed by the table's contents, so editing the file invalidates them
+        digest = hashlib.sha256(repr(sorted((k, s.rate_per_mile, s.flat_rate)
+                                            for k, s in self.segments.items())).encode('utf-8'))
+        self.name = f"file:{digest.hexdigest()[:16]}"
+    
+    def fetch(self, arcs: Sequence[Arc],
+              locations: Mapping[str, Location]) -> Dict[Arc, Optional[TollSegment]]:
+        return {arc: self._lookup(arc, locations) for arc in arcs}
+    
+    def _lookup(self, arc: Arc, locations: Mapping[str, Location]) -> Optional[TollSegment]:
+        # Stop names first, then the stops' cities; either direction of a segment applies
+        for a, b in (arc, self._cities(arc, locations)):
+            if a is None or b is None:
+                continue
+            a, b = normalize_location(a), normalize_location(b)
+            segment = self.segments.get((a, b)) or self.segments.get((b, a))
+            if segment is not None:
+                return TollSegment(arc[0], arc[1], segment.rate_per_mile, segment.flat_rate)
+        return None
+    
+    @staticmethod
+    def _cities(arc: Arc, locations: Mapping[str, Location]) -> Tuple[Optional[str], Optional[str]]:
+        a, b = locations.get(arc[0]), locations.get(arc[1])
+        return (a.city if a else None), (b.city if b else None)
+
+
+class HttpTollProvider(TollProvider):
+    """Client for a toll rate service; arcs are POSTed in batches over one pooled session.
+    
+    Request:  {"segments": [{"from": name, "to": name, "from_coordinates": [lat, lon], "to_coordinates": ...}]}
+    Response: {"segments": [{"from": name, "to": name, "rate_per_mile": float, "flat_rate": float | null}]}
+    Arcs missing from the response have no toll data. A batch whose request fails is logged and
+    its arcs are left as None (the default rate) in failed, so they are asked again next time.
+    """
+    
+    name = "http"
+    
+    def __init__(self, base_url: str, api_key: Optional[str] = None, endpoint: str = "tolls",
+                 batch_size: int = 200, timeout: float = 10.0, pool_size: int = 4, retries: int = 2,
+                 session: Optional[requests.Session] = None):
+        self.url = f"{base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+        self.batch_size = batch_size
+        self.timeout = timeout
+        
+        # Toll lookups are idempotent, so failed POSTs are retried too
+        self.session = session or pooled_session(pool_size, retries, allowed_methods=None)
+        if api_key:
+            self.session.headers['Authorization'] = f"Bearer {api_key}"
+    
+    def fetch(self, arcs: Sequence[Arc],
+              locations: Mapping[str, Location]) -> Dict[Arc, Optional[TollSegment]]:
+        results: Dict[Arc, Optional[TollSegment]] = {arc: None for arc in arcs}
+        failed: Set[Arc] = set()
+        for start in range(0, len(arcs), self.batch_size):
+            batch = arcs[start:start + self.batch_size]
+            payload = {'segments': [self._request_segment(arc, locations) for arc in batch]}
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                items = response.json().get('segments', [])
+                answers = {}
+                for item in items:
+                    arc = (str(item['from']), str(item['to']))
+                    if arc in results and item.get('rate_per_mile') is not None:
+                        flat_rate = item.get('flat_rate')
+                        answers[arc] = TollSegment(arc[0], arc[1], float(item['rate_per_mile']),
+                                                   None if flat_rate is None else float(flat_rate))
+            except (requests.RequestException, ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.warning(f"Toll request for {len(batch)} arcs failed ({e}); using the default toll rate")
+                failed.update(batch)
+                continue
+            results.update(answers)
+        self.failed = frozenset(failed)
+        return results
+    
+    def close(self):
+        self.session.close()
+    
+    @staticmethod
+    def _request_segment(arc: Arc, locations: Mapping[str, Location]) -> Dict:
+        segment = {'from': arc[0], 'to': arc[1]}
+        for key, name in (('from_coordinates', arc[0]), ('to_coordinates', arc[1])):
+            location = locations.get(name)
+            if location is not None:
+                segment[key] = [location.latitude, location.longitude]
+        return segment
+
+
+class TollCache:
+    """Per-segment results in an in-memory LRU in front of an SQLite file; entries expire after ttl_hours."""
+    
+    def __init__(self, directory: Optional[str] = None, ttl_hours: float = DEFAULT_TTL_HOURS,
+                 memory_size: int = DEFAULT_MEMORY_SIZE):
+        self.ttl_seconds = ttl_hours * 3600.0
+        self.memory_size = memory_size
+        self.memory: 'OrderedDict[Tuple[str, str, str], Tuple[Optional[TollSegment], float]]' = OrderedDict()
+        
+        self.path: Optional[Path] = None
+        if directory:
+            self.path = Path(directory) / CACHE_FILE
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS tolls (provider TEXT, from_location TEXT, "
+                             "to_location TEXT, rate_per_mile REAL, flat_rate REAL, fetched_at REAL, "
+                             "PRIMARY KEY (provider, from_location, to_location))")
+    
+    def get_many(self, provider: str, arcs: Sequence[Arc]) -> Dict[Arc, Optional[TollSegment]]:
+        # Only fresh entries are returned; an arc known to have no toll maps to None
+        now = time.time()
+        found: Dict[Arc, Optional[TollSegment]] = {}
+        missing = []
+        for arc in arcs:
+            key = (provider,) + arc
+            entry = self.memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self.memory.move_to_end(key)
+                found[arc] = entry[0]
+            else:
+                missing.append(arc)
+        
+        if missing and self.path is not None:
+            for arc, (segment, fetched_at) in self._read(provider, missing, now).items():
+                found[arc] = segment
+                self._remember((provider,) + arc, segment, fetched_at)
+        return found
+    
+    def put_many(self, provider: str, results: Mapping[Arc, Optional[TollSegment]]):
+        now = time.time()
+        for arc, segment in results.items():
+            self._remember((provider,) + arc, segment, now)
+        if self.path is not None and results:
+            rows = [(provider, a, b, s.rate_per_mile if s else None, s.flat_rate if s else None, now)
+                    for (a, b), s in results.items()]
+            with self._connect() as conn:
+                conn.executemany("INSERT OR REPLACE INTO tolls VALUES (?, ?, ?, ?, ?, ?)", rows)
+    
+    def clear(self):
+        self.memory.clear()
+        if self.path is not None:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM tolls")
+    
+    def _remember(self, key: Tuple[str, str, str], segment: Optional[TollSegment], fetched_at: float):
+        self.memory[key] = (segment, fetched_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+    
+    def _read(self, provider: str, arcs: Sequence[Arc],
+              now: float) -> Dict[Arc, Tuple[Optional[TollSegment], float]]:
+        wanted = set(arcs)
+        found = {}
+        with self._connect() as conn:
+            # Pull the provider's fresh rows for the requested origins, then keep the wanted arcs
+            origins = sorted({a for a, _ in arcs})
+            for start in range(0, len(origins), 500):
+                chunk = origins[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT from_location, to_location, rate_per_mile, flat_rate, fetched_at FROM tolls "
+                    f"WHERE provider = ? AND fetched_at >= ? AND from_location IN ({','.join('?' * len(chunk))})",
+                    [provider, now - self.ttl_seconds] + chunk)
+                for a, b, rate, flat_rate, fetched_at in rows:
+                    if (a, b) in wanted:
+                        segment = None if rate is None else TollSegment(a, b, rate, flat_rate)
+                        found[(a, b)] = (segment, fetched_at)
+        return found
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+class TollService:
+    def __init__(self, provider: TollProvider, cache: Optional[TollCache] = None):
+        self.provider = provider
+        self.cache = cache or TollCache()
+    
+    def prefetch(self, arcs: Sequence[Arc],
+                 locations: Optional[Mapping[str, Location]] = None) -> Dict[Arc, Optional[TollSegment]]:
+        # Cached arcs are answered locally; everything else goes to the provider in one bulk call
+        arcs = list(dict.fromkeys(arcs))
+        results = self.cache.get_many(self.provider.name, arcs)
+        missing = [arc for arc in arcs if arc not in results]
+        if missing:
+            fetched = self.provider.fetch(missing, locations or {})
+            self.cache.put_many(self.provider.name, {arc: segment for arc, segment in fetched.items()
+                                                     if arc not in self.provider.failed})
+            results.update(fetched)
+            logger.info(f"Fetched tolls for {len(missing)} of {len(arcs)} arcs from the {self.provider.name} provider")
+        return results
+    
+    def get(self, from_location: str, to_location: str,
+            locations: Optional[Mapping[str, Location]] = None) -> Optional[TollSegment]:
+        return self.prefetch([(from_location, to_location)], locations).get((from_location, to_location))
+    
+    def segments(self, arcs: Sequence[Arc],
+                 locations: Optional[Mapping[str, Location]] = None) -> List[TollSegment]:
+        return [segment for segment in self.prefetch(arcs, locations).values() if segment is not None]
+
+
+class StandInTollServer(StandInServer):
+    """Local server answering HttpTollProvider requests from a fixed rate table.
+    
+    Lets the HTTP toll client run offline (tests, demos). Arcs missing from rates get default_rate,
+    or no answer when that is None; set fail_status to make every request fail with that status.
+    """
+    
+    def __init__(self, rates: Optional[Mapping[Arc, float]] = None, default_rate: Optional[float] = None,
+                 flat_rate: Optional[float] = None, host: str = '127.0.0.1', port: int = 0,
+                 endpoint: str = "tolls"):
+        super().__init__(host, port)
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.flat_rate = flat_rate
+        self.endpoint = endpoint.strip('/')
+        self.fail_status: Optional[int] = None
+    
+    def answer(self, path: str, body: bytes) -> Tuple[int, Dict]:
+        if self.fail_status is not None:
+            return self.fail_status, {'error': "Stand-in failure"}
+        if path.split('?')[0].strip('/') != self.endpoint:
+            return 404, {'error': f"Unsupported path {path}"}
+        try:
+            segments = json.loads(body.decode('utf-8'))['segments']
+            arcs = [(str(item['from']), str(item['to'])) for item in segments]
+        except (ValueError, KeyError, TypeError):
+            return 400, {'error': "Malformed request"}
+        
+        answers = []
+        for arc in arcs:
+            rate = self.rates.get(arc, self.rates.get(arc[::-1], self.default_rate))
+            if rate is not None:
+                answers.append({'from': arc[0], 'to': arc[1], 'rate_per_mile': rate,
+                                'flat_rate': self.flat_rate})
+        return 200, {'segments': answers}
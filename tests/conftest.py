@@ -0,0 +1,19 @@
+import os
+import sys
+
+# The packages under src import each other as top-level modules (data, core, utils)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import pytest
+
+
+@pytest.fixture
+def base_config(tmp_path):
+    # Short solves and a throwaway matrix cache
+    return {
+        'time_limit_seconds': 10,
+        'heuristic_time_limit': 1,
+        'heuristic_workers': 1,
+        'cluster_workers': 1,
+        'distance_cache_directory': str(tmp_path / 'distance_cache'),
+    }
@@ -0,0 +1,35 @@
+import numpy as np
+
+from data.models import Location, Store, Vehicle
+
+
+DEPOTS = {
+    'Chicago DC': (41.8781, -87.6298),
+    'Dallas DC': (32.7767, -96.7970),
+    'Atlanta DC': (33.7490, -84.3880),
+}
+
+
+def make_location(name: str, latitude: float, longitude: float, city: str = 'Chicago') -> Location:
+    return Location(name=name, address='', latitude=latitude, longitude=longitude, city=city,
+                    state='IL', zip_code='')
+
+
+def make_stores(n: int, center=DEPOTS['Chicago DC'], spread: float = 0.6, seed: int = 0,
+                demand=(2, 8), prefix: str = 'Store') -> list:
+    rng = np.random.default_rng(seed)
+    offsets = rng.uniform(-spread, spread, (n, 2))
+    demands = rng.integers(demand[0], demand[1] + 1, n)
+    return [
+        Store(id=f"{prefix.lower()}_{k}", name=f"{prefix} {k}",
+              location=make_location(f"{prefix} {k}", center[0] + lat, center[1] + lon),
+              demand_pallets=int(pallets))
+        for k, ((lat, lon), pallets) in enumerate(zip(offsets, demands))
+    ]
+
+
+def make_vehicles(n: int, depot: str = 'Chicago DC', max_pallets: int = 26, prefix: str = 'truck') -> list:
+    location = make_location(depot, *DEPOTS[depot])
+    return [Vehicle(id=f"{prefix}_{k}", type='53ft', max_pallets=max_pallets, max_weight=48000,
+                    cost_per_mile=1.0, cost_per_hour=30.0, current_location=location)
+            for k in range(n)]
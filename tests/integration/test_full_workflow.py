@@ -0,0 +1,194 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.optimizer import PalletOptimizer
+from data.models import OrderChanges
+from tests.factories import DEPOTS, make_stores, make_vehicles
+
+
+METHODS = ['exact', 'compact', 'anytime', 'decomposed', 'column_generation', 'heuristic', 'greedy']
+
+
+def served_stores(result):
+    return [stop for route in result.routes for stop in route.stops[1:-1]]
+
+
+def multi_dc_instance():
+    # Most demand around Chicago, a little around Dallas, none near Atlanta
+    stores = make_stores(24, seed=3) + make_stores(3, center=DEPOTS['Dallas DC'], seed=4, prefix='Tx')
+    vehicles = (make_vehicles(6) + make_vehicles(3, 'Dallas DC', prefix='dal') +
+                make_vehicles(3, 'Atlanta DC', prefix='atl'))
+    return stores, vehicles
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_every_method_serves_all_stores_within_capacity(base_config, method):
+    stores = make_stores(10)
+    vehicles = make_vehicles(4)
+    optimizer = PalletOptimizer(dict(base_config, time_limit_seconds=3))
+    
+    result = optimizer.optimize(stores, [], vehicles, method=method)
+    
+    served = served_stores(result)
+    assert sorted(served) == sorted(store.location.name for store in stores)
+    capacity = {vehicle.id: vehicle.max_pallets for vehicle in vehicles}
+    assert all(route.pallets_delivered <= capacity[route.vehicle_id] for route in result.routes)
+    assert len({route.vehicle_id for route in result.routes}) == len(result.routes)
+    assert result.total_cost == pytest.approx(sum(route.total_cost for route in result.routes))
+
+
+def test_decomposed_cost_is_close_to_monolithic_on_multi_dc(base_config):
+    stores, vehicles = multi_dc_instance()
+    optimizer = PalletOptimizer(dict(base_config, time_limit_seconds=5, cluster_size=8))
+    
+    monolithic = optimizer.optimize(stores, [], vehicles, method='heuristic')
+    decomposed = optimizer.optimize(stores, [], vehicles, method='decomposed')
+    
+    assert sorted(served_stores(decomposed)) == sorted(store.location.name for store in stores)
+    assert decomposed.total_cost <= monolithic.total_cost * 1.15
+    # No clusters for the depot with no stores nearby
+    assert {cluster['depot'] for cluster in decomposed.solver_stats['clusters']} == {
+        DEPOTS['Chicago DC'], DEPOTS['Dallas DC']}
+
+
+def test_decomposed_routes_keep_their_depot_names(base_config):
+    stores, vehicles = multi_dc_instance()
+    result = PalletOptimizer(base_config).optimize(stores, [], vehicles, method='decomposed')
+    
+    home = {vehicle.id: vehicle.current_location.name for vehicle in vehicles}
+    for route in result.routes:
+        assert route.stops[0] == route.stops[-1] == home[route.vehicle_id]
+
+
+@pytest.mark.parametrize('method', ['exact', 'compact', 'column_generation', 'heuristic'])
+def test_each_truck_routes_from_its_own_depot(base_config, method):
+    stores = make_stores(5, seed=7) + make_stores(4, center=DEPOTS['Dallas DC'], seed=8, prefix='Tx')
+    vehicles = make_vehicles(2) + make_vehicles(2, 'Dallas DC', prefix='dal')
+    result = PalletOptimizer(dict(base_config, time_limit_seconds=5)).optimize(stores, [], vehicles,
+                                                                                method=method)
+    
+    home = {vehicle.id: vehicle.current_location.name for vehicle in vehicles}
+    assert sorted(served_stores(result)) == sorted(store.location.name for store in stores)
+    for route in result.routes:
+        assert route.stops[0] == route.stops[-1] == home[route.vehicle_id]
+        # Nobody drives 800 miles to the other region's stores
+        region = 'Tx' if home[route.vehicle_id] == 'Dallas DC' else 'Store'
+        assert all(stop.startswith(region) for stop in route.stops[1:-1])
+
+
+def with_windows(stores):
+    # Alternate morning (8-11) and afternoon (13-16) delivery windows
+    day = datetime(2026, 3, 2)
+    for k, store in enumerate(stores):
+        start = 8 if k % 2 == 0 else 13
+        store.delivery_window_start = day + timedelta(hours=start)
+        store.delivery_window_end = day + timedelta(hours=start + 3)
+    return stores
+
+
+@pytest.mark.parametrize('method', ['exact', 'compact', 'column_generation', 'heuristic'])
+def test_routes_meet_delivery_windows(base_config, method):
+    stores = with_windows(make_stores(8, seed=9))
+    by_name = {store.location.name: store for store in stores}
+    config = dict(base_config, time_limit_seconds=5, depot_open_hour=6.0)
+    result = PalletOptimizer(config).optimize(stores, [], make_vehicles(3), method=method)
+    
+    assert sorted(served_stores(result)) == sorted(by_name)
+    for route in result.routes:
+        assert len(route.arrival_times) == len(route.stops)
+        for stop, arrival in zip(route.stops[1:-1], route.arrival_times[1:-1]):
+            assert arrival <= by_name[stop].delivery_window_end
+
+
+@pytest.mark.parametrize('method', ['exact', 'compact', 'column_generation', 'heuristic'])
+def test_routes_respect_distance_and_driver_hour_limits(base_config, method):
+    stores = make_stores(10, seed=11)
+    config = dict(base_config, time_limit_seconds=5,
+                  constraints={'max_route_distance': 110, 'max_driver_hours': 4})
+    result = PalletOptimizer(config).optimize(stores, [], make_vehicles(6), method=method)
+    
+    assert sorted(served_stores(result)) == sorted(store.location.name for store in stores)
+    assert result.solver_stats['constraint_violations'] == []
+    assert all(route.total_distance <= 110 + 1e-6 for route in result.routes)
+
+
+@pytest.fixture
+def planned(base_config):
+    stores = make_stores(30, seed=5)
+    vehicles = make_vehicles(10)
+    optimizer = PalletOptimizer(base_config)
+    return optimizer, stores, vehicles, optimizer.optimize(stores, [], vehicles, method='heuristic')
+
+
+def stops_by_truck(result):
+    return {route.vehicle_id: route.stops[1:-1] for route in result.routes}
+
+
+def test_reoptimize_keeps_edited_routes_on_their_own_truck(planned):
+    optimizer, stores, vehicles, previous = planned
+    by_name = {store.location.name: store for store in stores}
+    before = stops_by_truck(previous)
+    emptied = previous.routes[0]
+    edited_route = next(route for route in previous.routes[1:]
+                        if len(route.stops) > 3 and route.pallets_delivered < 26)
+    edited = by_name[edited_route.stops[1]]
+    changes = OrderChanges(removed_store_ids=[by_name[stop].id for stop in emptied.stops[1:-1]],
+                           modified_stores=[replace(edited, demand_pallets=edited.demand_pallets + 1)])
+    
+    result = optimizer.reoptimize(previous, stores, vehicles, changes)
+    
+    after = stops_by_truck(result)
+    assert emptied.vehicle_id not in after
+    assert sorted(after[edited_route.vehicle_id]) == sorted(before[edited_route.vehicle_id])
+    assert sorted(served_stores(result)) == sorted(set(by_name) - set(emptied.stops[1:-1]))
+    for route in previous.routes[1:]:
+        if route is not edited_route:
+            assert after[route.vehicle_id] == before[route.vehicle_id]
+    assert result.total_cost == pytest.approx(sum(route.total_cost for route in result.routes))
+
+
+def test_reoptimize_moves_an_edited_store_that_no_longer_fits(planned):
+    optimizer, stores, vehicles, previous = planned
+    by_name = {store.location.name: store for store in stores}
+    route = max(previous.routes, key=lambda route: route.pallets_delivered)
+    edited = by_name[route.stops[1]]
+    grown = replace(edited, demand_pallets=edited.demand_pallets + 26 - route.pallets_delivered + 1)
+    
+    result = optimizer.reoptimize(previous, stores, vehicles, OrderChanges(modified_stores=[grown]))
+    
+    after = stops_by_truck(result)
+    assert edited.location.name not in after.get(route.vehicle_id, [])
+    assert sorted(served_stores(result)) == sorted(by_name)
+    assert all(route.pallets_delivered <= 26 for route in result.routes)
+    assert result.solver_stats['inserted_stores'] == 1
+
+
+def test_reoptimize_inserts_added_stores_and_leaves_other_routes(planned):
+    optimizer, stores, vehicles, previous = planned
+    added = make_stores(3, seed=21, prefix='New')
+    
+    result = optimizer.reoptimize(previous, stores, vehicles, OrderChanges(added_stores=added))
+    
+    assert sorted(served_stores(result)) == sorted(store.location.name for store in stores + added)
+    assert result.solver_stats['inserted_stores'] == 3
+    assert result.solver_stats['unassigned_stores'] == []
+    assert len({route.vehicle_id for route in result.routes}) == len(result.routes)
+    before = stops_by_truck(previous)
+    fixed = [route for route in result.routes if not set(route.stops) & {store.location.name for store in added}]
+    assert len(fixed) >= result.solver_stats['fixed_routes']
+    for route in fixed:
+        assert route.stops[1:-1] == before.get(route.vehicle_id)
+
+
+def test_reoptimize_reroutes_stores_of_an_unavailable_truck(planned):
+    optimizer, stores, vehicles, previous = planned
+    lost = previous.routes[0]
+    
+    result = optimizer.reoptimize(previous, stores, vehicles,
+                                  OrderChanges(unavailable_vehicle_ids=[lost.vehicle_id]))
+    
+    assert lost.vehicle_id not in stops_by_truck(result)
+    assert sorted(served_stores(result)) == sorted(store.location.name for store in stores)
+    assert all(route.pallets_delivered <= 26 for route in result.routes)
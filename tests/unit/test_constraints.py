@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from core.constraints import ConstraintEngine, RouteLimits, check_routes
+from data.models import Route, Vehicle
+
+
+# Depot 0 and three stores on a line, 10 miles apart; 1 hour per 50 miles
+DISTANCES = np.abs(np.subtract.outer(np.arange(4), np.arange(4))) * 10.0
+TIMES = DISTANCES / 50.0
+DEMANDS = np.array([0, 4, 6, 8])
+
+
+def test_limits_read_flat_keys_or_the_constraints_section():
+    assert RouteLimits.from_config({'max_route_distance': 100}).max_route_distance == 100
+    limits = RouteLimits.from_config({'constraints': {'max_driver_hours': 8, 'pallet_weight_lbs': 1500}})
+    assert limits.max_driver_hours == 8 and limits.limits_routes
+    
+    vehicle = Vehicle('v', '53ft', max_pallets=26, max_weight=30000, cost_per_mile=1.0, cost_per_hour=1.0)
+    assert limits.vehicle_capacity(vehicle) == 20  # 30000 lbs / 1500 lbs per pallet
+
+
+def test_evaluate_matches_path_totals():
+    limits = RouteLimits(max_route_distance=50, max_driver_hours=2)
+    engine = ConstraintEngine(DISTANCES, TIMES, DEMANDS, limits, service_hours=0.25)
+    routes = [[1, 2, 3], [2]]
+    
+    checks = engine.evaluate(routes)
+    for r, route in enumerate(routes):
+        assert np.allclose(checks.totals[r], engine.path_totals([0] + route + [0]))
+    # 60 miles and 1.2 + 0.75 hours breaks the distance limit only
+    assert checks.feasible.tolist() == [False, True]
+    assert [v['limit'] for v in checks.violations()] == ['max_route_distance']
+
+
+def test_reachable_leaves_a_way_back():
+    engine = ConstraintEngine(DISTANCES, TIMES, DEMANDS, RouteLimits(max_route_distance=45))
+    # From store 1 with 10 miles driven: store 3 needs 20 more and 30 back
+    assert engine.reachable(np.array([10.0, 0.2, 4, 0]), 1).tolist() == [True, True, True, False]
+
+
+def test_check_routes_uses_route_totals():
+    vehicle = Vehicle('v', '53ft', max_pallets=10, max_weight=48000, cost_per_mile=1.0, cost_per_hour=1.0)
+    route = Route('r', 'v', ['depot', 'a', 'depot'], total_distance=120.0, total_time=2.0, total_cost=0.0,
+                  pallets_delivered=12)
+    checks = check_routes([route], [vehicle], RouteLimits(max_route_distance=100))
+    
+    assert {v['limit'] for v in checks.violations()} == {'max_route_distance', 'max_pallet_capacity'}
+    assert checks.excess[0, 0] == pytest.approx(20.0)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from core.cost_calculator import CostCalculator
+from data.models import DistanceMatrix, Route, TollSegment
+
+
+NAMES = ['depot', 'a', 'b']
+DISTANCES = np.array([[0.0, 10.0, 20.0], [10.0, 0.0, 15.0], [20.0, 15.0, 0.0]])
+
+
+def calculator(segments):
+    calc = CostCalculator({'default_toll_rate': 0.1})
+    calc.set_distance_matrix(DistanceMatrix(NAMES, DISTANCES, DISTANCES / 50.0))
+    calc.set_toll_segments(segments)
+    return calc
+
+
+def test_arc_toll_costs_use_segment_rates_and_default_elsewhere():
+    calc = calculator([TollSegment('a', 'b', 2.0, flat_rate=5.0)])
+    tolls = calc.arc_toll_costs(['b', 'a', 'depot'], DISTANCES[np.ix_([2, 1, 0], [2, 1, 0])])
+    
+    assert tolls[1, 0] == pytest.approx(15.0 * 2.0 + 5.0)
+    assert tolls[0, 1] == pytest.approx(15.0 * 2.0 + 5.0)
+    assert tolls[2, 1] == pytest.approx(10.0 * 0.1)
+    assert np.all(np.diag(tolls) == 0)
+
+
+def test_names_outside_the_matrix_pay_the_default_rate():
+    calc = calculator([])
+    distances = np.array([[0.0, 40.0], [40.0, 0.0]])
+    assert calc.arc_toll_costs(['a', 'elsewhere'], distances)[0, 1] == pytest.approx(4.0)
+
+
+def test_route_costs_include_tolls():
+    route = Route(id='r', vehicle_id='v', stops=['depot', 'a', 'b', 'depot'], total_distance=45.0,
+                  total_time=0.9, total_cost=0.0, pallets_delivered=4)
+    cheap = calculator([]).calculate_route_costs([route])[0]
+    tolled = calculator([TollSegment('a', 'b', 2.0)]).calculate_route_costs([route])[0]
+    
+    assert tolled.toll_cost - cheap.toll_cost == pytest.approx(15.0 * (2.0 - 0.1))
+    assert tolled.total_cost > cheap.total_cost
@@ -0,0 +1,205 @@
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from core.optimizer import PalletOptimizer
+from data import report_writer
+from data.excel_handler import ExcelHandler, _priority_values
+from data.models import Location, PalletType, Store, Supplier
+from data.parquet_store import PARQUET_AVAILABLE
+from tests.factories import make_stores, make_vehicles
+
+
+FIXTURES = Path(__file__).resolve().parents[1] / 'fixtures'
+PRIORITIES = {'High': 1, 'Medium': 2, 'Low': 3, 'high': 1, 'medium': 2, 'low': 3}
+
+
+def row_location(row, default_name):
+    # Row-by-row reading as the loaders did before the columnar rewrite
+    name = row.get('name', row.get('store_name', row.get('supplier_name', default_name)))
+    return name, Location(name=name, address=row['address'], latitude=row['latitude'],
+                          longitude=row['longitude'], city=row['city'], state=row['state'],
+                          zip_code=str(row['zip_code']), contact_info=row.get('contact_info'))
+
+
+def reference_stores(path):
+    stores = []
+    for _, row in pd.read_excel(path).iterrows():
+        row = row.where(row.notna(), None)
+        name, location = row_location(row, 'Unknown Store')
+        priority = row.get('priority')
+        priority = PRIORITIES.get(priority, 1) if isinstance(priority, str) or priority is None else int(priority)
+        windows = [pd.to_datetime(row[column]) if row.get(column) is not None else None
+                   for column in ('delivery_window_start', 'delivery_window_end')]
+        stores.append(Store(id=str(row['store_id']), name=name, location=location,
+                            demand_pallets=int(row['demand_pallets']), delivery_window_start=windows[0],
+                            delivery_window_end=windows[1], priority=priority))
+    return stores
+
+
+def reference_suppliers(path):
+    suppliers = []
+    for _, row in pd.read_excel(path).iterrows():
+        row = row.where(row.notna(), None)
+        name, location = row_location(row, 'Unknown Supplier')
+        text = str(row['pallet_types'] or '').lower()
+        kinds = [kind for kind in (PalletType.STANDARD, PalletType.EURO, PalletType.CUSTOM) if kind.value in text]
+        suppliers.append(Supplier(id=str(row['supplier_id']), name=name, location=location,
+                                  available_pallets=int(row['available_pallets']),
+                                  cost_per_pallet=float(row['cost_per_pallet']),
+                                  lead_time_days=int(row['lead_time_days'] or 1),
+                                  capacity_per_day=int(row['capacity_per_day'] or 100),
+                                  reliability_score=float(row['reliability_score'] or 1.0),
+                                  pallet_types=kinds or [PalletType.STANDARD]))
+    return suppliers
+
+
+@pytest.fixture
+def handler(tmp_path):
+    for name in ('sample_stores.xlsx', 'sample_suppliers.xlsx'):
+        shutil.copy(FIXTURES / name, tmp_path / name)
+    return ExcelHandler(str(tmp_path), str(tmp_path / 'output'))
+
+
+def test_stores_match_row_by_row_loading(handler):
+    assert handler.load_stores('sample_stores.xlsx') == reference_stores(FIXTURES / 'sample_stores.xlsx')
+
+
+def test_suppliers_match_row_by_row_loading(handler):
+    suppliers = handler.load_suppliers('sample_suppliers.xlsx')
+    
+    assert suppliers == reference_suppliers(FIXTURES / 'sample_suppliers.xlsx')
+    # supplier_name is read as the name column
+    assert suppliers[0].name == 'Elk Grove Warehouse'
+
+
+def test_csv_and_parquet_inputs_load_like_the_workbook(handler, tmp_path):
+    workbook = pd.read_excel(tmp_path / 'sample_stores.xlsx')
+    workbook.to_csv(tmp_path / 'sample_stores.csv', index=False)
+    expected = handler.load_stores_frame('sample_stores.xlsx')
+    
+    pd.testing.assert_frame_equal(handler.load_stores_frame('sample_stores.csv'), expected)
+    if PARQUET_AVAILABLE:
+        # Parquet columns hold one type, so the mixed priority column is written as text
+        workbook.astype({'priority': str}).to_parquet(tmp_path / 'sample_stores.parquet')
+        parquet = handler.load_stores_frame('sample_stores.parquet')
+        pd.testing.assert_frame_equal(parquet, expected)
+
+
+def test_csv_ids_keep_leading_zeros(tmp_path):
+    (tmp_path / 'stores.csv').write_text(
+        "store_id,store_name,address,city,state,zip_code,latitude,longitude,demand_pallets\n"
+        "0042,Corner Shop,1 Elm St,Boston,MA,02108,42.357,-71.062,4\n")
+    
+    store = ExcelHandler(str(tmp_path), str(tmp_path)).load_stores('stores.csv')[0]
+    
+    assert store.id == '0042'
+    assert store.location.zip_code == '02108'
+    assert store.name == store.location.name == 'Corner Shop'
+
+
+def test_order_aliases_and_unknown_pallet_types(tmp_path):
+    pd.DataFrame({'order_id': ['O1', 'O2'], 'store_id': ['S1', 'S2'], 'supplier_id': ['P1', 'P1'],
+                  'pallets_ordered': [3, 5], 'date': ['2026-03-02', '2026-03-03'],
+                  'order_priority': ['low', 2], 'pallet_type': ['Euro', None]}).to_csv(tmp_path / 'orders.csv',
+                                                                                       index=False)
+    handler = ExcelHandler(str(tmp_path), str(tmp_path))
+    
+    orders = handler.load_historical_orders('orders.csv')
+    assert [order.quantity for order in orders] == [3, 5]
+    assert [order.priority for order in orders] == [3, 2]
+    assert [order.pallet_type for order in orders] == [PalletType.EURO, PalletType.STANDARD]
+    assert orders[1].requested_date == pd.Timestamp('2026-03-03')
+    
+    pd.DataFrame({'order_id': ['O3'], 'store_id': ['S1'], 'supplier_id': ['P1'],
+                  'pallet_type': ['pallet-xl']}).to_csv(tmp_path / 'bad_orders.csv', index=False)
+    with pytest.raises(ValueError, match='unknown pallet type.*pallet-xl'):
+        handler.load_orders_frame('bad_orders.csv')
+
+
+def test_priority_values_read_numbers_and_labels():
+    values = pd.Series([1, '3', 'High', ' medium ', 'LOW', None, 'urgent'], dtype=object)
+    
+    assert _priority_values(values).tolist() == [1, 3, 1, 2, 3, 1, 1]
+
+
+def order_history(n=7):
+    # Every third order has no date
+    return pd.DataFrame({
+        'order_id': [f"O{k:03d}" for k in range(n)],
+        'store_id': [f"S{k % 3}" for k in range(n)],
+        'supplier_id': ['P1'] * n,
+        'quantity': list(range(1, n + 1)),
+        'requested_date': [None if k % 3 == 2 else f"2026-03-{k + 1:02d}" for k in range(n)],
+    })
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.xlsx'])
+def test_history_chunks_add_up_to_the_whole_file(tmp_path, suffix):
+    history = order_history()
+    path = tmp_path / f"orders{suffix}"
+    if suffix == '.csv':
+        history.to_csv(path, index=False)
+    else:
+        history.to_excel(path, index=False)
+    handler = ExcelHandler(str(tmp_path), str(tmp_path))
+    
+    chunks = list(handler.iter_historical_orders(path.name, chunk_size=3))
+    
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    orders = [order for chunk in chunks for order in chunk]
+    assert [order.id for order in orders] == history['order_id'].tolist()
+    assert [order.quantity for order in orders] == list(range(1, 8))
+    # Undated orders in different chunks share one "now"
+    assert len({order.requested_date for order in orders[2::3]}) == 1
+
+
+def test_xlsx_history_streams_skipping_blank_rows(tmp_path):
+    history = order_history(4)
+    blank = pd.DataFrame([[None] * len(history.columns)], columns=history.columns)
+    pd.concat([history.iloc[:2], blank, history.iloc[2:]]).to_excel(tmp_path / 'orders.xlsx', index=False)
+    handler = ExcelHandler(str(tmp_path), str(tmp_path))
+    
+    frames = list(handler.iter_historical_orders('orders.xlsx', chunk_size=2, as_frames=True))
+    
+    assert [len(frame) for frame in frames] == [2, 2]
+    assert pd.concat(frames)['order_id'].tolist() == history['order_id'].tolist()
+    assert list(frames[0].columns) == list(handler.load_orders_frame('orders.xlsx').columns)
+
+
+def test_history_date_filter_is_inclusive_and_dates_undated_rows_now(tmp_path):
+    order_history().to_csv(tmp_path / 'orders.csv', index=False)
+    handler = ExcelHandler(str(tmp_path), str(tmp_path))
+    
+    kept = [order.id for chunk in handler.iter_historical_orders('orders.csv', chunk_size=2,
+                                                                  start_date=datetime(2026, 3, 2),
+                                                                  end_date=datetime(2026, 3, 4))
+            for order in chunk]
+    assert kept == ['O001', 'O003']
+    
+    recent = [order.id for chunk in handler.iter_historical_orders('orders.csv', chunk_size=2,
+                                                                    start_date=datetime(2026, 3, 7))
+              for order in chunk]
+    assert recent == ['O002', 'O005', 'O006']
+
+
+@pytest.mark.parametrize('engine', ['xlsxwriter', 'openpyxl'])
+def test_heuristic_results_save_without_arrival_times(base_config, tmp_path, monkeypatch, engine):
+    if engine == 'xlsxwriter':
+        pytest.importorskip('xlsxwriter')
+    else:
+        monkeypatch.setattr(report_writer, 'xlsxwriter', None)
+    result = PalletOptimizer(dict(base_config, time_limit_seconds=3)).optimize(make_stores(6), [], make_vehicles(3),
+                                                                               method='heuristic')
+    handler = ExcelHandler(str(tmp_path), str(tmp_path / 'output'))
+    
+    path = handler.save_optimization_results(result, 'results.xlsx')
+    
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets) == ['Summary', 'Routes', 'Stops', 'Costs']
+    assert len(sheets['Routes']) == len(result.routes)
+    assert len(sheets['Stops']) == sum(len(route.stops) for route in result.routes)
+    assert sheets['Stops']['Arrival'].isna().all()
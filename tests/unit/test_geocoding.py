@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from data.excel_handler import ExcelHandler
+from utils.geocoding import GeocodingService, StandInGeocoder
+
+
+TABLE = {
+    '100 N State St, Chicago, IL': (41.8837, -87.6278),
+    '1600 Sherman Ave, Evanston, IL': (42.0451, -87.6877),
+}
+
+
+def service(backend, tmp_path, **options):
+    return GeocodingService(backend, cache_path=str(tmp_path / 'geocodes.sqlite'), rate_per_second=0, **options)
+
+
+def test_each_distinct_address_is_looked_up_once(tmp_path):
+    backend = StandInGeocoder(TABLE)
+    geocoder = service(backend, tmp_path)
+    
+    results = geocoder.geocode_many(['100 N. State St, Chicago, IL', '100 n state st chicago il',
+                                     '1600 Sherman Ave, Evanston, IL', '100 N State St, Chicago, IL'])
+    
+    assert results == [TABLE['100 N State St, Chicago, IL']] * 2 + [TABLE['1600 Sherman Ave, Evanston, IL'],
+                                                                    TABLE['100 N State St, Chicago, IL']]
+    assert len(backend.lookups) == 2
+
+
+def test_not_found_answers_are_cached_across_services(tmp_path):
+    backend = StandInGeocoder(TABLE)
+    assert service(backend, tmp_path).geocode_many(['1 Nowhere Rd']) == [None]
+    
+    # A new service with the same cache file answers from disk, including the miss
+    again = service(backend, tmp_path, workers=1)
+    assert again.geocode_many(['1 Nowhere Rd', '100 N State St, Chicago, IL']) == [
+        None, TABLE['100 N State St, Chicago, IL']]
+    assert backend.lookups == ['1 Nowhere Rd', '100 N State St, Chicago, IL']
+    with pytest.raises(ValueError, match='Could not geocode'):
+        again.geocode('1 Nowhere Rd')
+    
+    again.cache.forget_failures()
+    assert service(backend, tmp_path).geocode_many(['1 Nowhere Rd']) == [None]
+    assert backend.lookups.count('1 Nowhere Rd') == 2
+
+
+def test_backend_errors_are_retried_on_the_next_lookup(tmp_path):
+    backend = StandInGeocoder(TABLE)
+    backend.failing.add('1600 Sherman Ave, Evanston, IL')
+    geocoder = service(backend, tmp_path)
+    
+    assert geocoder.geocode_many(['1600 Sherman Ave, Evanston, IL']) == [None]
+    assert geocoder.cache.get_many(['1600 sherman ave evanston il']) == {}
+    
+    backend.failing.clear()
+    assert geocoder.geocode_many(['1600 Sherman Ave, Evanston, IL']) == [TABLE['1600 Sherman Ave, Evanston, IL']]
+    assert len(backend.lookups) == 2
+
+
+def test_excel_handler_geocodes_rows_without_coordinates(tmp_path):
+    pd.DataFrame({
+        'store_id': ['S1', 'S2', 'S3'],
+        'name': ['Loop', 'Evanston', 'Known'],
+        'address': ['100 N State St', '1600 Sherman Ave', '1 Elm St'],
+        'city': ['Chicago', 'Evanston', 'Chicago'],
+        'state': ['IL', 'IL', 'IL'],
+        'zip_code': ['', '', '60601'],
+        'latitude': [None, None, 41.9],
+        'longitude': [None, None, -87.7],
+        'demand_pallets': [4, 6, 8],
+    }).to_csv(tmp_path / 'stores.csv', index=False)
+    backend = StandInGeocoder(TABLE)
+    handler = ExcelHandler(str(tmp_path), str(tmp_path), geocoder=service(backend, tmp_path))
+    
+    stores = handler.load_stores('stores.csv')
+    
+    assert [(store.location.latitude, store.location.longitude) for store in stores] == [
+        TABLE['100 N State St, Chicago, IL'], TABLE['1600 Sherman Ave, Evanston, IL'], (41.9, -87.7)]
+    # Only the rows missing coordinates were sent to the backend
+    assert len(backend.lookups) == 2
+    
+    (tmp_path / 'unknown.csv').write_text((tmp_path / 'stores.csv').read_text().replace('100 N State', '9 Lost'))
+    with pytest.raises(ValueError, match='Could not geocode 1 address'):
+        handler.load_stores('unknown.csv')
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+import pytest
+
+import core.heuristics as heuristics
+from core.heuristics import LocalSearch, RoutingProblem, solve_multistart, wave_budget
+
+
+def random_problem(n_customers: int, seed: int = 1) -> RoutingProblem:
+    rng = np.random.default_rng(seed)
+    points = rng.random((n_customers + 1, 2)) * 100
+    demands = rng.integers(1, 5, n_customers + 1)
+    demands[0] = 0
+    return RoutingProblem(costs=np.linalg.norm(points[:, None] - points[None, :], axis=2),
+                          demands=demands, capacity=26, coordinates=points)
+
+
+class SerialExecutor:
+    # Stands in for ProcessPoolExecutor and records what each start was given
+    tasks = []
+    
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        pass
+    
+    def map(self, fn, tasks):
+        SerialExecutor.tasks = list(tasks)
+        return [fn(task) for task in SerialExecutor.tasks]
+
+
+def test_every_customer_is_routed_within_capacity():
+    problem = random_problem(60)
+    routes, cost = solve_multistart(problem, starts=4, time_limit=1.0, workers=1)
+    
+    assert sorted(c for route in routes for c in route) == list(range(1, 61))
+    assert all(problem.demands[route].sum() <= problem.capacity for route in routes)
+    assert cost > 0
+
+
+def test_wave_budget_splits_the_time_limit_across_waves():
+    assert wave_budget(10.0, starts=8, pool_size=2) == pytest.approx(10.0 * 0.9 / 4)
+    assert wave_budget(10.0, starts=3, pool_size=4) == pytest.approx(9.0)
+    assert wave_budget(0.1, starts=100, pool_size=1) == 0.1
+
+
+def test_parallel_starts_get_their_wave_share(monkeypatch):
+    monkeypatch.setattr(heuristics, 'ProcessPoolExecutor', SerialExecutor)
+    solve_multistart(random_problem(20), starts=8, time_limit=2.0, workers=2, parallel_threshold=0)
+    
+    assert len(SerialExecutor.tasks) == 8
+    assert all(task[3] == pytest.approx(2.0 * 0.9 / 4) for task in SerialExecutor.tasks)
+
+
+def test_two_opt_stops_at_the_deadline():
+    problem = random_problem(30)
+    search = LocalSearch(problem, deadline=time.time() + 60)
+    route = list(range(1, 31))
+    search.paths = [[0] + route + [0]]
+    search.loads = [int(problem.demands.sum())]
+    search._index_positions()
+    
+    search.deadline = time.time() - 1
+    assert not search._two_opt()
+    assert search.paths[0] == [0] + route + [0]
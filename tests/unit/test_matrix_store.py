@@ -0,0 +1,65 @@
+import json
+import os
+
+import numpy as np
+
+from data.matrix_store import INDEX_FILE, MANIFEST_FILE, DistanceMatrixStore, location_keys, location_set_hash
+
+
+NAMES = ['depot', 'a', 'b', 'c']
+COORDINATES = [(41.88, -87.63), (41.60, -87.90), (42.05, -87.70), (41.75, -88.20)]
+
+
+def test_hit_returns_the_saved_matrix(tmp_path):
+    store = DistanceMatrixStore(str(tmp_path))
+    first = store.get_matrix(NAMES, COORDINATES)
+    second = store.get_matrix(NAMES[::-1], COORDINATES[::-1])
+    
+    assert np.allclose(first.submatrix(NAMES), second.submatrix(NAMES))
+    with open(tmp_path / INDEX_FILE) as f:
+        assert len(json.load(f)) == 1
+
+
+def test_lookups_use_the_index_not_the_manifests(tmp_path, monkeypatch):
+    store = DistanceMatrixStore(str(tmp_path))
+    store.get_matrix(NAMES, COORDINATES)
+    monkeypatch.setattr(store, '_iter_manifests', lambda: (_ for _ in ()).throw(AssertionError))
+    
+    # A subset is served from the cached superset
+    matrix = store.get_matrix(NAMES[:2], COORDINATES[:2])
+    assert 'b' in matrix
+
+
+def test_index_is_rebuilt_when_missing(tmp_path):
+    store = DistanceMatrixStore(str(tmp_path))
+    store.get_matrix(NAMES, COORDINATES)
+    (tmp_path / INDEX_FILE).unlink()
+    
+    assert list(DistanceMatrixStore(str(tmp_path))._read_index())
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    store = DistanceMatrixStore(str(tmp_path), max_entries=2)
+    sets = [([NAMES[0], name], [COORDINATES[0], coordinates])
+            for name, coordinates in zip(NAMES[1:], COORDINATES[1:])]
+    hashes = [location_set_hash(location_keys(*pair), store.method, store.avg_speed_mph) for pair in sets]
+    
+    store.get_matrix(*sets[0])
+    os.utime(tmp_path / hashes[0] / MANIFEST_FILE, (1, 1))
+    store.get_matrix(*sets[1])
+    os.utime(tmp_path / hashes[1] / MANIFEST_FILE, (2, 2))
+    # Reading the first entry makes the second the least recently used
+    store.get_matrix(*sets[0])
+    store.get_matrix(*sets[2])
+    
+    assert set(store._read_index()) == {hashes[0], hashes[2]}
+    assert not (tmp_path / hashes[1]).exists()
+
+
+def test_size_limit_is_enforced(tmp_path):
+    store = DistanceMatrixStore(str(tmp_path), max_bytes=1)
+    store.get_matrix(NAMES[:2], COORDINATES[:2])
+    store.get_matrix(NAMES, COORDINATES)
+    
+    # The newest entry always stays, even over the limit
+    assert len(store._read_index()) == 1
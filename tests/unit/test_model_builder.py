@@ -0,0 +1,52 @@
+import pulp
+import pytest
+
+from core.model_builder import ModelBuilder, adjacency, linear_expression
+
+
+def test_repeated_variables_are_summed():
+    x = pulp.LpVariable('x')
+    y = pulp.LpVariable('y')
+    expression = linear_expression([(x, 1.0), (y, 2.0), (x, 3.0)], constant=5.0)
+    
+    assert dict(expression.items()) == {x: 4.0, y: 2.0}
+    assert expression.constant == 5.0
+
+
+def test_builder_matches_a_hand_written_model():
+    # Knapsack: values 6, 5, 4 with weights 3, 2, 2 and room for 4
+    values, weights = {0: 6, 1: 5, 2: 4}, {0: 3, 1: 2, 2: 2}
+    
+    builder = ModelBuilder("knapsack", sense=pulp.LpMaximize)
+    x = builder.binary_variables("x", [(i,) for i in values])
+    builder.set_objective(x, {(i,): v for i, v in values.items()})
+    builder.add_constraint(((x[i,], weights[i]) for i in weights), '<=', 4)
+    prob = builder.finish()
+    prob.solve(pulp.PULP_CBC_CMD(msg=0))
+    
+    reference = pulp.LpProblem("reference", pulp.LpMaximize)
+    y = {i: pulp.LpVariable(f"y_{i}", cat='Binary') for i in values}
+    reference += pulp.lpSum(values[i] * y[i] for i in values)
+    reference += pulp.lpSum(weights[i] * y[i] for i in values) <= 4
+    reference.solve(pulp.PULP_CBC_CMD(msg=0))
+    
+    assert pulp.value(prob.objective) == pytest.approx(pulp.value(reference.objective))
+    assert [round(x[i,].value()) for i in values] == [round(y[i].value()) for i in values]
+    assert builder.size() == {'variables': 3, 'constraints': 1}
+
+
+def test_per_key_bounds():
+    builder = ModelBuilder("bounds")
+    load = builder.integer_variables("load", [(0, 1), (0, 2)], up_bound={(0, 1): 10, (0, 2): 26})
+    assert (load[0, 1].upBound, load[0, 2].upBound) == (10, 26)
+    assert load[0, 1].name == "load_0_1"
+
+
+def test_adjacency_by_node_and_by_vehicle():
+    keys = [(0, 1, 0), (1, 0, 0), (0, 2, 1)]
+    out_arcs, in_arcs = adjacency(keys)
+    assert out_arcs[0] == [(0, 1, 0), (0, 2, 1)]
+    assert in_arcs[0] == [(1, 0, 0)]
+    
+    vehicle_out, _ = adjacency(keys, by_vehicle=True)
+    assert vehicle_out[0, 1] == [(0, 2, 1)]
@@ -0,0 +1,137 @@
+import warnings
+from pathlib import Path
+
+import pytest
+
+from core.optimizer import PalletOptimizer
+from utils.toll_api import StandInTollServer
+from tests.factories import make_stores, make_vehicles
+
+
+def test_distance_cache_directory_is_read_from_the_data_section(tmp_path):
+    optimizer = PalletOptimizer({'data': {'distance_cache_directory': str(tmp_path / 'cache')}})
+    assert optimizer.matrix_store.directory == Path(tmp_path / 'cache')
+    
+    assert PalletOptimizer({}).matrix_store is None
+    assert PalletOptimizer({'distance_cache_directory': None,
+                            'data': {'distance_cache_directory': str(tmp_path)}}).matrix_store is None
+
+
+def test_time_limited_exact_solve_is_not_reported_optimal(base_config, capfd):
+    optimizer = PalletOptimizer(dict(base_config, time_limit_seconds=2, heuristic_time_limit=0.5))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', UserWarning)
+        result = optimizer.optimize(make_stores(14), [], make_vehicles(4), method='exact')
+    
+    assert result.gap is not None and result.gap > optimizer.mip_gap
+    assert result.solver_status == 'Solution Found'
+    # The CBC log goes to the monitor's file, not stdout
+    assert 'Cbc0012I' not in capfd.readouterr().out
+
+
+def toll_config(base_config, server, **tolls):
+    return dict(base_config, tolls=dict({'provider': 'http', 'url': server.url, 'cache_directory': None}, **tolls))
+
+
+def adjacent_pairs(result):
+    return {frozenset(pair) for route in result.routes for pair in zip(route.stops[:-1], route.stops[1:])}
+
+
+@pytest.mark.parametrize('method', ['heuristic', 'compact'])
+def test_toll_rates_change_routes_and_their_cost(base_config, method):
+    stores = make_stores(10)
+    vehicles = make_vehicles(4)
+    untolled = PalletOptimizer(dict(base_config, time_limit_seconds=3)).optimize(stores, [], vehicles,
+                                                                                  method=method)
+    # Price every arc the untolled plan drives between two stores out of reach
+    used = [tuple(pair) for pair in adjacent_pairs(untolled) if 'Chicago DC' not in pair]
+    with StandInTollServer({pair: 50.0 for pair in used}, default_rate=0.0) as server:
+        optimizer = PalletOptimizer(toll_config(dict(base_config, time_limit_seconds=3), server))
+        tolled = optimizer.optimize(stores, [], vehicles, method=method)
+    
+    assert not adjacent_pairs(tolled) & {frozenset(pair) for pair in used}
+    for route in tolled.routes:
+        tolls = sum(optimizer.cost_calculator.calculate_toll_cost(a, b)
+                    for a, b in zip(route.stops[:-1], route.stops[1:]))
+        vehicle = vehicles[0]
+        assert route.total_cost == pytest.approx(route.total_distance * vehicle.cost_per_mile +
+                                                 route.total_time * vehicle.cost_per_hour + tolls)
+
+
+def test_flat_toll_rate_is_added_to_every_route(base_config):
+    stores = make_stores(8)
+    vehicles = make_vehicles(3)
+    plain = PalletOptimizer(base_config).optimize(stores, [], vehicles, method='heuristic')
+    with StandInTollServer(default_rate=0.0, flat_rate=10.0) as server:
+        tolled = PalletOptimizer(toll_config(base_config, server)).optimize(stores, [], vehicles,
+                                                                            method='heuristic')
+    
+    arcs = sum(len(route.stops) - 1 for route in tolled.routes)
+    assert tolled.total_cost == pytest.approx(plain.total_cost + 10.0 * arcs, rel=0.05)
+
+
+def test_toll_outage_falls_back_to_the_default_rate(base_config):
+    with StandInTollServer(default_rate=1.0) as server:
+        server.fail_status = 400
+        optimizer = PalletOptimizer(toll_config(base_config, server))
+        result = optimizer.optimize(make_stores(6), [], make_vehicles(2), method='heuristic')
+    
+    assert result.routes
+    assert optimizer.toll_service.provider.failed
+
+
+def test_decomposed_prices_tolls_without_the_full_matrix(base_config, monkeypatch):
+    stores = make_stores(12)
+    vehicles = make_vehicles(4)
+    with StandInTollServer(default_rate=0.0, flat_rate=10.0) as server:
+        optimizer = PalletOptimizer(toll_config(dict(base_config, cluster_size=6), server))
+        matrix_sizes = set()
+        get_matrix = optimizer.get_distance_matrix
+        
+        def record(cluster_stores, cluster_vehicles, *args):
+            matrix_sizes.add(len(cluster_stores))
+            return get_matrix(cluster_stores, cluster_vehicles, *args)
+        
+        monkeypatch.setattr(optimizer, 'get_distance_matrix', record)
+        result = optimizer.optimize(stores, [], vehicles, method='decomposed')
+    
+    assert len(stores) not in matrix_sizes
+    for route in result.routes:
+        assert route.total_cost >= 10.0 * (len(route.stops) - 1)
+
+
+def zero_demand_instance():
+    # Stores without pallets, bunched far from the depot: cheaper to loop among themselves than to visit
+    stores = make_stores(5, seed=5) + make_stores(3, center=(43.0, -87.9), spread=0.05, seed=6, demand=(0, 0),
+                                                  prefix='Empty')
+    return stores, make_vehicles(2)
+
+
+@pytest.mark.parametrize('method', ['compact', 'exact'])
+def test_zero_demand_stores_are_routed_not_left_in_subtours(base_config, method):
+    stores, vehicles = zero_demand_instance()
+    result = PalletOptimizer(dict(base_config, warm_start=False)).optimize(stores, [], vehicles, method=method)
+    
+    served = sorted(stop for route in result.routes for stop in route.stops[1:-1])
+    assert served == sorted(store.location.name for store in stores)
+
+
+def test_compact_matches_exact(base_config):
+    stores, vehicles = zero_demand_instance()
+    optimizer = PalletOptimizer(base_config)
+    compact = optimizer.optimize(stores, [], vehicles, method='compact')
+    exact = optimizer.optimize(stores, [], vehicles, method='exact')
+    
+    assert compact.gap == pytest.approx(0.0, abs=optimizer.mip_gap)
+    assert exact.gap == pytest.approx(0.0, abs=optimizer.mip_gap)
+    assert compact.total_cost == pytest.approx(exact.total_cost, rel=optimizer.mip_gap)
+
+
+def test_match_routes_follows_stores_when_local_search_merges_routes():
+    vehicles = make_vehicles(3)
+    before = [[1, 2], [3, 4], [5]]
+    after = [[5, 3, 4], [2, 1]]
+    
+    paired = PalletOptimizer._match_routes(vehicles, before, after)
+    
+    assert paired == {'truck_1': [5, 3, 4], 'truck_0': [2, 1]}
@@ -0,0 +1,119 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from data.models import DistanceMatrix, OptimizationResult, Route
+from data.parquet_store import MANIFEST_FILE, ParquetStore
+
+
+STATES = pd.DataFrame({'store_id': ['S1', 'S2', 'S3'], 'state': ['IL', 'WI', 'IL'], 'demand_pallets': [4, 6, 8]})
+
+
+class Builds:
+    def __init__(self, frame):
+        self.frame = frame
+        self.calls = 0
+    
+    def __call__(self):
+        self.calls += 1
+        return self.frame
+
+
+def set_mtime(path, seconds):
+    os.utime(path, ns=(seconds * 10**9, seconds * 10**9))
+
+
+def test_cached_frame_rebuilds_only_when_the_file_contents_change(tmp_path):
+    store = ParquetStore(str(tmp_path / 'lake'))
+    source = tmp_path / 'stores.xlsx'
+    source.write_bytes(b'version 1')
+    set_mtime(source, 1_700_000_000)
+    build = Builds(STATES)
+    
+    pd.testing.assert_frame_equal(store.cached_frame('stores', source, build), STATES)
+    pd.testing.assert_frame_equal(store.cached_frame('stores', source, build), STATES)
+    assert build.calls == 1
+    
+    # Touched but byte-identical: the hash matches and the manifest takes the new mtime
+    set_mtime(source, 1_700_000_100)
+    store.cached_frame('stores', source, build)
+    assert build.calls == 1
+    manifest = store._manifest(tmp_path / 'lake' / 'stores' / store.source_name(source))
+    assert manifest['source']['mtime_ns'] == 1_700_000_100 * 10**9
+    
+    # Same size, new mtime, different bytes
+    source.write_bytes(b'version 2')
+    set_mtime(source, 1_700_000_200)
+    build.frame = STATES.assign(demand_pallets=[1, 2, 3])
+    assert store.cached_frame('stores', source, build)['demand_pallets'].tolist() == [1, 2, 3]
+    assert build.calls == 2
+    
+    # Different size
+    source.write_bytes(b'version 3, longer')
+    store.cached_frame('stores', source, build)
+    assert build.calls == 3
+
+
+def test_cached_frame_projects_and_filters_partitions(tmp_path):
+    store = ParquetStore(str(tmp_path / 'lake'))
+    source = tmp_path / 'stores.xlsx'
+    source.write_bytes(b'stores')
+    build = Builds(STATES)
+    
+    illinois = store.cached_frame('stores', source, build, columns=['store_id', 'state'],
+                                  filters=[('state', '==', 'IL')])
+    
+    assert illinois.to_dict('list') == {'store_id': ['S1', 'S3'], 'state': ['IL', 'IL']}
+    assert (tmp_path / 'lake' / 'stores' / store.source_name(source) / MANIFEST_FILE).exists()
+
+
+def make_result(vehicle_ids, status="Optimal"):
+    routes = [Route(id=f"route_{vehicle_id}", vehicle_id=vehicle_id, stops=['Depot', f"Stop {k}", 'Depot'],
+                    total_distance=10.0 * (k + 1), total_time=1.0, total_cost=25.0 * (k + 1), pallets_delivered=k + 4)
+              for k, vehicle_id in enumerate(vehicle_ids)]
+    return OptimizationResult(routes=routes, total_cost=sum(route.total_cost for route in routes),
+                              total_distance=0.0, total_time=0.0, utilization_rate=0.0, solver_status=status,
+                              solve_time=0.0, objective_value=0.0)
+
+
+def test_appended_routes_read_back_in_run_order_by_date(tmp_path):
+    store = ParquetStore(str(tmp_path / 'lake'))
+    store.append_routes(make_result(['t1', 't2']), run_id='a', run_date=datetime(2026, 3, 2))
+    store.append_routes(make_result(['t3']), run_id='b', run_date=datetime(2026, 3, 5))
+    store.append_routes(make_result([]), run_id='empty', run_date=datetime(2026, 3, 6))
+    
+    routes = store.read_routes()
+    assert routes['run_id'].tolist() == ['a', 'a', 'b']
+    assert routes['vehicle_id'].tolist() == ['t1', 't2', 't3']
+    assert [list(stops) for stops in routes['stops']] == [['Depot', 'Stop 0', 'Depot'],
+                                                          ['Depot', 'Stop 1', 'Depot'],
+                                                          ['Depot', 'Stop 0', 'Depot']]
+    assert routes['pallets_delivered'].tolist() == [4, 5, 4]
+    
+    later = store.read_routes(start_date=datetime(2026, 3, 3), columns=['run_id', 'total_cost'])
+    assert later.to_dict('list') == {'run_id': ['b'], 'total_cost': [25.0]}
+    assert store.read_routes(end_date=datetime(2026, 3, 2))['run_id'].tolist() == ['a', 'a']
+
+
+def test_distance_matrix_reads_a_subset_in_the_requested_order(tmp_path):
+    store = ParquetStore(str(tmp_path / 'lake'))
+    names = ['Depot', 'A', 'B', 'C']
+    distances = np.arange(16, dtype=np.float64).reshape(4, 4)
+    store.write_distance_matrix('chicago', DistanceMatrix(names, distances, distances / 50.0))
+    
+    full = store.read_distance_matrix('chicago')
+    assert full.locations == names
+    np.testing.assert_array_equal(full.distance_array, distances)
+    
+    subset = store.read_distance_matrix('chicago', ['C', 'Depot'])
+    assert subset.locations == ['C', 'Depot']
+    np.testing.assert_array_equal(subset.distance_array, [[15.0, 12.0], [3.0, 0.0]])
+    np.testing.assert_allclose(subset.time_array, subset.distance_array / 50.0)
+    
+    with pytest.raises(ValueError, match="lacks 1 location"):
+        store.read_distance_matrix('chicago', ['A', 'Nowhere'])
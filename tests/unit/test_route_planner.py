@@ -0,0 +1,35 @@
+import numpy as np
+
+from core.route_planner import ColumnGenerationPlanner, VehicleType
+
+
+def one_way_costs():
+    # Depot 0 -> 1 -> 2 -> 0 is cheap, the reverse loop and every out-and-back are not
+    costs = np.full((3, 3), 10.0)
+    np.fill_diagonal(costs, 0.0)
+    costs[0, 1] = costs[1, 2] = costs[2, 0] = 1.0
+    return costs
+
+
+def test_cheaper_order_of_known_customer_set_replaces_column():
+    vehicle_type = VehicleType(depot=0, capacity=10, count=2, costs=one_way_costs(),
+                               customers=np.array([1, 2]))
+    planner = ColumnGenerationPlanner(np.array([0, 1, 1]), [vehicle_type], time_limit=20)
+    planner.set_incumbent([(0, [2, 1])])
+    
+    result = planner.solve()
+    
+    assert result.proven
+    assert result.objective_value == 3.0
+    assert [column.sequence for column in result.columns] == [(1, 2)]
+    assert planner.columns[(0, frozenset({1, 2}))].cost == 3.0
+
+
+def test_add_route_keeps_cheapest_order():
+    vehicle_type = VehicleType(depot=0, capacity=10, count=1, costs=one_way_costs(),
+                               customers=np.array([1, 2]))
+    planner = ColumnGenerationPlanner(np.array([0, 1, 1]), [vehicle_type])
+    
+    cheap = planner.add_route(0, [1, 2])
+    assert planner.add_route(0, [2, 1]) is cheap
+    assert len(planner.columns) == 1
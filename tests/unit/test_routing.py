@@ -0,0 +1,46 @@
+import ast
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from data.matrix_store import DistanceMatrixStore
+from utils.geo_utils import distance_matrix_array
+from utils.routing import GreatCircleBackend, OSRMBackend, StandInTableServer
+
+
+POINTS = np.array([(41.88, -87.63), (41.60, -87.90), (42.05, -87.70), (41.75, -88.20), (41.50, -87.40)])
+
+
+def test_osrm_client_reads_road_tables_in_blocks():
+    with StandInTableServer(detour_factor=1.25) as server:
+        backend = OSRMBackend(server.url, max_table_size=4)
+        distances, times = backend.table(POINTS)
+    
+    assert server.requests > 1
+    assert backend.last_complete
+    assert np.allclose(distances, distance_matrix_array(POINTS) * 1.25, rtol=1e-4, atol=1e-3)
+    assert np.allclose(times, distances / server.avg_speed_mph, rtol=1e-4, atol=1e-3)
+
+
+def test_osrm_failure_falls_back_and_is_not_cached(tmp_path):
+    server = StandInTableServer()
+    url = server.url
+    server.httpd.server_close()
+    
+    backend = OSRMBackend(url, retries=0, timeout=1.0)
+    store = DistanceMatrixStore(str(tmp_path), backend=backend)
+    matrix = store.get_matrix([f"p{k}" for k in range(len(POINTS))], POINTS)
+    
+    assert not backend.last_complete
+    fallback, _ = GreatCircleBackend().table(POINTS)
+    assert matrix.distance('p0', 'p1') == pytest.approx(fallback[0, 1])
+    assert not any(path.is_dir() for path in tmp_path.iterdir())
+
+
+def test_utils_does_not_import_the_core_layer():
+    utils = Path(__file__).resolve().parents[2] / 'src' / 'utils'
+    for path in utils.glob('*.py'):
+        for node in ast.walk(ast.parse(path.read_text())):
+            if isinstance(node, ast.ImportFrom) and node.module:
+                assert not node.module.startswith('core'), f"{path.name} imports {node.module}"
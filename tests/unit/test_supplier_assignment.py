@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from core import supplier_assignment
+from core.supplier_assignment import _solve_lp, _solve_lp_pulp, assign_suppliers, solve_transportation
+from data.models import Supplier
+from tests.factories import make_location, make_stores
+
+
+def instance(seed=0, n=40, m=8):
+    # Supply is tight, so the cheapest suppliers run out and stores have to spread
+    rng = np.random.default_rng(seed)
+    costs = rng.uniform(1, 10, (n, m))
+    demands = rng.integers(1, 10, n).astype(np.float64)
+    return costs, demands, np.full(m, demands.sum() / m * 1.1)
+
+
+def make_suppliers(supplies):
+    return [Supplier(id=f"supplier_{j}", name=f"Supplier {j}", location=make_location(f"Supplier {j}", 41.0, -88.0),
+                     available_pallets=int(supply), cost_per_pallet=1.0, lead_time_days=1,
+                     capacity_per_day=int(supply))
+            for j, supply in enumerate(supplies)]
+
+
+def test_highs_and_pulp_lps_agree():
+    costs, demands, supplies = instance(n=12, m=4)
+    rows, cols = (index.ravel() for index in np.indices(costs.shape))
+    penalty = 1000.0
+    
+    highs = _solve_lp(costs[rows, cols], rows, cols, demands, supplies, penalty)
+    cbc = _solve_lp_pulp(costs[rows, cols], rows, cols, demands, supplies, penalty)
+    
+    assert costs[rows, cols] @ highs[0] == pytest.approx(costs[rows, cols] @ cbc[0])
+    for flows in (highs[0], cbc[0]):
+        assert np.bincount(rows, weights=flows, minlength=len(demands)) == pytest.approx(demands)
+        assert np.all(np.bincount(cols, weights=flows, minlength=len(supplies)) <= supplies + 1e-6)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_pricing_from_one_candidate_matches_the_full_lp(seed):
+    costs, demands, supplies = instance(seed)
+    
+    flows, unmet, rounds, proven = solve_transportation(costs, demands, supplies, candidates=1)
+    full, _, _, _ = solve_transportation(costs, demands, supplies, candidates=costs.shape[1])
+    
+    assert proven and rounds > 1
+    assert unmet.sum() == 0
+    assert (flows * costs).sum() == pytest.approx((full * costs).sum())
+
+
+def test_capped_pricing_is_not_reported_optimal(monkeypatch):
+    costs, demands, supplies = instance()
+    monkeypatch.setattr(supplier_assignment, 'MAX_PRICING_ROUNDS', 1)
+    stores = make_stores(len(demands))
+    for store, demand in zip(stores, demands):
+        store.demand_pallets = int(demand)
+    
+    result = assign_suppliers(stores, make_suppliers(supplies), costs, candidates=1)
+    
+    assert not result.proven
+    assert result.iterations == 1
+    assert result.status == "Pricing Limit Reached"
+
+
+def test_zero_demand_stores_get_no_primary_supplier():
+    stores = make_stores(3)
+    stores[1].demand_pallets = 0
+    costs = np.array([[1.0, 2.0], [1.0, 2.0], [2.0, 1.0]])
+    
+    result = assign_suppliers(stores, make_suppliers([20, 20]), costs)
+    
+    assert result.status == "Optimal" and result.proven
+    assert result.allocations[stores[1].id] == {}
+    assert result.primary == {stores[0].id: 'supplier_0', stores[2].id: 'supplier_1'}
@@ -0,0 +1,56 @@
+from data.models import TollSegment
+from utils.http_service import pooled_session
+from utils.toll_api import HttpTollProvider, StandInTollServer, TollCache, TollService
+from tests.factories import make_location
+
+
+ARCS = [('Store 0', 'Store 1'), ('Store 1', 'Store 2'), ('Store 2', 'Store 0')]
+LOCATIONS = {name: make_location(name, 41.8 + k / 10, -87.6)
+             for k, name in enumerate(['Store 0', 'Store 1', 'Store 2'])}
+
+
+def test_http_provider_reads_rates_from_the_stand_in_server():
+    with StandInTollServer({('Store 1', 'Store 0'): 0.4}, flat_rate=2.0) as server:
+        provider = HttpTollProvider(server.url, batch_size=2)
+        results = provider.fetch(ARCS, LOCATIONS)
+    
+    assert results[ARCS[0]] == TollSegment('Store 0', 'Store 1', 0.4, 2.0)
+    assert results[ARCS[1]] is None and results[ARCS[2]] is None
+    assert server.requests == 2
+    assert not provider.failed
+
+
+def test_failed_batches_fall_back_to_the_default_rate_and_are_not_cached():
+    with StandInTollServer(default_rate=0.3) as server:
+        service = TollService(HttpTollProvider(server.url, retries=0), TollCache())
+        server.fail_status = 503
+        assert service.prefetch(ARCS, LOCATIONS) == {arc: None for arc in ARCS}
+        assert service.provider.failed == frozenset(ARCS)
+        
+        # The outage was not remembered as "no toll"
+        server.fail_status = None
+        assert all(segment.rate_per_mile == 0.3 for segment in service.prefetch(ARCS, LOCATIONS).values())
+        assert server.requests == 2
+        
+        # Answers that did arrive are served from the cache
+        service.prefetch(ARCS, LOCATIONS)
+        assert server.requests == 2
+
+
+def test_unreachable_service_does_not_raise():
+    server = StandInTollServer()
+    url = server.url
+    server.httpd.server_close()
+    
+    provider = HttpTollProvider(url, retries=0, timeout=1.0)
+    assert provider.fetch(ARCS, LOCATIONS) == {arc: None for arc in ARCS}
+    assert provider.failed == frozenset(ARCS)
+
+
+def test_toll_requests_retry_posts_and_share_one_pool():
+    provider = HttpTollProvider("http://127.0.0.1:1", pool_size=3, retries=4)
+    adapter = provider.session.get_adapter(provider.url)
+    
+    assert adapter.max_retries.total == 4 and adapter.max_retries.allowed_methods is None
+    assert adapter._pool_maxsize == 3
+    assert pooled_session().get_adapter("https://osrm").max_retries.allowed_methods is not None